@@ -0,0 +1,72 @@
+import azure.functions as func
+import sys
+import os
+from datetime import datetime
+
+# Add the shared directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
+from db_utils import CHANGES_DEFAULT_LIMIT, CHANGES_MAX_LIMIT
+from diagram_repository import get_diagram_repository
+from http_utils import json_response, http_function
+from log_utils import get_logger
+
+logger = get_logger("diagram_changes")
+
+@http_function("diagram/changes")
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Read the diagram change feed from the transactional outbox.
+    
+    Query parameters:
+    - after: Checkpoint (change_id) returned by the previous call, defaults to 0
+    - limit: Maximum number of changes to return
+    
+    Changes are returned in change_id order. Consumers store the returned
+    checkpoint and pass it back as `after` to continue where they left off.
+    held_back means newer changes wait for an open transaction to finish;
+    has_more is then true, and consumers should retry after a short pause.
+    """
+    logger.info("Function started")
+    
+    try:
+        after = req.params.get('after', '0')
+        limit = req.params.get('limit', str(CHANGES_DEFAULT_LIMIT))
+        logger.debug("Query parameters - after: %s, limit: %s", after, limit)
+        
+        try:
+            after = int(after)
+            limit = int(limit)
+            if after < 0 or limit < 1:
+                raise ValueError()
+        except ValueError:
+            return json_response(req, {"error": "after must be a non-negative integer and limit a positive integer"}, status_code=400)
+        limit = min(limit, CHANGES_MAX_LIMIT)
+        
+        db_manager = get_diagram_repository()
+        batch = db_manager.read_changes(after=after, limit=limit)
+        changes = batch['changes']
+        
+        response_data = {
+            "status": "success",
+            "count": len(changes),
+            "changes": changes,
+            "checkpoint": changes[-1]['change_id'] if changes else after,
+            "has_more": batch['has_more'],
+            "held_back": batch['held_back'],
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
+        
+        logger.debug("Returning %s changes", len(changes))
+        return json_response(req, response_data, status_code=200)
+        
+    except Exception as e:
+        logger.error("Exception occurred: %s", e)
+        
+        error_response = {
+            "status": "error",
+            "message": "Failed to read diagram changes",
+            "error": str(e),
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
+        
+        return json_response(req, error_response, status_code=500)
@@ -1,14 +1,17 @@
 import azure.functions as func
-import logging
-import json
 import sys
 import os
 from datetime import datetime
 
 # Add the shared directory to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
-from db_utils import DiagramDBManager
+from diagram_repository import get_diagram_repository
+from http_utils import json_response, http_function
+from log_utils import get_logger
 
+logger = get_logger("diagram_create")
+
+@http_function("diagram/create")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Create a new diagram in the PostgreSQL database.
@@ -43,67 +46,34 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         "styleex": "styleex"
     }
     """
-    print("🚀 [DIAGRAM CREATE] Function started")
-    logging.info('Diagram create function processed a request.')
-    
-    # Handle CORS preflight requests
-    if req.method == "OPTIONS":
-        return func.HttpResponse(
-            status_code=200,
-            headers={
-                "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                "Access-Control-Allow-Credentials": "true"
-            }
-        )
+    logger.info("Function started")
     
     try:
         # Parse request body
-        print("📥 [DIAGRAM CREATE] Parsing request body...")
+        logger.debug("Parsing request body...")
         try:
             req_body = req.get_json()
-            print(f"📄 [DIAGRAM CREATE] Request body: {json.dumps(req_body, indent=2)}")
+            logger.payload("Request body", req_body)
         except ValueError as e:
-            print(f"❌ [DIAGRAM CREATE] Invalid JSON: {str(e)}")
-            return func.HttpResponse(
-                json.dumps({"error": "Invalid JSON in request body"}),
-                status_code=400,
-                mimetype="application/json",
-                headers={
-                    "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                    "Access-Control-Allow-Credentials": "true"
-                }
-            )
+            logger.warning("Invalid JSON: %s", e)
+            return json_response(req, {"error": "Invalid JSON in request body"}, status_code=400)
         
         # Validate required fields
-        print("✅ [DIAGRAM CREATE] Validating required fields...")
+        logger.debug("Validating required fields...")
         required_fields = ['name']
         missing_fields = [field for field in required_fields if not req_body.get(field)]
         
         if missing_fields:
-            print(f"❌ [DIAGRAM CREATE] Missing fields: {missing_fields}")
-            return func.HttpResponse(
-                json.dumps({
-                    "error": f"Missing required fields: {', '.join(missing_fields)}"
-                }),
-                status_code=400,
-                mimetype="application/json",
-                headers={
-                    "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                    "Access-Control-Allow-Credentials": "true"
-                }
-            )
+            logger.warning("Missing fields: %s", missing_fields)
+            return json_response(req, {
+                "error": f"Missing required fields: {', '.join(missing_fields)}"
+            }, status_code=400)
         
         # Create diagram
-        print("➕ [DIAGRAM CREATE] Creating diagram...")
-        db_manager = DiagramDBManager()
+        logger.debug("Creating diagram...")
+        db_manager = get_diagram_repository()
         new_diagram = db_manager.create_diagram(req_body)
-        print(f"✅ [DIAGRAM CREATE] Diagram created with ID: {new_diagram['diagram_id']}")
+        logger.info("Diagram created with ID: %s", new_diagram['diagram_id'])
         
         # Return success response
         response_data = {
@@ -113,22 +83,11 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             "timestamp": new_diagram['createddate']
         }
         
-        print(f"📤 [DIAGRAM CREATE] Returning success response: {json.dumps(response_data, indent=2)}")
-        return func.HttpResponse(
-            json.dumps(response_data, indent=2),
-            status_code=201,
-            mimetype="application/json",
-            headers={
-                "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                "Access-Control-Allow-Credentials": "true"
-            }
-        )
+        logger.debug("Returning success response for diagram: %s", new_diagram['diagram_id'])
+        return json_response(req, response_data, status_code=201)
         
     except Exception as e:
-        print(f"💥 [DIAGRAM CREATE] Exception occurred: {str(e)}")
-        logging.error(f'Error in diagram create: {str(e)}')
+        logger.error("Exception occurred: %s", e)
         
         error_response = {
             "status": "error",
@@ -137,14 +96,4 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             "timestamp": datetime.utcnow().isoformat() + "Z"
         }
         
-        return func.HttpResponse(
-            json.dumps(error_response, indent=2),
-            status_code=500,
-            mimetype="application/json",
-            headers={
-                "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                "Access-Control-Allow-Credentials": "true"
-            }
-        ) 
\ No newline at end of file
+        return json_response(req, error_response, status_code=500) 
\ No newline at end of file
@@ -1,14 +1,17 @@
 import azure.functions as func
-import logging
-import json
 import sys
 import os
 from datetime import datetime
 
 # Add the shared directory to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
-from db_utils import DiagramDBManager
+from diagram_repository import get_diagram_repository
+from http_utils import json_response, http_function
+from log_utils import get_logger
 
+logger = get_logger("diagram_delete")
+
+@http_function("diagram/delete")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Delete a diagram from the PostgreSQL database.
@@ -16,80 +19,37 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     Query parameters:
     - diagram_id: Diagram ID to delete (required)
     """
-    print("🚀 [DIAGRAM DELETE] Function started")
-    logging.info('Diagram delete function processed a request.')
-    
-    # Handle CORS preflight requests
-    if req.method == "OPTIONS":
-        return func.HttpResponse(
-            status_code=200,
-            headers={
-                "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                "Access-Control-Allow-Credentials": "true"
-            }
-        )
+    logger.info("Function started")
     
     try:
         # Get diagram ID from query parameters
         diagram_id = req.params.get('diagram_id')
-        print(f"🆔 [DIAGRAM DELETE] Diagram ID: {diagram_id}")
+        logger.debug("Diagram ID: %s", diagram_id)
         
         if not diagram_id:
-            print("❌ [DIAGRAM DELETE] No diagram ID provided")
-            return func.HttpResponse(
-                json.dumps({
-                    "error": "diagram_id is required as a query parameter"
-                }),
-                status_code=400,
-                mimetype="application/json",
-                headers={
-                    "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                    "Access-Control-Allow-Credentials": "true"
-                }
-            )
+            logger.warning("No diagram ID provided")
+            return json_response(req, {
+                "error": "diagram_id is required as a query parameter"
+            }, status_code=400)
         
         # Convert diagram_id to integer
         try:
             diagram_id = int(diagram_id)
         except ValueError:
-            return func.HttpResponse(
-                json.dumps({"error": "diagram_id must be a valid integer"}),
-                status_code=400,
-                mimetype="application/json",
-                headers={
-                    "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                    "Access-Control-Allow-Credentials": "true"
-                }
-            )
+            return json_response(req, {"error": "diagram_id must be a valid integer"}, status_code=400)
         
         # Delete diagram
-        print(f"🗑️ [DIAGRAM DELETE] Deleting diagram with ID: {diagram_id}")
-        db_manager = DiagramDBManager()
+        logger.debug("Deleting diagram with ID: %s", diagram_id)
+        db_manager = get_diagram_repository()
         success = db_manager.delete_diagram(diagram_id)
         
         if not success:
-            print(f"❌ [DIAGRAM DELETE] Diagram with ID '{diagram_id}' not found")
-            return func.HttpResponse(
-                json.dumps({
-                    "error": f"Diagram with ID '{diagram_id}' not found"
-                }),
-                status_code=404,
-                mimetype="application/json",
-                headers={
-                    "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                    "Access-Control-Allow-Credentials": "true"
-                }
-            )
+            logger.info("Diagram with ID '%s' not found", diagram_id)
+            return json_response(req, {
+                "error": f"Diagram with ID '{diagram_id}' not found"
+            }, status_code=404)
         
-        print(f"✅ [DIAGRAM DELETE] Diagram deleted successfully: {diagram_id}")
+        logger.info("Diagram deleted successfully: %s", diagram_id)
         
         # Return success response
         response_data = {
@@ -99,22 +59,11 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             "timestamp": datetime.utcnow().isoformat() + "Z"
         }
         
-        print(f"📤 [DIAGRAM DELETE] Returning success response: {json.dumps(response_data, indent=2)}")
-        return func.HttpResponse(
-            json.dumps(response_data, indent=2),
-            status_code=200,
-            mimetype="application/json",
-            headers={
-                "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                "Access-Control-Allow-Credentials": "true"
-            }
-        )
+        logger.debug("Returning success response for diagram: %s", diagram_id)
+        return json_response(req, response_data, status_code=200)
         
     except Exception as e:
-        print(f"💥 [DIAGRAM DELETE] Exception occurred: {str(e)}")
-        logging.error(f'Error in diagram delete: {str(e)}')
+        logger.error("Exception occurred: %s", e)
         
         error_response = {
             "status": "error",
@@ -123,14 +72,4 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             "timestamp": datetime.utcnow().isoformat() + "Z"
         }
         
-        return func.HttpResponse(
-            json.dumps(error_response, indent=2),
-            status_code=500,
-            mimetype="application/json",
-            headers={
-                "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                "Access-Control-Allow-Credentials": "true"
-            }
-        ) 
\ No newline at end of file
+        return json_response(req, error_response, status_code=500) 
\ No newline at end of file
@@ -0,0 +1,147 @@
+import azure.functions as func
+import sys
+import os
+from datetime import datetime
+
+# Add the shared directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
+from db_utils import DIAGRAM_COLUMNS, EXPORT_MAX_ROWS, decode_sync_token
+from diagram_repository import get_diagram_repository
+from http_utils import json_response, bytes_response, http_function
+import arrow_utils
+from log_utils import get_logger
+from trace_utils import span
+
+logger = get_logger("diagram_export")
+
+# Response header carrying the ?after= value of the next page, present only
+# when more rows follow
+NEXT_PAGE_HEADER = "X-Export-Next-After"
+
+@http_function("diagram/export")
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Export t_diagram as Apache Arrow IPC record batches for analytics.
+    
+    Query parameters:
+    - columns: Comma-separated column projection (defaults to all columns)
+    - package_id: Filter by package ID
+    - diagram_type: Filter by diagram type
+    - modified_since: Only diagrams modified after this ISO-8601 timestamp
+    - format: stream (default) or file; the file format supports memory-mapping
+    - batch_size: Rows per record batch (defaults to 10000)
+    - after: Only diagrams with a higher diagram_id (the previous page's next value)
+    - limit: Most rows in this response (defaults to and is capped at EXPORT_MAX_ROWS)
+    
+    The whole response is encoded in memory, so an export is cut into pages
+    of at most EXPORT_MAX_ROWS rows. When more rows follow, the response
+    carries their ?after= value in the X-Export-Next-After header.
+    """
+    logger.info("Function started")
+    
+    try:
+        if arrow_utils.pa is None:
+            return json_response(req, {"error": "Arrow export requires the pyarrow package"}, status_code=501)
+        
+        columns = req.params.get('columns')
+        package_id = req.params.get('package_id')
+        diagram_type = req.params.get('diagram_type')
+        modified_since = req.params.get('modified_since')
+        export_format = req.params.get('format', 'stream')
+        batch_size = req.params.get('batch_size', '10000')
+        after = req.params.get('after')
+        limit = req.params.get('limit', str(EXPORT_MAX_ROWS))
+        
+        logger.debug("Query parameters - columns: %s, package_id: %s, diagram_type: %s, modified_since: %s, format: %s", columns, package_id, diagram_type, modified_since, export_format)
+        
+        # Validate the column projection
+        if columns:
+            columns = tuple(column.strip() for column in columns.split(',') if column.strip())
+            unknown = [column for column in columns if column not in DIAGRAM_COLUMNS]
+            if unknown or not columns:
+                return json_response(req, {
+                    "error": f"Unknown columns: {', '.join(unknown)}"
+                }, status_code=400)
+        else:
+            columns = DIAGRAM_COLUMNS
+        
+        if export_format not in ('stream', 'file'):
+            return json_response(req, {"error": "format must be stream or file"}, status_code=400)
+        
+        try:
+            batch_size = int(batch_size)
+            if batch_size < 1:
+                raise ValueError()
+        except ValueError:
+            return json_response(req, {"error": "batch_size must be a positive integer"}, status_code=400)
+        
+        try:
+            after = int(after) if after else None
+            limit = int(limit)
+            if limit < 1:
+                raise ValueError()
+        except ValueError:
+            return json_response(req, {"error": "after must be an integer and limit a positive integer"}, status_code=400)
+        limit = min(limit, EXPORT_MAX_ROWS)
+        
+        if package_id:
+            try:
+                package_id = int(package_id)
+            except ValueError:
+                return json_response(req, {"error": "package_id must be a valid integer"}, status_code=400)
+        
+        if modified_since:
+            try:
+                modified_since = decode_sync_token(modified_since)
+            except ValueError:
+                return json_response(req, {"error": "modified_since must be an ISO-8601 timestamp"}, status_code=400)
+        
+        # diagram_id names the next page, so it is read even when not exported
+        query_columns = columns if 'diagram_id' in columns else ('diagram_id',) + columns
+        id_position = query_columns.index('diagram_id')
+        page = {"rows": 0, "last_id": None, "more": False}
+        
+        def page_batches(row_batches):
+            # One row past the limit tells whether another page follows
+            for rows in row_batches:
+                if page["rows"] + len(rows) > limit:
+                    page["more"] = True
+                    rows = rows[:limit - page["rows"]]
+                page["rows"] += len(rows)
+                if rows:
+                    page["last_id"] = rows[-1][id_position]
+                    yield rows if query_columns is columns else [row[1:] for row in rows]
+        
+        # Encode each cursor batch as it is fetched
+        logger.debug("Encoding record batches...")
+        db_manager = get_diagram_repository()
+        row_batches = db_manager.iter_diagram_batches(
+            columns=query_columns,
+            package_id=package_id,
+            diagram_type=diagram_type,
+            modified_since=modified_since,
+            batch_size=batch_size,
+            after_id=after,
+            limit=limit + 1
+        )
+        # Batches are fetched and encoded in lockstep, so this span covers both
+        with span("serialize", format="arrow"):
+            body = arrow_utils.encode_record_batches(page_batches(row_batches), columns,
+                                                     file_format=export_format == 'file')
+        
+        headers = {NEXT_PAGE_HEADER: str(page["last_id"])} if page["more"] else None
+        mimetype = arrow_utils.ARROW_FILE_MIMETYPE if export_format == 'file' else arrow_utils.ARROW_STREAM_MIMETYPE
+        logger.debug("Returning %s rows in %s bytes of Arrow %s data", page["rows"], len(body), export_format)
+        return bytes_response(req, body, mimetype, status_code=200, headers=headers)
+        
+    except Exception as e:
+        logger.error("Exception occurred: %s", e)
+        
+        error_response = {
+            "status": "error",
+            "message": "Failed to export diagrams",
+            "error": str(e),
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
+        
+        return json_response(req, error_response, status_code=500)
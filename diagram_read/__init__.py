@@ -1,14 +1,27 @@
 import azure.functions as func
-import logging
-import json
+import io
 import sys
 import os
 from datetime import datetime
 
 # Add the shared directory to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
-from db_utils import DiagramDBManager
+from db_utils import decode_sync_token
+from diagram_repository import get_diagram_repository
+from http_utils import (
+    json_response, bytes_response, msgpack_response, negotiate_media_type,
+    listing_media_types, http_function, NDJSON_MIMETYPE, MSGPACK_MIMETYPE
+)
+from json_utils import dumps
+from log_utils import get_logger
+from trace_utils import span
 
+logger = get_logger("diagram_read")
+
+# Carries the next sync_token for NDJSON delta syncs, which have no envelope
+SYNC_TOKEN_HEADER = "X-Sync-Token"
+
+@http_function("diagram/read")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Read diagrams from the PostgreSQL database.
@@ -17,109 +30,128 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     - diagram_id: Get specific diagram by ID
     - package_id: Filter by package ID
     - diagram_type: Filter by diagram type
-    """
-    print("🚀 [DIAGRAM READ] Function started")
-    logging.info('Diagram read function processed a request.')
+    - modified_since: ISO-8601 timestamp or sync_token from a previous call;
+      returns only diagrams changed since then plus deleted diagram IDs
+    - format: json (default), ndjson or msgpack; the Accept header
+      (application/x-ndjson, application/msgpack) is honoured as well
     
-    # Handle CORS preflight requests
-    if req.method == "OPTIONS":
-        return func.HttpResponse(
-            status_code=200,
-            headers={
-                "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                "Access-Control-Allow-Credentials": "true"
-            }
-        )
+    Listings in NDJSON have one diagram per line and no status/count
+    envelope. Each row is encoded into a single body buffer as it arrives
+    from a server-side cursor; the worker cannot stream responses, so the
+    body is returned once the cursor is exhausted. Delta syncs in NDJSON
+    have one line per changed diagram followed by one line per deletion
+    (the tombstone with "deleted": true), and the next sync_token in the
+    X-Sync-Token header.
+    """
+    logger.info("Function started")
     
     try:
         # Get query parameters
         diagram_id = req.params.get('diagram_id')
         package_id = req.params.get('package_id')
         diagram_type = req.params.get('diagram_type')
+        modified_since = req.params.get('modified_since')
         
-        print(f"🔍 [DIAGRAM READ] Query parameters - diagram_id: {diagram_id}, package_id: {package_id}, diagram_type: {diagram_type}")
+        logger.debug("Query parameters - diagram_id: %s, package_id: %s, diagram_type: %s, modified_since: %s", diagram_id, package_id, diagram_type, modified_since)
         
         # Convert package_id to integer if provided
         if package_id:
             try:
                 package_id = int(package_id)
             except ValueError:
-                return func.HttpResponse(
-                    json.dumps({"error": "package_id must be a valid integer"}),
-                    status_code=400,
-                    mimetype="application/json",
-                    headers={
-                        "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                        "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                        "Access-Control-Allow-Credentials": "true"
-                    }
-                )
+                return json_response(req, {"error": "package_id must be a valid integer"}, status_code=400)
         
-        db_manager = DiagramDBManager()
+        # Parse modified_since as either a sync token or a timestamp
+        if modified_since:
+            try:
+                modified_since = decode_sync_token(modified_since)
+            except ValueError:
+                return json_response(req, {"error": "modified_since must be an ISO-8601 timestamp or a sync_token"}, status_code=400)
+        
+        db_manager = get_diagram_repository()
         
         # If specific diagram ID is requested
         if diagram_id:
-            print(f"🎯 [DIAGRAM READ] Looking for specific diagram with ID: {diagram_id}")
+            logger.debug("Looking for specific diagram with ID: %s", diagram_id)
             try:
                 diagram_id = int(diagram_id)
             except ValueError:
-                return func.HttpResponse(
-                    json.dumps({"error": "diagram_id must be a valid integer"}),
-                    status_code=400,
-                    mimetype="application/json",
-                    headers={
-                        "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                        "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                        "Access-Control-Allow-Credentials": "true"
-                    }
-                )
+                return json_response(req, {"error": "diagram_id must be a valid integer"}, status_code=400)
             
             diagram = db_manager.read_diagrams(diagram_id=diagram_id)
             if not diagram:
-                print(f"❌ [DIAGRAM READ] Diagram with ID '{diagram_id}' not found")
-                return func.HttpResponse(
-                    json.dumps({
-                        "status": "error",
-                        "message": f"Diagram with ID '{diagram_id}' not found"
-                    }),
-                    status_code=404,
-                    mimetype="application/json",
-                    headers={
-                        "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                        "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                        "Access-Control-Allow-Credentials": "true"
-                    }
-                )
+                logger.info("Diagram with ID '%s' not found", diagram_id)
+                return json_response(req, {
+                    "status": "error",
+                    "message": f"Diagram with ID '{diagram_id}' not found"
+                }, status_code=404)
             
-            print(f"✅ [DIAGRAM READ] Found diagram: {diagram['name']}")
+            logger.debug("Found diagram: %s", diagram['name'])
             response_data = {
                 "status": "success",
                 "diagram": diagram,
                 "timestamp": datetime.utcnow().isoformat() + "Z"
             }
             
-            print(f"📤 [DIAGRAM READ] Returning diagram: {json.dumps(response_data, indent=2)}")
-            return func.HttpResponse(
-                json.dumps(response_data, indent=2),
-                status_code=200,
-                mimetype="application/json",
-                headers={
-                    "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                    "Access-Control-Allow-Credentials": "true"
-                }
+            logger.debug("Returning diagram: %s", diagram_id)
+            return json_response(req, response_data, status_code=200)
+        
+        # Listings and delta syncs can be negotiated as JSON, NDJSON or MessagePack
+        media_type = negotiate_media_type(req, listing_media_types())
+        if media_type is None:
+            return json_response(req, {
+                "error": f"format must be one of: {', '.join(listing_media_types())}"
+            }, status_code=406)
+        negotiated_headers = {"Vary": "Accept, Accept-Encoding"}
+        
+        # Delta sync: only changes and deletions since the given point
+        if modified_since:
+            logger.info("Reading changes since: %s", modified_since.isoformat())
+            changes = db_manager.sync_diagrams(
+                modified_since=modified_since,
+                package_id=package_id,
+                diagram_type=diagram_type
             )
+            
+            response_data = {
+                "status": "success",
+                "count": len(changes['diagrams']),
+                "diagrams": changes['diagrams'],
+                "deleted": changes['deleted'],
+                "sync_token": changes['sync_token'],
+                "timestamp": datetime.utcnow().isoformat() + "Z"
+            }
+            
+            logger.debug("Returning %s changed and %s deleted diagrams", len(changes['diagrams']), len(changes['deleted']))
+            if media_type == NDJSON_MIMETYPE:
+                with span("serialize", format="ndjson"):
+                    lines = [dumps(diagram) for diagram in changes['diagrams']]
+                    lines.extend(dumps({**tombstone, "deleted": True}) for tombstone in changes['deleted'])
+                    body = b"".join(line + b"\n" for line in lines)
+                return bytes_response(req, body, NDJSON_MIMETYPE, headers={
+                    **negotiated_headers, SYNC_TOKEN_HEADER: changes['sync_token']
+                })
+            if media_type == MSGPACK_MIMETYPE:
+                return msgpack_response(req, response_data, headers=negotiated_headers)
+            return json_response(req, response_data, status_code=200, headers=negotiated_headers)
+        
+        if media_type == NDJSON_MIMETYPE:
+            logger.debug("Streaming diagrams as NDJSON...")
+            # Rows are fetched and encoded in lockstep, so this span covers both
+            with span("serialize", format="ndjson"):
+                body = io.BytesIO()
+                count = 0
+                for diagram in db_manager.iter_diagrams(package_id=package_id, diagram_type=diagram_type):
+                    body.write(dumps(diagram))
+                    body.write(b"\n")
+                    count += 1
+            logger.debug("Returning %s diagrams as NDJSON", count)
+            return bytes_response(req, body.getvalue(), NDJSON_MIMETYPE, headers=negotiated_headers)
         
         # Get diagrams with optional filters
-        print("📋 [DIAGRAM READ] Reading diagrams with filters...")
+        logger.debug("Reading diagrams with filters...")
         diagrams = db_manager.read_diagrams(package_id=package_id, diagram_type=diagram_type)
-        print(f"📊 [DIAGRAM READ] Found {len(diagrams)} total diagrams")
+        logger.info("Found %s total diagrams", len(diagrams))
         
         response_data = {
             "status": "success",
@@ -128,22 +160,13 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             "timestamp": datetime.utcnow().isoformat() + "Z"
         }
         
-        print(f"📤 [DIAGRAM READ] Returning {len(diagrams)} diagrams")
-        return func.HttpResponse(
-            json.dumps(response_data, indent=2),
-            status_code=200,
-            mimetype="application/json",
-            headers={
-                "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                "Access-Control-Allow-Credentials": "true"
-            }
-        )
+        logger.debug("Returning %s diagrams", len(diagrams))
+        if media_type == MSGPACK_MIMETYPE:
+            return msgpack_response(req, response_data, headers=negotiated_headers)
+        return json_response(req, response_data, status_code=200, headers=negotiated_headers)
         
     except Exception as e:
-        print(f"💥 [DIAGRAM READ] Exception occurred: {str(e)}")
-        logging.error(f'Error in diagram read: {str(e)}')
+        logger.error("Exception occurred: %s", e)
         
         error_response = {
             "status": "error",
@@ -152,14 +175,4 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             "timestamp": datetime.utcnow().isoformat() + "Z"
         }
         
-        return func.HttpResponse(
-            json.dumps(error_response, indent=2),
-            status_code=500,
-            mimetype="application/json",
-            headers={
-                "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                "Access-Control-Allow-Credentials": "true"
-            }
-        ) 
\ No newline at end of file
+        return json_response(req, error_response, status_code=500) 
\ No newline at end of file
@@ -0,0 +1,57 @@
+import azure.functions as func
+import sys
+import os
+from datetime import datetime
+
+# Add the shared directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
+from db_utils import STATS_DIMENSIONS
+from diagram_repository import get_diagram_repository
+from http_utils import json_response, http_function
+from log_utils import get_logger
+
+logger = get_logger("diagram_stats")
+
+@http_function("diagram/stats")
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Read aggregate diagram statistics from the stats materialized view.
+    
+    Query parameters:
+    - dimension: Limit the breakdown to one of diagram_type, package_id or author
+    
+    The view is refreshed by the diagram_stats_refresh timer function, so
+    results can lag writes by up to one refresh interval (see refreshed_at).
+    """
+    logger.info("Function started")
+    
+    try:
+        dimension = req.params.get('dimension')
+        logger.debug("Query parameters - dimension: %s", dimension)
+        
+        if dimension and dimension not in STATS_DIMENSIONS:
+            return json_response(req, {"error": f"dimension must be one of: {', '.join(STATS_DIMENSIONS)}"}, status_code=400)
+        
+        db_manager = get_diagram_repository()
+        stats = db_manager.read_diagram_stats(dimension=dimension)
+        
+        response_data = {
+            "status": "success",
+            "stats": stats,
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
+        
+        logger.debug("Returning stats for %s diagrams", stats['total']['count'])
+        return json_response(req, response_data, status_code=200)
+        
+    except Exception as e:
+        logger.error("Exception occurred: %s", e)
+        
+        error_response = {
+            "status": "error",
+            "message": "Failed to read diagram stats",
+            "error": str(e),
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
+        
+        return json_response(req, error_response, status_code=500)
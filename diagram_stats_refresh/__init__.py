@@ -0,0 +1,30 @@
+import azure.functions as func
+import sys
+import os
+
+# Add the shared directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
+from diagram_repository import get_diagram_repository
+from log_utils import get_logger
+
+logger = get_logger("diagram_stats_refresh")
+
+def main(mytimer: func.TimerRequest) -> None:
+    """
+    Refresh the diagram stats materialized view on a schedule.
+    
+    Runs every five minutes. The refresh is concurrent, so diagram/stats
+    keeps serving the previous snapshot while the new one is built.
+    """
+    logger.info("Function started")
+    
+    if mytimer.past_due:
+        logger.info("Timer is past due")
+    
+    try:
+        db_manager = get_diagram_repository()
+        db_manager.refresh_diagram_stats()
+        logger.info("Stats refreshed")
+    except Exception as e:
+        logger.error("Exception occurred: %s", e)
+        raise
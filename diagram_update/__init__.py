@@ -1,14 +1,17 @@
 import azure.functions as func
-import logging
-import json
 import sys
 import os
 from datetime import datetime
 
 # Add the shared directory to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
-from db_utils import DiagramDBManager
+from diagram_repository import get_diagram_repository
+from http_utils import json_response, http_function
+from log_utils import get_logger
 
+logger = get_logger("diagram_update")
+
+@http_function("diagram/update")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Update an existing diagram in the PostgreSQL database.
@@ -46,99 +49,46 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         "styleex": "updated_styleex"
     }
     """
-    print("🚀 [DIAGRAM UPDATE] Function started")
-    logging.info('Diagram update function processed a request.')
-    
-    # Handle CORS preflight requests
-    if req.method == "OPTIONS":
-        return func.HttpResponse(
-            status_code=200,
-            headers={
-                "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                "Access-Control-Allow-Credentials": "true"
-            }
-        )
+    logger.info("Function started")
     
     try:
         # Get diagram ID from query parameters
         diagram_id = req.params.get('diagram_id')
-        print(f"🆔 [DIAGRAM UPDATE] Diagram ID: {diagram_id}")
+        logger.debug("Diagram ID: %s", diagram_id)
         
         if not diagram_id:
-            print("❌ [DIAGRAM UPDATE] No diagram ID provided")
-            return func.HttpResponse(
-                json.dumps({
-                    "error": "diagram_id is required as a query parameter"
-                }),
-                status_code=400,
-                mimetype="application/json",
-                headers={
-                    "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                    "Access-Control-Allow-Credentials": "true"
-                }
-            )
+            logger.warning("No diagram ID provided")
+            return json_response(req, {
+                "error": "diagram_id is required as a query parameter"
+            }, status_code=400)
         
         # Convert diagram_id to integer
         try:
             diagram_id = int(diagram_id)
         except ValueError:
-            return func.HttpResponse(
-                json.dumps({"error": "diagram_id must be a valid integer"}),
-                status_code=400,
-                mimetype="application/json",
-                headers={
-                    "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                    "Access-Control-Allow-Credentials": "true"
-                }
-            )
+            return json_response(req, {"error": "diagram_id must be a valid integer"}, status_code=400)
         
         # Parse request body
-        print("📥 [DIAGRAM UPDATE] Parsing request body...")
+        logger.debug("Parsing request body...")
         try:
             req_body = req.get_json()
-            print(f"📄 [DIAGRAM UPDATE] Request body: {json.dumps(req_body, indent=2)}")
+            logger.payload("Request body", req_body)
         except ValueError as e:
-            print(f"❌ [DIAGRAM UPDATE] Invalid JSON: {str(e)}")
-            return func.HttpResponse(
-                json.dumps({"error": "Invalid JSON in request body"}),
-                status_code=400,
-                mimetype="application/json",
-                headers={
-                    "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                    "Access-Control-Allow-Credentials": "true"
-                }
-            )
+            logger.warning("Invalid JSON: %s", e)
+            return json_response(req, {"error": "Invalid JSON in request body"}, status_code=400)
         
         # Update diagram
-        print(f"🔄 [DIAGRAM UPDATE] Updating diagram with ID: {diagram_id}")
-        db_manager = DiagramDBManager()
+        logger.debug("Updating diagram with ID: %s", diagram_id)
+        db_manager = get_diagram_repository()
         updated_diagram = db_manager.update_diagram(diagram_id, req_body)
         
         if not updated_diagram:
-            print(f"❌ [DIAGRAM UPDATE] Diagram with ID '{diagram_id}' not found")
-            return func.HttpResponse(
-                json.dumps({
-                    "error": f"Diagram with ID '{diagram_id}' not found"
-                }),
-                status_code=404,
-                mimetype="application/json",
-                headers={
-                    "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                    "Access-Control-Allow-Credentials": "true"
-                }
-            )
+            logger.info("Diagram with ID '%s' not found", diagram_id)
+            return json_response(req, {
+                "error": f"Diagram with ID '{diagram_id}' not found"
+            }, status_code=404)
         
-        print(f"✅ [DIAGRAM UPDATE] Diagram updated successfully: {updated_diagram['name']}")
+        logger.info("Diagram updated successfully: %s", updated_diagram['name'])
         
         # Return success response
         response_data = {
@@ -148,22 +98,11 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             "timestamp": updated_diagram['modifieddate']
         }
         
-        print(f"📤 [DIAGRAM UPDATE] Returning success response: {json.dumps(response_data, indent=2)}")
-        return func.HttpResponse(
-            json.dumps(response_data, indent=2),
-            status_code=200,
-            mimetype="application/json",
-            headers={
-                "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                "Access-Control-Allow-Credentials": "true"
-            }
-        )
+        logger.debug("Returning success response for diagram: %s", diagram_id)
+        return json_response(req, response_data, status_code=200)
         
     except Exception as e:
-        print(f"💥 [DIAGRAM UPDATE] Exception occurred: {str(e)}")
-        logging.error(f'Error in diagram update: {str(e)}')
+        logger.error("Exception occurred: %s", e)
         
         error_response = {
             "status": "error",
@@ -172,14 +111,4 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             "timestamp": datetime.utcnow().isoformat() + "Z"
         }
         
-        return func.HttpResponse(
-            json.dumps(error_response, indent=2),
-            status_code=500,
-            mimetype="application/json",
-            headers={
-                "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                "Access-Control-Allow-Credentials": "true"
-            }
-        ) 
\ No newline at end of file
+        return json_response(req, error_response, status_code=500) 
\ No newline at end of file
@@ -0,0 +1,103 @@
+import azure.functions as func
+import sys
+import os
+import re
+from datetime import datetime, timedelta
+
+# Add the shared directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
+from health_log_utils import (
+    HEALTH_ROLLUP_RETENTION_DAYS, ROLLUP_RESOLUTIONS,
+    bucket_start, format_timestamp, parse_timestamp, read_history
+)
+from http_utils import json_response, http_function
+from log_utils import get_logger
+
+logger = get_logger("health_history")
+
+# Window returned when neither window nor since is given
+DEFAULT_WINDOWS = {
+    "minute": timedelta(hours=1),
+    "hour": timedelta(hours=24),
+}
+
+WINDOW_UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+
+@http_function("health/history")
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    CPU, memory and database-status rollups of past health checks.
+    
+    Query parameters:
+    - resolution: minute (default) or hour
+    - window: Length of the window ending now, e.g. 90m, 24h or 7d
+    - since, until: ISO-8601 bounds of the window, instead of window
+    
+    Each bucket reports min/avg/max CPU and memory percent and the count of
+    each database status. Buckets come from the rollup files maintained by
+    the health log writer; the health log itself is never read.
+    """
+    logger.info("Function started")
+    
+    try:
+        resolution = req.params.get('resolution', 'minute')
+        window = req.params.get('window')
+        since = req.params.get('since')
+        until = req.params.get('until')
+        logger.debug("Query parameters - resolution: %s, window: %s, since: %s, until: %s", resolution, window, since, until)
+        
+        if resolution not in ROLLUP_RESOLUTIONS:
+            return json_response(req, {"error": f"resolution must be one of: {', '.join(ROLLUP_RESOLUTIONS)}"}, status_code=400)
+        
+        retention = timedelta(days=HEALTH_ROLLUP_RETENTION_DAYS)
+        try:
+            end = parse_timestamp(until) if until else datetime.utcnow()
+            if since:
+                start = parse_timestamp(since)
+            elif window:
+                match = re.fullmatch(r"(\d+)([mhd])", window)
+                if not match:
+                    raise ValueError()
+                length = timedelta(**{WINDOW_UNITS[match.group(2)]: int(match.group(1))})
+                if length > retention:
+                    return json_response(req, {"error": f"window must be at most {HEALTH_ROLLUP_RETENTION_DAYS}d"}, status_code=400)
+                start = end - length
+            else:
+                start = end - DEFAULT_WINDOWS[resolution]
+            # Nothing older than the rollup retention exists
+            start = max(start, end - retention)
+        except (ValueError, OverflowError):
+            # OverflowError: a window or timestamp beyond the datetime range
+            return json_response(req, {"error": "since and until must be ISO-8601 timestamps and window a number followed by m, h or d"}, status_code=400)
+        
+        if start >= end:
+            return json_response(req, {"error": "since must be before until"}, status_code=400)
+        
+        start = bucket_start(start, resolution)
+        
+        buckets = read_history(resolution, start, end)
+        
+        response_data = {
+            "status": "success",
+            "resolution": resolution,
+            "from": format_timestamp(start),
+            "to": format_timestamp(end),
+            "count": len(buckets),
+            "buckets": buckets,
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
+        
+        logger.debug("Returning %s buckets", len(buckets))
+        return json_response(req, response_data, status_code=200)
+        
+    except Exception as e:
+        logger.error("Exception occurred: %s", e)
+        
+        error_response = {
+            "status": "error",
+            "message": "Failed to read health history",
+            "error": str(e),
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
+        
+        return json_response(req, error_response, status_code=500)
@@ -0,0 +1,24 @@
+from datetime import datetime
+import os
+import sys
+
+import azure.functions as func
+
+# Add the shared directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
+from http_utils import json_response, http_function
+from log_utils import get_logger
+
+logger = get_logger("health_live")
+
+@http_function("health/live")
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Liveness probe: the worker is up and answering. Performs no I/O so it
+    stays cheap however often the platform polls it.
+    """
+    return json_response(req, {
+        "status": "alive",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "service": "Friday APIC"
+    }, status_code=200)
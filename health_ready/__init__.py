@@ -0,0 +1,29 @@
+import os
+import sys
+
+import azure.functions as func
+
+# Add the shared directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
+from health_utils import readiness_cache
+from http_utils import json_response, http_function
+from log_utils import get_logger
+
+logger = get_logger("health_ready")
+
+@http_function("health/ready")
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Readiness probe: database and file share reachable. Served from the
+    per-worker readiness cache, which is refreshed in the background.
+    """
+    report, age, stale = readiness_cache.get()
+    
+    response = dict(report)
+    response["age_seconds"] = round(age, 3)
+    response["stale"] = stale
+    
+    status_code = 200 if report["status"] == "ready" else 503
+    if status_code != 200:
+        logger.warning("Not ready: %s", report.get("error") or report.get("checks"))
+    return json_response(req, response, status_code=status_code)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+One-off schema migration for the diagram functions.
+
+Creates the stats materialized view, the tombstone and outbox tables and
+the indexes the diagram queries rely on. Request paths never run DDL, so
+apply this before deploying a release that needs new objects. Every
+statement is idempotent; indexes are built with CREATE INDEX CONCURRENTLY
+so t_diagram stays writable during the build, and an index left invalid
+by an interrupted build is dropped and built again.
+
+The target database is always explicit: --dsn or MIGRATION_DATABASE_URL
+(a libpq connection string or URI).
+
+Examples:
+    python migrations/apply_schema.py --dsn "host=localhost dbname=architecture user=postgres"
+"""
+
+import argparse
+import os
+import time
+
+import psycopg
+
+# Objects created in one transaction before the indexes
+SCHEMA_STATEMENTS = [
+    # Per-dimension aggregates served by diagram/stats. GROUPING SETS produce
+    # one row per diagram_type, package_id and author plus a grand total.
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_diagram_stats AS
+    SELECT
+        CASE
+            WHEN GROUPING(diagram_type) = 0 THEN 'diagram_type'
+            WHEN GROUPING(package_id) = 0 THEN 'package_id'
+            WHEN GROUPING(author) = 0 THEN 'author'
+            ELSE 'total'
+        END AS dimension,
+        CASE
+            WHEN GROUPING(diagram_type) = 0 THEN diagram_type::text
+            WHEN GROUPING(package_id) = 0 THEN package_id::text
+            WHEN GROUPING(author) = 0 THEN author::text
+        END AS dim_value,
+        COUNT(*) AS diagram_count,
+        MAX(modifieddate) AS last_modified,
+        now() AS refreshed_at
+    FROM public.t_diagram
+    GROUP BY GROUPING SETS ((diagram_type), (package_id), (author), ())
+    """,
+    # One row per deleted diagram so delta sync can report deletions
+    """
+    CREATE TABLE IF NOT EXISTS public.t_diagram_tombstone (
+        diagram_id integer PRIMARY KEY,
+        package_id integer,
+        diagram_type text,
+        ea_guid text,
+        deleteddate timestamp NOT NULL DEFAULT (now() AT TIME ZONE 'UTC')
+    )
+    """,
+    # Transactional outbox: one compact row per write, read by diagram/changes.
+    # txid lets readers hold back rows from transactions that are still open.
+    """
+    CREATE TABLE IF NOT EXISTS public.t_diagram_outbox (
+        change_id bigserial PRIMARY KEY,
+        diagram_id integer NOT NULL,
+        operation text NOT NULL,
+        package_id integer,
+        diagram_type text,
+        ea_guid text,
+        changed_fields text[],
+        changedate timestamp NOT NULL DEFAULT (now() AT TIME ZONE 'UTC'),
+        txid xid8 NOT NULL DEFAULT pg_current_xact_id()
+    )
+    """,
+    # Tables created before the defaults above used LOCALTIMESTAMP, which
+    # follows the session TimeZone; timestamps are naive UTC throughout
+    """
+    ALTER TABLE public.t_diagram_tombstone
+    ALTER COLUMN deleteddate SET DEFAULT (now() AT TIME ZONE 'UTC')
+    """,
+    """
+    ALTER TABLE public.t_diagram_outbox
+    ALTER COLUMN changedate SET DEFAULT (now() AT TIME ZONE 'UTC')
+    """,
+]
+
+# (name, definition, unique) for each index, built one at a time outside a
+# transaction block with CREATE [UNIQUE] INDEX CONCURRENTLY IF NOT EXISTS
+INDEX_STATEMENTS = [
+    # REFRESH ... CONCURRENTLY requires a unique index covering every row
+    ("ux_mv_diagram_stats", "ON public.mv_diagram_stats (dimension, dim_value)", True),
+    # Serves diagram/read?modified_since=... as an index range scan
+    ("ix_t_diagram_modifieddate", "ON public.t_diagram (modifieddate, diagram_id)", False),
+    # Filtered listings (read_diagrams, NDJSON streams) come back in
+    # createddate order straight from the index, with no sort step
+    ("ix_t_diagram_package_created", "ON public.t_diagram (package_id, createddate DESC)", False),
+    ("ix_t_diagram_type_created", "ON public.t_diagram (diagram_type, createddate DESC)", False),
+    ("ix_t_diagram_package_type_created", "ON public.t_diagram (package_id, diagram_type, createddate DESC)", False),
+    # Filtered full syncs (no modified_since) read in modifieddate order
+    ("ix_t_diagram_package_modified", "ON public.t_diagram (package_id, modifieddate, diagram_id)", False),
+    ("ix_t_diagram_type_modified", "ON public.t_diagram (diagram_type, modifieddate, diagram_id)", False),
+    # Per-package exports stream in diagram_id order
+    ("ix_t_diagram_package_diagram", "ON public.t_diagram (package_id, diagram_id)", False),
+    ("ix_t_diagram_tombstone_deleteddate", "ON public.t_diagram_tombstone (deleteddate)", False),
+    # Finds the first row of a still-open transaction for read_changes
+    ("ix_t_diagram_outbox_txid", "ON public.t_diagram_outbox (txid)", False),
+]
+
+
+def _index_is_valid(cursor, name):
+    """True or False for an existing public index, None when it is missing"""
+    cursor.execute("""
+        SELECT i.indisvalid
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relname = %s
+    """, (name,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def apply_schema(conn):
+    """Create the missing schema objects on conn and return the indexes built.
+    
+    Commits any open transaction first; conn is left in its previous
+    autocommit mode.
+    """
+    conn.commit()
+    cursor = conn.cursor()
+    for statement in SCHEMA_STATEMENTS:
+        cursor.execute(statement)
+    conn.commit()
+    
+    built = []
+    autocommit = conn.autocommit
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+    conn.autocommit = True
+    try:
+        for name, definition, unique in INDEX_STATEMENTS:
+            valid = _index_is_valid(cursor, name)
+            if valid:
+                continue
+            if valid is False:
+                # Left behind by an interrupted concurrent build; IF NOT
+                # EXISTS would keep it and the planner never uses it
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS public.{name}")
+            cursor.execute(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}"
+            )
+            built.append(name)
+    finally:
+        conn.autocommit = autocommit
+    return built
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the diagram schema objects")
+    parser.add_argument("--dsn", default=os.environ.get("MIGRATION_DATABASE_URL"),
+                        help="libpq connection string or URI of the target database (default: MIGRATION_DATABASE_URL)")
+    
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("a target database is required: pass --dsn or set MIGRATION_DATABASE_URL")
+    
+    started = time.perf_counter()
+    conn = psycopg.connect(args.dsn)
+    try:
+        built = apply_schema(conn)
+    finally:
+        conn.close()
+    print(f"Schema up to date; built {len(built)} index(es){': ' + ', '.join(built) if built else ''} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
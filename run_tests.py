@@ -26,11 +26,34 @@ def run_command(command, description):
         return False
 
 
+def run_perf(args):
+    """Run the microbenchmarks and fail on regressions against the baseline."""
+    cmd_parts = ["python", os.path.join("tests", "perf", "run_benchmarks.py")]
+    
+    if args.threshold is not None:
+        cmd_parts.append(f"--threshold {args.threshold}")
+    
+    if args.quick:
+        cmd_parts.append("--quick")
+    
+    if args.update_baseline:
+        cmd_parts.append("--update-baseline")
+    
+    success = run_command(" ".join(cmd_parts), "Performance Benchmarks")
+    
+    if success:
+        print("\n🎉 No performance regressions!")
+        sys.exit(0)
+    else:
+        print("\n💥 Performance regressed against the baseline!")
+        sys.exit(1)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Test runner for Friday-APIC Azure Function App")
     parser.add_argument(
         "--type", 
-        choices=["unit", "functional", "regression", "all"], 
+        choices=["unit", "functional", "regression", "integration", "perf", "all"], 
         default="all",
         help="Type of tests to run"
     )
@@ -49,9 +72,28 @@ def main():
         action="store_true",
         help="Generate HTML coverage report"
     )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        help="Allowed perf slowdown over the baseline, as a fraction (perf only)"
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Skip the largest benchmark input sizes (perf only)"
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store the benchmark results as the new baseline (perf only)"
+    )
     
     args = parser.parse_args()
     
+    if args.type == "perf":
+        run_perf(args)
+        return
+    
     # Build pytest command
     cmd_parts = ["python", "-m", "pytest"]
     
@@ -0,0 +1,71 @@
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+ARROW_STREAM_MIMETYPE = "application/vnd.apache.arrow.stream"
+ARROW_FILE_MIMETYPE = "application/vnd.apache.arrow.file"
+
+
+def _diagram_types():
+    """Arrow type for each t_diagram column"""
+    return {
+        'diagram_id': pa.int64(),
+        'package_id': pa.int64(),
+        'parentid': pa.int64(),
+        'diagram_type': pa.string(),
+        'name': pa.string(),
+        'version': pa.string(),
+        'author': pa.string(),
+        'showdetails': pa.int32(),
+        'notes': pa.string(),
+        'stereotype': pa.string(),
+        'attpub': pa.int32(),
+        'attpri': pa.int32(),
+        'attpro': pa.int32(),
+        'orientation': pa.string(),
+        'cx': pa.int32(),
+        'cy': pa.int32(),
+        'scale': pa.int32(),
+        'createddate': pa.timestamp('us'),
+        'modifieddate': pa.timestamp('us'),
+        'htmlpath': pa.string(),
+        'showforeign': pa.int32(),
+        'showborder': pa.int32(),
+        'showpackagecontents': pa.int32(),
+        'pdata': pa.string(),
+        'locked': pa.int32(),
+        'ea_guid': pa.string(),
+        'tpos': pa.int32(),
+        'swimlanes': pa.string(),
+        'styleex': pa.string(),
+    }
+
+
+def diagram_schema(columns):
+    """Arrow schema for a projection of t_diagram columns"""
+    types = _diagram_types()
+    return pa.schema([pa.field(column, types[column]) for column in columns])
+
+
+def encode_record_batches(row_batches, columns, file_format=False):
+    """Encode batches of row tuples as Arrow IPC bytes, building each batch column-wise"""
+    schema = diagram_schema(columns)
+    sink = pa.BufferOutputStream()
+    
+    if file_format:
+        writer = pa.ipc.new_file(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    
+    with writer:
+        for rows in row_batches:
+            # Transpose the cursor rows once so each column becomes one array
+            column_values = list(zip(*rows))
+            arrays = [
+                pa.array(values, type=field.type)
+                for values, field in zip(column_values, schema)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+    
+    return sink.getvalue().to_pybytes()
@@ -1,29 +1,139 @@
-try:
-    import psycopg
-    print("✅ psycopg is installed")
-except ImportError:
-    print("❌ psycopg is NOT installed")
+import base64
 import json
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import os
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".python_packages/lib/site-packages"))
 
+from log_utils import get_logger
+from trace_utils import span
+
+logger = get_logger("db_utils")
+
+try:
+    import psycopg
+except ImportError:
+    logger.warning("psycopg is NOT installed")
+
+STATS_DIMENSIONS = ('diagram_type', 'package_id', 'author')
+
+# t_diagram columns in the order every SELECT in this module returns them
+DIAGRAM_COLUMNS = (
+    'diagram_id', 'package_id', 'parentid', 'diagram_type', 'name', 'version',
+    'author', 'showdetails', 'notes', 'stereotype', 'attpub', 'attpri', 'attpro',
+    'orientation', 'cx', 'cy', 'scale', 'createddate', 'modifieddate', 'htmlpath',
+    'showforeign', 'showborder', 'showpackagecontents', 'pdata', 'locked', 'ea_guid',
+    'tpos', 'swimlanes', 'styleex'
+)
+
+# Columns a client may set on create/update, in INSERT column order
+EDITABLE_COLUMNS = (
+    'package_id', 'parentid', 'diagram_type', 'name', 'version', 'author',
+    'showdetails', 'notes', 'stereotype', 'attpub', 'attpri', 'attpro',
+    'orientation', 'cx', 'cy', 'scale', 'htmlpath', 'showforeign', 'showborder',
+    'showpackagecontents', 'pdata', 'locked', 'ea_guid', 'tpos', 'swimlanes', 'styleex'
+)
+
+# Values create_diagram stores for editable columns missing from the request
+DIAGRAM_DEFAULTS = {
+    'package_id': 1,
+    'parentid': 0,
+    'version': '1.0',
+    'showdetails': 0,
+    'attpub': 1,
+    'attpri': 1,
+    'attpro': 1,
+    'orientation': 'P',
+    'cx': 0,
+    'cy': 0,
+    'scale': 100,
+    'showforeign': 1,
+    'showborder': 1,
+    'showpackagecontents': 1,
+    'locked': 0
+}
+
+# Batch bounds for diagram/changes
+CHANGES_DEFAULT_LIMIT = int(os.environ.get("DIAGRAM_CHANGES_DEFAULT_LIMIT", "1000"))
+CHANGES_MAX_LIMIT = int(os.environ.get("DIAGRAM_CHANGES_MAX_LIMIT", "10000"))
+
+# Transaction-scoped advisory lock taken before each outbox insert, so
+# change_ids are handed out in commit order. It is global because the feed
+# is one sequence, but writers take it as their last statement before
+# commit, so they serialise only over the outbox insert and the commit.
+OUTBOX_LOCK_KEY = 0x6469616772616D  # "diagram"
+
+# Rows fetched per round trip when streaming listings from a server-side cursor
+STREAM_BATCH_SIZE = int(os.environ.get("DIAGRAM_STREAM_BATCH_SIZE", "500"))
+
+# Most rows in one diagram/export response. The Arrow body is built in
+# memory, so larger exports are read page by page with ?after=
+EXPORT_MAX_ROWS = int(os.environ.get("DIAGRAM_EXPORT_MAX_ROWS", "100000"))
+
+SYNC_TOKEN_PREFIX = "v1."
+
+# Transaction start time as naive UTC, whatever the session TimeZone. Sync
+# tokens, modifieddate, deleteddate and changedate are all stored and
+# compared in this form; LOCALTIMESTAMP and CURRENT_TIMESTAMP written to a
+# timestamp column would follow the connection's TimeZone instead.
+UTC_NOW_SQL = "(now() AT TIME ZONE 'UTC')"
+
+# Rewinds each sync window. The token is the sync transaction's start
+# time, but modifieddate and deleteddate record when the writing
+# transaction started; a write that started before the token and committed
+# after the sync's snapshot would otherwise fall behind the next token and
+# never be returned. Rows in the overlap are sent again, so clients must
+# apply upserts and deletions idempotently. The window must exceed the
+# longest write transaction.
+SYNC_OVERLAP_SECONDS = float(os.environ.get("DIAGRAM_SYNC_OVERLAP_SECONDS", "60"))
+
+
+def encode_sync_token(timestamp):
+    """Encode a sync high-water mark as an opaque token"""
+    encoded = base64.urlsafe_b64encode(timestamp.isoformat().encode('utf-8')).decode('ascii')
+    return SYNC_TOKEN_PREFIX + encoded.rstrip('=')
+
+
+def decode_sync_token(value):
+    """Parse a sync token or an ISO-8601 timestamp into a naive UTC datetime"""
+    if value.startswith(SYNC_TOKEN_PREFIX):
+        encoded = value[len(SYNC_TOKEN_PREFIX):]
+        encoded += '=' * (-len(encoded) % 4)
+        try:
+            value = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8')
+        except Exception:
+            raise ValueError("modified_since token is malformed")
+    
+    timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
 class DiagramDBManager:
     def __init__(self):
-        # Build connection string in the format recommended by Microsoft
+        # Connection parameters in the format recommended by Microsoft; each
+        # can be overridden to point the app at another server (e.g. a local
+        # PostgreSQL for load testing)
         password = os.environ.get("POSTGRES_PASSWORD", "Moine101")
-        self.connection_string = f"host=pg-frdypgdb-prd-cac.postgres.database.azure.com port=5432 dbname=Architecture user=nlallier password={password} sslmode=require"
+        self.connection_string = {
+            "host": os.environ.get("POSTGRES_HOST", "pg-frdypgdb-prd-cac.postgres.database.azure.com"),
+            "port": int(os.environ.get("POSTGRES_PORT", "5432")),
+            "dbname": os.environ.get("POSTGRES_DB", "Architecture"),
+            "user": os.environ.get("POSTGRES_USER", "nlallier"),
+            "password": password,
+            "sslmode": os.environ.get("POSTGRES_SSLMODE", "require"),
+        }
     
     def _get_connection(self):
         """Get a database connection"""
         try:
-            conn = psycopg.connect(**self.connection_string)
-            print(f"Database connection established successfully")
+            with span("db_connect"):
+                conn = psycopg.connect(**self.connection_string)
+            logger.debug("Database connection established successfully")
             return conn
         except Exception as e:
-            print(f"Error connecting to database: {str(e)}")
+            logger.error("Error connecting to database: %s", e)
             raise
     
     def create_diagram(self, diagram_data):
@@ -34,15 +144,17 @@ class DiagramDBManager:
             cursor = conn.cursor()
             
             # Build insert query with all fields
-            insert_sql = """
+            insert_sql = f"""
             INSERT INTO public.t_diagram (
                 package_id, parentid, diagram_type, name, version, author, 
                 showdetails, notes, stereotype, attpub, attpri, attpro, 
                 orientation, cx, cy, scale, htmlpath, showforeign, showborder, 
-                showpackagecontents, pdata, locked, ea_guid, tpos, swimlanes, styleex
+                showpackagecontents, pdata, locked, ea_guid, tpos, swimlanes, styleex,
+                createddate, modifieddate
             ) VALUES (
                 %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                {UTC_NOW_SQL}, {UTC_NOW_SQL}
             ) RETURNING diagram_id, package_id, parentid, diagram_type, name, version, 
                 author, showdetails, notes, stereotype, attpub, attpri, attpro, 
                 orientation, cx, cy, scale, createddate, modifieddate, htmlpath, 
@@ -51,38 +163,13 @@ class DiagramDBManager:
             """
             
             # Prepare values with defaults
-            values = (
-                diagram_data.get('package_id', 1),
-                diagram_data.get('parentid', 0),
-                diagram_data.get('diagram_type'),
-                diagram_data.get('name'),
-                diagram_data.get('version', '1.0'),
-                diagram_data.get('author'),
-                diagram_data.get('showdetails', 0),
-                diagram_data.get('notes'),
-                diagram_data.get('stereotype'),
-                diagram_data.get('attpub', 1),
-                diagram_data.get('attpri', 1),
-                diagram_data.get('attpro', 1),
-                diagram_data.get('orientation', 'P'),
-                diagram_data.get('cx', 0),
-                diagram_data.get('cy', 0),
-                diagram_data.get('scale', 100),
-                diagram_data.get('htmlpath'),
-                diagram_data.get('showforeign', 1),
-                diagram_data.get('showborder', 1),
-                diagram_data.get('showpackagecontents', 1),
-                diagram_data.get('pdata'),
-                diagram_data.get('locked', 0),
-                diagram_data.get('ea_guid'),
-                diagram_data.get('tpos'),
-                diagram_data.get('swimlanes'),
-                diagram_data.get('styleex')
-            )
-            
-            cursor.execute(insert_sql, values)
-            result = cursor.fetchone()
-            conn.commit()
+            values = tuple(diagram_data.get(column, DIAGRAM_DEFAULTS.get(column)) for column in EDITABLE_COLUMNS)
+            
+            with span("db_query", operation="create"):
+                cursor.execute(insert_sql, values)
+                result = cursor.fetchone()
+                self._record_change(cursor, 'create', result[0], result[1], result[3], result[25])
+                conn.commit()
             
             # Build response dictionary
             diagram = {
@@ -117,11 +204,11 @@ class DiagramDBManager:
                 'styleex': result[28]
             }
             
-            print(f"Diagram created successfully with ID: {diagram['diagram_id']}")
+            logger.info("Diagram created successfully with ID: %s", diagram['diagram_id'])
             return diagram
             
         except Exception as e:
-            print(f"Error creating diagram: {str(e)}")
+            logger.error("Error creating diagram: %s", e)
             if conn:
                 conn.rollback()
             raise
@@ -146,122 +233,264 @@ class DiagramDBManager:
                     tpos, swimlanes, styleex
                 FROM public.t_diagram WHERE diagram_id = %s
                 """
-                cursor.execute(select_sql, (diagram_id,))
-                result = cursor.fetchone()
+                with span("db_query", operation="read"):
+                    cursor.execute(select_sql, (diagram_id,))
+                    result = cursor.fetchone()
                 
                 if result:
                     diagram = self._build_diagram_dict(result)
-                    print(f"Diagram found: {diagram_id}")
+                    logger.debug("Diagram found: %s", diagram_id)
                     return diagram
                 else:
-                    print(f"Diagram not found: {diagram_id}")
+                    logger.info("Diagram not found: %s", diagram_id)
                     return None
             else:
                 # Read diagrams with optional filters
-                where_conditions = []
-                params = []
-                
-                if package_id is not None:
-                    where_conditions.append("package_id = %s")
-                    params.append(package_id)
-                
-                if diagram_type:
-                    where_conditions.append("diagram_type = %s")
-                    params.append(diagram_type)
+                select_sql, params = self._build_list_query(package_id, diagram_type)
                 
-                where_clause = ""
-                if where_conditions:
-                    where_clause = "WHERE " + " AND ".join(where_conditions)
-                
-                select_sql = f"""
-                SELECT diagram_id, package_id, parentid, diagram_type, name, version, 
-                    author, showdetails, notes, stereotype, attpub, attpri, attpro, 
-                    orientation, cx, cy, scale, createddate, modifieddate, htmlpath, 
-                    showforeign, showborder, showpackagecontents, pdata, locked, ea_guid, 
-                    tpos, swimlanes, styleex
-                FROM public.t_diagram
-                {where_clause}
-                ORDER BY createddate DESC
-                """
-                
-                cursor.execute(select_sql, params)
-                results = cursor.fetchall()
+                with span("db_query", operation="list"):
+                    cursor.execute(select_sql, params)
+                    results = cursor.fetchall()
                 
                 diagrams = []
-                for result in results:
-                    diagram = self._build_diagram_dict(result)
-                    diagrams.append(diagram)
+                with span("build_dicts", rows=len(results)):
+                    for result in results:
+                        diagram = self._build_diagram_dict(result)
+                        diagrams.append(diagram)
                 
-                print(f"Found {len(diagrams)} diagrams")
+                logger.debug("Found %s diagrams", len(diagrams))
                 return diagrams
                 
         except Exception as e:
-            print(f"Error reading diagrams: {str(e)}")
+            logger.error("Error reading diagrams: %s", e)
             raise
         finally:
             if conn:
                 conn.close()
     
-    def update_diagram(self, diagram_id, update_data):
-        """Update an existing diagram"""
+    def iter_diagrams(self, package_id=None, diagram_type=None):
+        """Yield diagrams one at a time from a server-side cursor"""
         conn = None
         try:
             conn = self._get_connection()
-            cursor = conn.cursor()
+            select_sql, params = self._build_list_query(package_id, diagram_type)
             
-            # Check if diagram exists
-            check_sql = "SELECT diagram_id FROM public.t_diagram WHERE diagram_id = %s"
-            cursor.execute(check_sql, (diagram_id,))
-            if not cursor.fetchone():
-                print(f"Diagram not found: {diagram_id}")
-                return None
+            # A named cursor keeps the result set on the server and pulls it
+            # in batches, so memory stays flat however many rows match
+            with conn.cursor(name="diagram_stream") as cursor:
+                cursor.itersize = STREAM_BATCH_SIZE
+                with span("db_query", operation="stream"):
+                    cursor.execute(select_sql, params)
+                count = 0
+                for result in cursor:
+                    count += 1
+                    yield self._build_diagram_dict(result)
+            conn.commit()
             
-            # Build update query dynamically
-            update_fields = []
+            logger.debug("Streamed %s diagrams", count)
+            
+        except Exception as e:
+            logger.error("Error streaming diagrams: %s", e)
+            raise
+        finally:
+            if conn:
+                conn.close()
+    
+    def iter_diagram_batches(self, columns=DIAGRAM_COLUMNS, package_id=None, diagram_type=None,
+                             modified_since=None, batch_size=STREAM_BATCH_SIZE, after_id=None, limit=None):
+        """Yield raw row tuples for the given columns in batches from a server-side cursor.
+        
+        after_id and limit read one page: at most limit rows with a
+        diagram_id above after_id.
+        """
+        unknown = [column for column in columns if column not in DIAGRAM_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        
+        conn = None
+        try:
+            conn = self._get_connection()
+            
+            where_conditions = []
             params = []
+            if package_id is not None:
+                where_conditions.append("package_id = %s")
+                params.append(package_id)
+            if diagram_type:
+                where_conditions.append("diagram_type = %s")
+                params.append(diagram_type)
+            if modified_since is not None:
+                where_conditions.append("modifieddate > %s")
+                params.append(modified_since)
+            if after_id is not None:
+                where_conditions.append("diagram_id > %s")
+                params.append(after_id)
             
-            # Define all updatable fields
-            updatable_fields = [
-                'package_id', 'parentid', 'diagram_type', 'name', 'version', 'author',
-                'showdetails', 'notes', 'stereotype', 'attpub', 'attpri', 'attpro',
-                'orientation', 'cx', 'cy', 'scale', 'htmlpath', 'showforeign', 'showborder',
-                'showpackagecontents', 'pdata', 'locked', 'ea_guid', 'tpos', 'swimlanes', 'styleex'
-            ]
+            where_clause = ""
+            if where_conditions:
+                where_clause = "WHERE " + " AND ".join(where_conditions)
             
-            for field in updatable_fields:
-                if field in update_data and update_data[field] is not None:
-                    update_fields.append(f"{field} = %s")
-                    params.append(update_data[field])
+            limit_clause = ""
+            if limit is not None:
+                limit_clause = "LIMIT %s"
+                params.append(limit)
             
-            if not update_fields:
-                print("No valid fields to update")
-                return None
+            # Column names are validated against DIAGRAM_COLUMNS above
+            select_sql = f"""
+            SELECT {', '.join(columns)}
+            FROM public.t_diagram
+            {where_clause}
+            ORDER BY diagram_id
+            {limit_clause}
+            """
             
-            # Add modifieddate timestamp
-            update_fields.append("modifieddate = CURRENT_TIMESTAMP")
-            params.append(diagram_id)
+            with conn.cursor(name="diagram_export") as cursor:
+                with span("db_query", operation="export"):
+                    cursor.execute(select_sql, params)
+                total = 0
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    total += len(rows)
+                    yield rows
+            conn.commit()
+            
+            logger.debug("Exported %s diagrams", total)
+            
+        except Exception as e:
+            logger.error("Error exporting diagrams: %s", e)
+            raise
+        finally:
+            if conn:
+                conn.close()
+    
+    def sync_diagrams(self, modified_since=None, package_id=None, diagram_type=None):
+        """Read diagrams changed and deleted since a point in time, plus a new sync token"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            # Upserts, tombstones and the new token must come from one snapshot
+            conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+            cursor = conn.cursor()
+            
+            cursor.execute(f"SELECT {UTC_NOW_SQL}")
+            sync_point = cursor.fetchone()[0]
+            
+            since = None
+            if modified_since is not None:
+                since = modified_since - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+            
+            where_conditions = []
+            params = []
+            if since is not None:
+                where_conditions.append("modifieddate > %s")
+                params.append(since)
+            if package_id is not None:
+                where_conditions.append("package_id = %s")
+                params.append(package_id)
+            if diagram_type:
+                where_conditions.append("diagram_type = %s")
+                params.append(diagram_type)
             
-            update_sql = f"""
-            UPDATE public.t_diagram 
-            SET {', '.join(update_fields)}
-            WHERE diagram_id = %s
-            RETURNING diagram_id, package_id, parentid, diagram_type, name, version, 
+            where_clause = ""
+            if where_conditions:
+                where_clause = "WHERE " + " AND ".join(where_conditions)
+            
+            select_sql = f"""
+            SELECT diagram_id, package_id, parentid, diagram_type, name, version, 
                 author, showdetails, notes, stereotype, attpub, attpri, attpro, 
                 orientation, cx, cy, scale, createddate, modifieddate, htmlpath, 
                 showforeign, showborder, showpackagecontents, pdata, locked, ea_guid, 
                 tpos, swimlanes, styleex
+            FROM public.t_diagram
+            {where_clause}
+            ORDER BY modifieddate, diagram_id
             """
+            with span("db_query", operation="sync"):
+                cursor.execute(select_sql, params)
+                results = cursor.fetchall()
+            with span("build_dicts", rows=len(results)):
+                diagrams = [self._build_diagram_dict(result) for result in results]
             
-            cursor.execute(update_sql, params)
-            result = cursor.fetchone()
+            # A full sync (no modified_since) replaces the client copy, so
+            # tombstones are only relevant to incremental calls
+            deleted = []
+            if since is not None:
+                tombstone_conditions = ["deleteddate > %s"]
+                tombstone_params = [since]
+                if package_id is not None:
+                    tombstone_conditions.append("package_id = %s")
+                    tombstone_params.append(package_id)
+                if diagram_type:
+                    tombstone_conditions.append("diagram_type = %s")
+                    tombstone_params.append(diagram_type)
+                
+                tombstone_sql = f"""
+                SELECT diagram_id, ea_guid, deleteddate
+                FROM public.t_diagram_tombstone
+                WHERE {' AND '.join(tombstone_conditions)}
+                ORDER BY deleteddate, diagram_id
+                """
+                with span("db_query", operation="tombstones"):
+                    cursor.execute(tombstone_sql, tombstone_params)
+                    tombstones = cursor.fetchall()
+                deleted = [
+                    {
+                        'diagram_id': result[0],
+                        'ea_guid': result[1],
+                        'deleteddate': result[2].isoformat() if result[2] else None
+                    }
+                    for result in tombstones
+                ]
             conn.commit()
             
+            logger.debug("Sync found %s upserts and %s deletions", len(diagrams), len(deleted))
+            return {
+                'diagrams': diagrams,
+                'deleted': deleted,
+                'sync_token': encode_sync_token(sync_point)
+            }
+            
+        except Exception as e:
+            logger.error("Error syncing diagrams: %s", e)
+            raise
+        finally:
+            if conn:
+                conn.close()
+    
+    def update_diagram(self, diagram_id, update_data):
+        """Update an existing diagram"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            # Check if diagram exists
+            check_sql = "SELECT diagram_id FROM public.t_diagram WHERE diagram_id = %s"
+            cursor.execute(check_sql, (diagram_id,))
+            if not cursor.fetchone():
+                logger.info("Diagram not found: %s", diagram_id)
+                return None
+            
+            built = self._build_update_query(diagram_id, update_data)
+            if built is None:
+                logger.info("No valid fields to update")
+                return None
+            update_sql, params, changed_fields = built
+            
+            with span("db_query", operation="update"):
+                cursor.execute(update_sql, params)
+                result = cursor.fetchone()
+                self._record_change(cursor, 'update', result[0], result[1], result[3], result[25], changed_fields)
+                conn.commit()
+            
             diagram = self._build_diagram_dict(result)
-            print(f"Diagram updated successfully: {diagram_id}")
+            logger.info("Diagram updated successfully: %s", diagram_id)
             return diagram
             
         except Exception as e:
-            print(f"Error updating diagram: {str(e)}")
+            logger.error("Error updating diagram: %s", e)
             if conn:
                 conn.rollback()
             raise
@@ -276,23 +505,35 @@ class DiagramDBManager:
             conn = self._get_connection()
             cursor = conn.cursor()
             
-            # Check if diagram exists
-            check_sql = "SELECT diagram_id FROM public.t_diagram WHERE diagram_id = %s"
-            cursor.execute(check_sql, (diagram_id,))
-            if not cursor.fetchone():
-                print(f"Diagram not found: {diagram_id}")
+            # Delete the diagram, returning what the tombstone needs
+            delete_sql = """
+            DELETE FROM public.t_diagram WHERE diagram_id = %s
+            RETURNING diagram_id, package_id, diagram_type, ea_guid
+            """
+            with span("db_query", operation="delete"):
+                cursor.execute(delete_sql, (diagram_id,))
+                deleted = cursor.fetchone()
+            if not deleted:
+                logger.info("Diagram not found: %s", diagram_id)
+                conn.rollback()
                 return False
             
-            # Delete the diagram
-            delete_sql = "DELETE FROM public.t_diagram WHERE diagram_id = %s"
-            cursor.execute(delete_sql, (diagram_id,))
-            conn.commit()
+            # Record a tombstone in the same transaction for delta sync
+            tombstone_sql = f"""
+            INSERT INTO public.t_diagram_tombstone (diagram_id, package_id, diagram_type, ea_guid, deleteddate)
+            VALUES (%s, %s, %s, %s, {UTC_NOW_SQL})
+            ON CONFLICT (diagram_id) DO UPDATE SET deleteddate = EXCLUDED.deleteddate
+            """
+            with span("db_query", operation="tombstone"):
+                cursor.execute(tombstone_sql, deleted)
+                self._record_change(cursor, 'delete', *deleted)
+                conn.commit()
             
-            print(f"Diagram deleted successfully: {diagram_id}")
+            logger.info("Diagram deleted successfully: %s", diagram_id)
             return True
             
         except Exception as e:
-            print(f"Error deleting diagram: {str(e)}")
+            logger.error("Error deleting diagram: %s", e)
             if conn:
                 conn.rollback()
             raise
@@ -300,6 +541,231 @@ class DiagramDBManager:
             if conn:
                 conn.close()
     
+    def read_diagram_stats(self, dimension=None):
+        """Read precomputed diagram counts from the stats materialized view"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            select_sql = """
+            SELECT dimension, dim_value, diagram_count, last_modified, refreshed_at
+            FROM public.mv_diagram_stats
+            """
+            params = []
+            if dimension:
+                # Always include the grand total alongside the requested dimension
+                select_sql += " WHERE dimension IN (%s, 'total')"
+                params.append(dimension)
+            select_sql += " ORDER BY dimension, diagram_count DESC"
+            
+            with span("db_query", operation="stats"):
+                cursor.execute(select_sql, params)
+                results = cursor.fetchall()
+            
+            stats = {
+                'total': {'count': 0, 'last_modified': None},
+                'refreshed_at': None
+            }
+            for name in STATS_DIMENSIONS:
+                if dimension is None or dimension == name:
+                    stats[f'by_{name}'] = []
+            
+            for result in results:
+                last_modified = result[3].isoformat() if result[3] else None
+                if result[0] == 'total':
+                    stats['total'] = {'count': result[2], 'last_modified': last_modified}
+                    stats['refreshed_at'] = result[4].isoformat() if result[4] else None
+                else:
+                    value = int(result[1]) if result[0] == 'package_id' and result[1] is not None else result[1]
+                    stats[f'by_{result[0]}'].append({
+                        result[0]: value,
+                        'count': result[2],
+                        'last_modified': last_modified
+                    })
+            
+            logger.debug("Diagram stats read: %s rows", len(results))
+            return stats
+            
+        except Exception as e:
+            logger.error("Error reading diagram stats: %s", e)
+            raise
+        finally:
+            if conn:
+                conn.close()
+    
+    def refresh_diagram_stats(self):
+        """Refresh the stats materialized view without blocking readers"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            # REFRESH ... CONCURRENTLY cannot run inside a transaction block
+            conn.autocommit = True
+            cursor = conn.cursor()
+            cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY public.mv_diagram_stats")
+            logger.info("Diagram stats refreshed successfully")
+            return True
+            
+        except Exception as e:
+            logger.error("Error refreshing diagram stats: %s", e)
+            raise
+        finally:
+            if conn:
+                conn.close()
+    
+    def read_changes(self, after=0, limit=1000):
+        """Read outbox change records after a checkpoint, in commit-safe order.
+        
+        Returns {"changes", "has_more", "held_back"}. A row from a
+        transaction that is still open may commit after rows with a higher
+        change_id, so the batch stops before the first row committed after
+        the oldest open transaction in the cluster started, rather than
+        skipping past it. That boundary also covers transactions that never
+        write diagrams (a stats refresh, a bulk load): while one is open,
+        newer changes are held back, held_back is true and has_more stays
+        true, so consumers poll again after a short pause instead of
+        treating the feed as caught up.
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            # Rows of open transactions that are not visible yet cannot
+            # precede visible ones, since _record_change hands out
+            # change_ids in commit order. The outer row always exists, so
+            # the boundary is reported even when nothing precedes it; one
+            # extra row tells whether the batch filled up.
+            select_sql = """
+            SELECT boundary.change_id, o.change_id, o.diagram_id, o.operation, o.package_id,
+                o.diagram_type, o.ea_guid, o.changed_fields, o.changedate
+            FROM (
+                SELECT MIN(change_id) AS change_id
+                FROM public.t_diagram_outbox
+                WHERE change_id > %s
+                    AND txid >= pg_snapshot_xmin(pg_current_snapshot())
+            ) boundary
+            LEFT JOIN LATERAL (
+                SELECT change_id, diagram_id, operation, package_id, diagram_type,
+                    ea_guid, changed_fields, changedate
+                FROM public.t_diagram_outbox
+                WHERE change_id > %s
+                    AND change_id < COALESCE(boundary.change_id, 9223372036854775807)
+                ORDER BY change_id
+                LIMIT %s
+            ) o ON true
+            """
+            with span("db_query", operation="changes"):
+                cursor.execute(select_sql, (after, after, limit + 1))
+                results = cursor.fetchall()
+            
+            held_back = bool(results) and results[0][0] is not None
+            rows = [result[1:] for result in results if result[1] is not None]
+            changes = [
+                {
+                    'change_id': result[0],
+                    'diagram_id': result[1],
+                    'operation': result[2],
+                    'package_id': result[3],
+                    'diagram_type': result[4],
+                    'ea_guid': result[5],
+                    'changed_fields': result[6],
+                    'changedate': result[7].isoformat() if result[7] else None
+                }
+                for result in rows[:limit]
+            ]
+            
+            logger.debug("Found %s changes after checkpoint %s", len(changes), after)
+            if held_back:
+                logger.debug("Changes from change_id %s held back behind an open transaction", results[0][0])
+            return {
+                'changes': changes,
+                'has_more': held_back or len(rows) > limit,
+                'held_back': held_back
+            }
+            
+        except Exception as e:
+            logger.error("Error reading changes: %s", e)
+            raise
+        finally:
+            if conn:
+                conn.close()
+    
+    def _build_list_query(self, package_id=None, diagram_type=None):
+        """Helper method to build the filtered listing query and its parameters"""
+        where_conditions = []
+        params = []
+        
+        if package_id is not None:
+            where_conditions.append("package_id = %s")
+            params.append(package_id)
+        
+        if diagram_type:
+            where_conditions.append("diagram_type = %s")
+            params.append(diagram_type)
+        
+        where_clause = ""
+        if where_conditions:
+            where_clause = "WHERE " + " AND ".join(where_conditions)
+        
+        select_sql = f"""
+        SELECT diagram_id, package_id, parentid, diagram_type, name, version, 
+            author, showdetails, notes, stereotype, attpub, attpri, attpro, 
+            orientation, cx, cy, scale, createddate, modifieddate, htmlpath, 
+            showforeign, showborder, showpackagecontents, pdata, locked, ea_guid, 
+            tpos, swimlanes, styleex
+        FROM public.t_diagram
+        {where_clause}
+        ORDER BY createddate DESC
+        """
+        return select_sql, params
+    
+    def _build_update_query(self, diagram_id, update_data):
+        """Build the UPDATE for the supplied fields, returning (sql, params, changed_fields) or None"""
+        update_fields = []
+        changed_fields = []
+        params = []
+        
+        for field in EDITABLE_COLUMNS:
+            if field in update_data and update_data[field] is not None:
+                update_fields.append(f"{field} = %s")
+                changed_fields.append(field)
+                params.append(update_data[field])
+        
+        if not update_fields:
+            return None
+        
+        # Add modifieddate timestamp
+        update_fields.append(f"modifieddate = {UTC_NOW_SQL}")
+        params.append(diagram_id)
+        
+        update_sql = f"""
+        UPDATE public.t_diagram 
+        SET {', '.join(update_fields)}
+        WHERE diagram_id = %s
+        RETURNING diagram_id, package_id, parentid, diagram_type, name, version, 
+            author, showdetails, notes, stereotype, attpub, attpri, attpro, 
+            orientation, cx, cy, scale, createddate, modifieddate, htmlpath, 
+            showforeign, showborder, showpackagecontents, pdata, locked, ea_guid, 
+            tpos, swimlanes, styleex
+        """
+        return update_sql, params, changed_fields
+    
+    def _record_change(self, cursor, operation, diagram_id, package_id, diagram_type, ea_guid, changed_fields=None):
+        """Helper method to write an outbox row within the caller's transaction.
+        
+        The advisory lock is held until the caller commits, so a later
+        writer cannot take a change_id until this one is visible. Callers
+        must commit straight after, so the lock is held only for the commit.
+        """
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (OUTBOX_LOCK_KEY,))
+        outbox_sql = f"""
+        INSERT INTO public.t_diagram_outbox (
+            diagram_id, operation, package_id, diagram_type, ea_guid, changed_fields, changedate
+        ) VALUES (%s, %s, %s, %s, %s, %s, {UTC_NOW_SQL})
+        """
+        cursor.execute(outbox_sql, (diagram_id, operation, package_id, diagram_type, ea_guid, changed_fields))
+    
     def _build_diagram_dict(self, result):
         """Helper method to build diagram dictionary from database result"""
         return {
@@ -0,0 +1,365 @@
+import abc
+import itertools
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from db_utils import (
+    DiagramDBManager, DIAGRAM_COLUMNS, EDITABLE_COLUMNS, DIAGRAM_DEFAULTS,
+    STATS_DIMENSIONS, STREAM_BATCH_SIZE, SYNC_OVERLAP_SECONDS, encode_sync_token
+)
+from log_utils import get_logger
+from trace_utils import span
+
+logger = get_logger("diagram_repository")
+
+# Storage behind the diagram functions: "postgres" (default) or "memory"
+DIAGRAM_BACKEND = os.environ.get("DIAGRAM_BACKEND", "postgres").lower()
+
+_COLUMN_INDEX = {column: position for position, column in enumerate(DIAGRAM_COLUMNS)}
+
+
+class DiagramRepository(abc.ABC):
+    """Storage interface the diagram functions are written against"""
+    
+    @abc.abstractmethod
+    def create_diagram(self, diagram_data):
+        """Create a diagram and return it"""
+    
+    @abc.abstractmethod
+    def read_diagrams(self, diagram_id=None, package_id=None, diagram_type=None):
+        """Return one diagram (or None) by ID, else a filtered list newest first"""
+    
+    @abc.abstractmethod
+    def iter_diagrams(self, package_id=None, diagram_type=None):
+        """Yield the filtered listing one diagram at a time"""
+    
+    @abc.abstractmethod
+    def iter_diagram_batches(self, columns=DIAGRAM_COLUMNS, package_id=None, diagram_type=None,
+                             modified_since=None, batch_size=STREAM_BATCH_SIZE, after_id=None, limit=None):
+        """Yield lists of raw row tuples for the given columns in diagram_id order.
+        
+        after_id and limit select one page: at most limit rows with a
+        diagram_id above after_id.
+        """
+    
+    @abc.abstractmethod
+    def sync_diagrams(self, modified_since=None, package_id=None, diagram_type=None):
+        """Return diagrams and tombstones changed since a point in time, plus a new sync token"""
+    
+    @abc.abstractmethod
+    def update_diagram(self, diagram_id, update_data):
+        """Update the supplied fields and return the diagram, or None"""
+    
+    @abc.abstractmethod
+    def delete_diagram(self, diagram_id):
+        """Delete a diagram, returning whether it existed"""
+    
+    @abc.abstractmethod
+    def read_diagram_stats(self, dimension=None):
+        """Return diagram counts overall and per dimension"""
+    
+    @abc.abstractmethod
+    def refresh_diagram_stats(self):
+        """Bring the diagram counts up to date"""
+    
+    @abc.abstractmethod
+    def read_changes(self, after=0, limit=1000):
+        """Return {"changes", "has_more", "held_back"}: change records after a checkpoint, oldest first"""
+
+
+DiagramRepository.register(DiagramDBManager)
+
+
+def _utcnow():
+    """Naive UTC, matching UTC_NOW_SQL on the database"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class InMemoryDiagramRepository(DiagramRepository):
+    """Process-local diagram store with the same semantics as DiagramDBManager.
+    
+    Rows are kept as tuples in DIAGRAM_COLUMNS order, with secondary
+    indexes on package_id and diagram_type so filtered reads only touch
+    matching rows. Intended for tests, benchmarks and profiling handler
+    overhead without a database; nothing is persisted.
+    """
+    
+    # Rows are the same tuples the database returns, so the dict builder is shared
+    _build_diagram_dict = DiagramDBManager._build_diagram_dict
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rows = {}
+        self._by_package = {}
+        self._by_type = {}
+        self._tombstones = {}
+        self._changes = []
+        self._next_id = itertools.count(1)
+        self._next_change_id = itertools.count(1)
+    
+    def _index(self, row):
+        diagram_id = row[0]
+        self._by_package.setdefault(row[_COLUMN_INDEX['package_id']], set()).add(diagram_id)
+        self._by_type.setdefault(row[_COLUMN_INDEX['diagram_type']], set()).add(diagram_id)
+    
+    def _unindex(self, row):
+        diagram_id = row[0]
+        for index, key in ((self._by_package, row[_COLUMN_INDEX['package_id']]),
+                           (self._by_type, row[_COLUMN_INDEX['diagram_type']])):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(diagram_id)
+                if not ids:
+                    del index[key]
+    
+    def _matching_rows(self, package_id=None, diagram_type=None, modified_since=None):
+        """Rows matching the filters, narrowed through the smallest index first"""
+        candidates = []
+        if package_id is not None:
+            candidates.append(self._by_package.get(int(package_id), set()))
+        if diagram_type:
+            candidates.append(self._by_type.get(diagram_type, set()))
+        
+        if candidates:
+            candidates.sort(key=len)
+            ids = candidates[0].intersection(*candidates[1:])
+            rows = [self._rows[diagram_id] for diagram_id in ids]
+        else:
+            rows = list(self._rows.values())
+        
+        if modified_since is not None:
+            modified = _COLUMN_INDEX['modifieddate']
+            rows = [row for row in rows if row[modified] > modified_since]
+        return rows
+    
+    @staticmethod
+    def _row(values):
+        """Row tuple in column order, with package_id coerced like the integer column"""
+        if values['package_id'] is not None:
+            values['package_id'] = int(values['package_id'])
+        return tuple(values[column] for column in DIAGRAM_COLUMNS)
+    
+    def _record_change(self, operation, row, changed_fields=None):
+        self._changes.append({
+            'change_id': next(self._next_change_id),
+            'diagram_id': row[0],
+            'operation': operation,
+            'package_id': row[_COLUMN_INDEX['package_id']],
+            'diagram_type': row[_COLUMN_INDEX['diagram_type']],
+            'ea_guid': row[_COLUMN_INDEX['ea_guid']],
+            'changed_fields': changed_fields,
+            'changedate': _utcnow().isoformat()
+        })
+    
+    def create_diagram(self, diagram_data):
+        """Create a new diagram"""
+        with span("db_query", operation="create"), self._lock:
+            now = _utcnow()
+            values = {column: diagram_data.get(column, DIAGRAM_DEFAULTS.get(column)) for column in EDITABLE_COLUMNS}
+            values.update(diagram_id=next(self._next_id), createddate=now, modifieddate=now)
+            row = self._row(values)
+            
+            self._rows[row[0]] = row
+            self._index(row)
+            self._record_change('create', row)
+        
+        logger.info("Diagram created successfully with ID: %s", row[0])
+        return self._build_diagram_dict(row)
+    
+    def read_diagrams(self, diagram_id=None, package_id=None, diagram_type=None):
+        """Read diagrams with optional filtering"""
+        if diagram_id:
+            row = self._rows.get(int(diagram_id))
+            if row is None:
+                logger.info("Diagram not found: %s", diagram_id)
+                return None
+            return self._build_diagram_dict(row)
+        
+        rows = self._listing(package_id, diagram_type)
+        with span("build_dicts", rows=len(rows)):
+            return [self._build_diagram_dict(row) for row in rows]
+    
+    def iter_diagrams(self, package_id=None, diagram_type=None):
+        """Yield the filtered listing, newest first"""
+        for row in self._listing(package_id, diagram_type):
+            yield self._build_diagram_dict(row)
+    
+    def _listing(self, package_id, diagram_type):
+        with span("db_query", operation="list"), self._lock:
+            rows = self._matching_rows(package_id, diagram_type)
+        # diagram_id breaks ties between diagrams created in the same instant
+        created = _COLUMN_INDEX['createddate']
+        rows.sort(key=lambda row: (row[created], row[0]), reverse=True)
+        return rows
+    
+    def iter_diagram_batches(self, columns=DIAGRAM_COLUMNS, package_id=None, diagram_type=None,
+                             modified_since=None, batch_size=STREAM_BATCH_SIZE, after_id=None, limit=None):
+        """Yield raw row tuples for the given columns in batches"""
+        unknown = [column for column in columns if column not in DIAGRAM_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        
+        with span("db_query", operation="export"), self._lock:
+            rows = self._matching_rows(package_id, diagram_type, modified_since)
+        if after_id is not None:
+            rows = [row for row in rows if row[0] > after_id]
+        rows.sort(key=lambda row: row[0])
+        if limit is not None:
+            rows = rows[:limit]
+        positions = [_COLUMN_INDEX[column] for column in columns]
+        for start in range(0, len(rows), batch_size):
+            yield [tuple(row[position] for position in positions) for row in rows[start:start + batch_size]]
+    
+    def sync_diagrams(self, modified_since=None, package_id=None, diagram_type=None):
+        """Read diagrams changed and deleted since a point in time, plus a new sync token"""
+        since = None
+        if modified_since is not None:
+            since = modified_since - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        
+        with span("db_query", operation="sync"), self._lock:
+            sync_point = _utcnow()
+            rows = self._matching_rows(package_id, diagram_type, since)
+            deleted = []
+            if since is not None:
+                deleted = [
+                    tombstone for tombstone in self._tombstones.values()
+                    if tombstone['deleteddate'] > since
+                    and (package_id is None or tombstone['package_id'] == int(package_id))
+                    and (not diagram_type or tombstone['diagram_type'] == diagram_type)
+                ]
+        
+        modified = _COLUMN_INDEX['modifieddate']
+        rows.sort(key=lambda row: (row[modified], row[0]))
+        deleted.sort(key=lambda tombstone: (tombstone['deleteddate'], tombstone['diagram_id']))
+        return {
+            'diagrams': [self._build_diagram_dict(row) for row in rows],
+            'deleted': [
+                {
+                    'diagram_id': tombstone['diagram_id'],
+                    'ea_guid': tombstone['ea_guid'],
+                    'deleteddate': tombstone['deleteddate'].isoformat()
+                }
+                for tombstone in deleted
+            ],
+            'sync_token': encode_sync_token(sync_point)
+        }
+    
+    def update_diagram(self, diagram_id, update_data):
+        """Update an existing diagram"""
+        with span("db_query", operation="update"), self._lock:
+            row = self._rows.get(int(diagram_id))
+            if row is None:
+                logger.info("Diagram not found: %s", diagram_id)
+                return None
+            
+            changed_fields = [
+                field for field in EDITABLE_COLUMNS
+                if field in update_data and update_data[field] is not None
+            ]
+            if not changed_fields:
+                logger.info("No valid fields to update")
+                return None
+            
+            values = dict(zip(DIAGRAM_COLUMNS, row))
+            values.update({field: update_data[field] for field in changed_fields})
+            values['modifieddate'] = _utcnow()
+            updated = self._row(values)
+            
+            self._unindex(row)
+            self._rows[updated[0]] = updated
+            self._index(updated)
+            self._record_change('update', updated, changed_fields)
+        
+        logger.info("Diagram updated successfully: %s", diagram_id)
+        return self._build_diagram_dict(updated)
+    
+    def delete_diagram(self, diagram_id):
+        """Delete a diagram by ID, leaving a tombstone for delta sync"""
+        with span("db_query", operation="delete"), self._lock:
+            row = self._rows.pop(int(diagram_id), None)
+            if row is None:
+                logger.info("Diagram not found: %s", diagram_id)
+                return False
+            
+            self._unindex(row)
+            self._tombstones[row[0]] = {
+                'diagram_id': row[0],
+                'package_id': row[_COLUMN_INDEX['package_id']],
+                'diagram_type': row[_COLUMN_INDEX['diagram_type']],
+                'ea_guid': row[_COLUMN_INDEX['ea_guid']],
+                'deleteddate': _utcnow()
+            }
+            self._record_change('delete', row)
+        
+        logger.info("Diagram deleted successfully: %s", diagram_id)
+        return True
+    
+    def read_diagram_stats(self, dimension=None):
+        """Compute diagram counts; always current, so refreshed_at is now"""
+        with span("db_query", operation="stats"), self._lock:
+            rows = list(self._rows.values())
+        
+        modified = _COLUMN_INDEX['modifieddate']
+        
+        def summarise(group):
+            last = max((row[modified] for row in group if row[modified]), default=None)
+            return len(group), last.isoformat() if last else None
+        
+        count, last_modified = summarise(rows)
+        stats = {
+            'total': {'count': count, 'last_modified': last_modified},
+            'refreshed_at': _utcnow().isoformat()
+        }
+        for name in STATS_DIMENSIONS:
+            if dimension is not None and dimension != name:
+                continue
+            groups = {}
+            for row in rows:
+                groups.setdefault(row[_COLUMN_INDEX[name]], []).append(row)
+            breakdown = []
+            for value, group in groups.items():
+                count, last_modified = summarise(group)
+                breakdown.append({name: value, 'count': count, 'last_modified': last_modified})
+            breakdown.sort(key=lambda entry: entry['count'], reverse=True)
+            stats[f'by_{name}'] = breakdown
+        return stats
+    
+    def refresh_diagram_stats(self):
+        """Stats are computed on read, so there is nothing to refresh"""
+        return True
+    
+    def read_changes(self, after=0, limit=1000):
+        """Read change records after a checkpoint"""
+        with self._lock:
+            # change_id N is always at position N - 1, so the checkpoint is a slice offset
+            after = max(0, int(after))
+            return {
+                'changes': self._changes[after:after + limit],
+                'has_more': len(self._changes) > after + limit,
+                # Changes are recorded atomically with their writes
+                'held_back': False
+            }
+
+
+_memory_repository = None
+_memory_lock = threading.Lock()
+
+
+def get_diagram_repository(backend=None):
+    """Return the diagram repository selected by DIAGRAM_BACKEND.
+    
+    The in-memory backend is a per-process singleton so its data outlives
+    the individual requests that use it.
+    """
+    global _memory_repository
+    backend = (backend or DIAGRAM_BACKEND).lower()
+    if backend == "postgres":
+        return DiagramDBManager()
+    if backend == "memory":
+        if _memory_repository is None:
+            with _memory_lock:
+                if _memory_repository is None:
+                    _memory_repository = InMemoryDiagramRepository()
+        return _memory_repository
+    raise ValueError(f"Unknown DIAGRAM_BACKEND: {backend}")
@@ -1,96 +1,600 @@
+import errno
+import itertools
 import os
-import logging
-from typing import List, Dict, Optional
+import socket
+import threading
+import time
+import uuid
+from typing import List, Dict, Iterator, Optional
 from datetime import datetime
 
+from log_utils import get_logger
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = get_logger("file_utils")
+
+# Column order of applications.txt
+APPLICATION_HEADERS = [
+    "id", "name", "description", "version", "status",
+    "created_at", "updated_at", "owner", "category"
+]
+
+# Fields iter_applications can filter on
+APPLICATION_FILTER_FIELDS = ("status", "owner", "category")
+
+# Journal entries (updates and deletes) after which the journal is folded
+# into a fresh applications.txt snapshot
+APPLICATION_JOURNAL_MAX_ENTRIES = int(os.environ.get("APPLICATION_JOURNAL_MAX_ENTRIES", "1000"))
+
+# Journal entry kinds: a full replacement record, or the id of a deleted record
+JOURNAL_UPDATE = "U"
+JOURNAL_DELETE = "D"
+
+# First line of a journal written by compaction: a token naming the snapshot
+# the journal applies to. File identities alone cannot tell a new snapshot
+# from an old one once the file system reuses the inode number
+JOURNAL_GENERATION = "G"
+
+# Parsed applications of this process, keyed by snapshot path. Each view
+# records how far it has read the snapshot and the journal (inode and byte
+# offset), so a read only parses what was appended since, and re-parses in
+# full only when compaction has replaced the files. Lookups by id go
+# through its map of id to list position.
+_views = {}
+_views_lock = threading.Lock()
+
+# How writers and readers of applications.txt coordinate across workers:
+# "flock" locks applications.lock, "lease" creates applications.lock.lease
+# exclusively, "auto" uses flock and falls back to the lease where flock is
+# unavailable (Windows) or rejected by the file system (some SMB mounts)
+APPLICATION_LOCK_MODE = os.environ.get("APPLICATION_LOCK_MODE", "auto")
+
+# Seconds to wait for the applications lock before giving up
+APPLICATION_LOCK_TIMEOUT_SECONDS = float(os.environ.get("APPLICATION_LOCK_TIMEOUT_SECONDS", "10"))
+
+# Age after which a lease file is considered left behind by a crashed
+# worker and broken
+APPLICATION_LEASE_SECONDS = float(os.environ.get("APPLICATION_LEASE_SECONDS", "30"))
+
+# flock errors meaning the file system does not support it
+_FLOCK_UNSUPPORTED_ERRNOS = {errno.ENOLCK, errno.EOPNOTSUPP, errno.ENOSYS, errno.EINVAL}
+
+# Lock files on which flock failed that way; they use the lease from then on
+_flock_unsupported = set()
+
+# Locks held by the current thread: lock path -> [exclusive, depth]
+_held_locks = threading.local()
+
+
+def _format_line(app, headers=APPLICATION_HEADERS):
+    return '\t'.join(str(app.get(key, '')) for key in headers) + '\n'
+
+
+def _stat(path):
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def _read_lines(path, offset):
+    """Complete lines from offset on: (lines, next offset, inode)"""
+    try:
+        with open(path, 'rb') as f:
+            inode = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset, None
+    # A last line without its newline is still being appended; leave it
+    # for the next read
+    end = data.rfind(b'\n') + 1
+    if not end:
+        return [], offset, inode
+    return data[:end].decode('utf-8').split('\n')[:-1], offset + end, inode
+
+
+def _journal_generation(path):
+    """Generation token at the head of a journal, or None"""
+    try:
+        with open(path, 'rb') as f:
+            kind, _, token = f.readline().decode('utf-8').partition('\t')
+    except FileNotFoundError:
+        return None
+    return token.strip() if kind == JOURNAL_GENERATION and token.endswith('\n') else None
+
+
+def _add_records(view, lines):
+    """Append snapshot lines to a view"""
+    applications, positions = view["applications"], view["positions"]
+    headers = view["headers"]
+    for line in lines:
+        line = line.strip()
+        if line:
+            app = dict(zip(headers, line.split('\t')))
+            app_id = app.get('id')
+            # First occurrence wins, as with the linear scan
+            if app_id not in positions:
+                positions[app_id] = len(applications)
+            else:
+                view["duplicates"].add(app_id)
+            applications.append(app)
+
+
+def _lookup(view, app_id):
+    """The current record with app_id in a view, or None"""
+    position = view["positions"].get(app_id)
+    return view["applications"][position] if position is not None else None
+
+
+def _apply_journal(view, lines):
+    """Replay journal lines onto a view; replaying an entry twice is harmless.
+    
+    Deleted records leave a None hole in the applications list, so positions
+    stay valid and a delete costs O(1); readers skip the holes.
+    """
+    applications, positions = view["applications"], view["positions"]
+    for line in lines:
+        kind, _, record = line.partition('\t')
+        if kind == JOURNAL_UPDATE:
+            app = dict(zip(APPLICATION_HEADERS, record.strip().split('\t')))
+            app_id = app.get('id')
+            if app_id in positions:
+                applications[positions[app_id]] = app
+            else:
+                positions[app_id] = len(applications)
+                applications.append(app)
+        elif kind == JOURNAL_DELETE:
+            app_id = record.strip()
+            if app_id in positions:
+                applications[positions.pop(app_id)] = None
+            if app_id in view["duplicates"]:
+                # Rare: the snapshot holds several rows with this id, and a
+                # delete removes them all
+                view["duplicates"].discard(app_id)
+                for i, app in enumerate(applications):
+                    if app is not None and app.get('id') == app_id:
+                        applications[i] = None
+        elif kind == JOURNAL_GENERATION:
+            view["generation"] = record.strip()
+            continue
+        else:
+            continue
+        view["journal_entries"] += 1
+
+
+def _journal_overrides(lines):
+    """Fold journal lines into what they change, for streaming the snapshot.
+    
+    Returns ({id: [record or None, revived]}, {id: sequence}, generation).
+    A None record is a delete; revived marks a record updated again after
+    a delete, which reads after the snapshot rows like one the snapshot
+    never held. sequence orders those trailing records as the view does.
+    """
+    overrides, sequence, generation = {}, {}, None
+    for line in lines:
+        kind, _, record = line.partition('\t')
+        if kind == JOURNAL_UPDATE:
+            app = dict(zip(APPLICATION_HEADERS, record.strip().split('\t')))
+            app_id = app.get('id')
+            previous = overrides.get(app_id)
+            if previous is None or previous[0] is None:
+                sequence[app_id] = len(sequence)
+            overrides[app_id] = [app, previous is not None and (previous[0] is None or previous[1])]
+        elif kind == JOURNAL_DELETE:
+            overrides[record.strip()] = [None, False]
+        elif kind == JOURNAL_GENERATION:
+            generation = record.strip()
+    return overrides, sequence, generation
+
+
+def _matches(app, criteria):
+    for field, value in criteria.items():
+        if app.get(field) != value:
+            return False
+    return True
+
+
+class FileLock:
+    """Cross-worker advisory lock on a lock file.
+    
+    Shared holders never block each other; an exclusive holder excludes
+    everyone. With flock each holder locks its own descriptor, so threads of
+    one worker exclude each other as well. Under the lease fallback only
+    exclusive holders take the lease, so writers still exclude each other
+    while readers go unlocked and rely on writers replacing files
+    atomically. Re-entrant per thread; a shared lock cannot be upgraded.
+    """
+    
+    def __init__(self, path: str, exclusive: bool = True,
+                 timeout: float = None, lease_seconds: float = None):
+        self.path = path
+        self.lease_path = path + ".lease"
+        self.exclusive = exclusive
+        self.timeout = APPLICATION_LOCK_TIMEOUT_SECONDS if timeout is None else timeout
+        self.lease_seconds = APPLICATION_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self._fd = None
+        self._leased = False
+    
+    def __enter__(self):
+        held = getattr(_held_locks, "locks", None)
+        if held is None:
+            held = _held_locks.locks = {}
+        state = held.get(self.path)
+        if state is not None:
+            if self.exclusive and not state[0]:
+                raise RuntimeError(f"Cannot upgrade shared lock on {self.path}")
+            state[1] += 1
+            return self
+        
+        self._acquire()
+        held[self.path] = [self.exclusive, 1]
+        return self
+    
+    def __exit__(self, *exc):
+        held = _held_locks.locks
+        state = held[self.path]
+        state[1] -= 1
+        if not state[1]:
+            del held[self.path]
+            self._release()
+    
+    def _acquire(self):
+        if fcntl is not None and APPLICATION_LOCK_MODE != "lease" and self.path not in _flock_unsupported:
+            try:
+                self._flock()
+                return
+            except OSError as e:
+                if e.errno not in _FLOCK_UNSUPPORTED_ERRNOS or APPLICATION_LOCK_MODE == "flock":
+                    raise
+                logger.warning("flock unsupported on %s (%s); falling back to a lease file", self.path, e)
+                _flock_unsupported.add(self.path)
+        if self.exclusive:
+            self._lease()
+    
+    def _wait(self, deadline, delay):
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Timed out after {self.timeout}s waiting for lock {self.path}")
+        time.sleep(delay)
+        return min(delay * 2, 0.1)
+    
+    def _flock(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        operation = (fcntl.LOCK_EX if self.exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB
+        deadline = time.monotonic() + self.timeout
+        delay = 0.001
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, operation)
+                    break
+                except BlockingIOError:
+                    delay = self._wait(deadline, delay)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+    
+    def _lease(self):
+        """Create the lease file exclusively, breaking it once it has expired"""
+        owner = f"{socket.gethostname()} {os.getpid()} {threading.get_ident()}\n".encode('utf-8')
+        deadline = time.monotonic() + self.timeout
+        delay = 0.001
+        while True:
+            try:
+                fd = os.open(self.lease_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                try:
+                    age = time.time() - os.stat(self.lease_path).st_mtime
+                except FileNotFoundError:
+                    continue
+                if age > self.lease_seconds:
+                    logger.warning("Breaking expired lease %s (%.1fs old)", self.lease_path, age)
+                    try:
+                        os.remove(self.lease_path)
+                    except FileNotFoundError:
+                        pass
+                    continue
+                delay = self._wait(deadline, delay)
+                continue
+            try:
+                os.write(fd, owner)
+            finally:
+                os.close(fd)
+            self._leased = True
+            return
+    
+    def _release(self):
+        if self._fd is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        if self._leased:
+            self._leased = False
+            try:
+                os.remove(self.lease_path)
+            except FileNotFoundError:
+                pass
+
+
+def _write_atomic(path: str, lines) -> None:
+    """Write lines to a temporary file beside path and rename it over path"""
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
 class ApplicationFileManager:
-    """Manages tab-delimited application files"""
+    """Manages tab-delimited application files.
+    
+    applications.txt is the snapshot: a header line and one record per line.
+    Creates append to it. Updates and deletes append a single entry to the
+    applications.log journal beside it instead of rewriting the snapshot;
+    reads replay the journal over the snapshot. Once the journal holds
+    APPLICATION_JOURNAL_MAX_ENTRIES entries it is compacted into a fresh
+    snapshot, which also bounds the replay a cold read adds to parsing the
+    snapshot.
+    
+    Workers coordinate through a FileLock on applications.lock: writes hold
+    it exclusively, so appends never interleave and an update or delete
+    decides on the current records; reads that parse the files hold it
+    shared. Compaction and creation write a temporary file and rename it
+    into place, so a reader never sees a partial snapshot.
+    """
     
     def __init__(self, mount_path: str = "/func1"):
-        print(f"📁 [FILE MANAGER] Initializing with mount path: {mount_path}")
+        logger.debug("Initializing with mount path: %s", mount_path)
         self.mount_path = mount_path
         self.applications_file = os.path.join(mount_path, "applications.txt")
-        print(f"📄 [FILE MANAGER] Applications file path: {self.applications_file}")
+        self.journal_file = os.path.join(mount_path, "applications.log")
+        self.lock_file = os.path.join(mount_path, "applications.lock")
+        logger.debug("Applications file path: %s", self.applications_file)
         self.ensure_directory_exists()
         self.ensure_file_exists()
     
     def ensure_directory_exists(self):
         """Ensure the mount directory exists"""
-        print(f"📁 [FILE MANAGER] Checking if directory exists: {self.mount_path}")
+        logger.debug("Checking if directory exists: %s", self.mount_path)
         if not os.path.exists(self.mount_path):
-            print(f"📁 [FILE MANAGER] Creating directory: {self.mount_path}")
+            logger.info("Creating directory: %s", self.mount_path)
             os.makedirs(self.mount_path, exist_ok=True)
-            logging.info(f'Created mount path: {self.mount_path}')
         else:
-            print(f"✅ [FILE MANAGER] Directory already exists: {self.mount_path}")
+            logger.debug("Directory already exists: %s", self.mount_path)
     
     def ensure_file_exists(self):
         """Ensure the applications file exists with headers"""
-        print(f"📄 [FILE MANAGER] Checking if file exists: {self.applications_file}")
+        logger.debug("Checking if file exists: %s", self.applications_file)
         if not os.path.exists(self.applications_file):
-            print(f"📄 [FILE MANAGER] Creating applications file with headers")
-            headers = [
-                "id",
-                "name", 
-                "description",
-                "version",
-                "status",
-                "created_at",
-                "updated_at",
-                "owner",
-                "category"
-            ]
-            with open(self.applications_file, 'w', encoding='utf-8') as f:
-                f.write('\t'.join(headers) + '\n')
-            logging.info(f'Created applications file: {self.applications_file}')
-            print(f"✅ [FILE MANAGER] Created applications file: {self.applications_file}")
-        else:
-            print(f"✅ [FILE MANAGER] Applications file already exists: {self.applications_file}")
+            with self._write_lock():
+                # Another worker may have created it while we waited
+                if not os.path.exists(self.applications_file):
+                    logger.debug("Creating applications file with headers")
+                    _write_atomic(self.applications_file, ['\t'.join(APPLICATION_HEADERS) + '\n'])
+                    logger.info("Created applications file: %s", self.applications_file)
+                    return
+        logger.debug("Applications file already exists: %s", self.applications_file)
+    
+    def _read_lock(self) -> FileLock:
+        return FileLock(self.lock_file, exclusive=False)
+    
+    def _write_lock(self) -> FileLock:
+        return FileLock(self.lock_file, exclusive=True)
+    
+    def _load(self) -> Dict:
+        """Parse the snapshot and replay the journal into a new view"""
+        while True:
+            generation = _journal_generation(self.journal_file)
+            logger.debug("Parsing applications file: %s", self.applications_file)
+            lines, offset, inode = _read_lines(self.applications_file, 0)
+            logger.debug("Found %s lines in file", len(lines))
+            view = {
+                "headers": lines[0].strip().split('\t') if lines else APPLICATION_HEADERS,
+                "applications": [],
+                "positions": {},
+                "duplicates": set(),
+                "snapshot": (inode, offset),
+                "journal": (None, 0),
+                "journal_entries": 0,
+                "generation": None
+            }
+            _add_records(view, lines[1:])
+            self._extend(view)
+            if view["generation"] == generation:
+                return view
+            # Under the lease fallback readers are unlocked, and a compaction
+            # replaced the files between reading the snapshot and the journal
+            logger.debug("Applications compacted while reading; reading again")
+    
+    def _extend(self, view: Dict) -> Dict:
+        """Apply what was appended to the snapshot and journal since the view was read.
+        
+        The view is updated in place under the process lock; concurrent
+        readers iterating it see each record either before or after.
+        """
+        inode, offset = view["snapshot"]
+        lines, offset, _ = _read_lines(self.applications_file, offset)
+        _add_records(view, lines)
+        view["snapshot"] = (inode, offset)
+        
+        journal_inode, journal_offset = view["journal"]
+        lines, journal_offset, read_inode = _read_lines(self.journal_file, journal_offset)
+        _apply_journal(view, lines)
+        view["journal"] = (journal_inode or read_inode, journal_offset)
+        
+        logger.debug("Read %s applications", len(view["applications"]))
+        return view
+    
+    def _refresh(self, view: Optional[Dict]) -> Optional[str]:
+        """How a view must be brought up to date: "load", "extend" or None"""
+        snapshot = _stat(self.applications_file)
+        journal = _stat(self.journal_file)
+        if view is None or snapshot is None:
+            return "load"
+        inode, offset = view["snapshot"]
+        journal_inode, journal_offset = view["journal"]
+        if (snapshot.st_ino != inode or snapshot.st_size < offset
+                or _journal_generation(self.journal_file) != view["generation"]
+                or (journal is None and journal_offset)
+                or (journal is not None and (journal.st_size < journal_offset
+                                             or journal_inode not in (None, journal.st_ino)))):
+            # Compacted or replaced underneath us
+            return "load"
+        if snapshot.st_size > offset or (journal is not None and journal.st_size > journal_offset):
+            return "extend"
+        return None
+    
+    def _view(self) -> Dict:
+        """Current applications, reading only what changed since the last call"""
+        with _views_lock:
+            view = _views.get(self.applications_file)
+            if view is not None and self._refresh(view) is None:
+                return view
+        
+        # Files changed: read them under the shared lock, so a compaction
+        # cannot replace the snapshot between parsing it and the journal
+        with self._read_lock(), _views_lock:
+            view = _views.get(self.applications_file)
+            refresh = self._refresh(view)
+            if refresh == "load":
+                view = self._load()
+            elif refresh == "extend":
+                view = self._extend(view)
+            
+            _views[self.applications_file] = view
+            return view
     
     def read_all_applications(self) -> List[Dict]:
         """Read all applications from the file"""
-        print(f"📖 [FILE MANAGER] Reading all applications from: {self.applications_file}")
-        applications = []
+        logger.debug("Reading all applications from: %s", self.applications_file)
         try:
-            with open(self.applications_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                print(f"📊 [FILE MANAGER] Found {len(lines)} lines in file")
-                if len(lines) <= 1:  # Only headers or empty file
-                    print("📊 [FILE MANAGER] File is empty or has only headers")
-                    return applications
-                
-                headers = lines[0].strip().split('\t')
-                print(f"📋 [FILE MANAGER] Headers: {headers}")
-                for line in lines[1:]:
-                    if line.strip():
-                        values = line.strip().split('\t')
-                        app_dict = dict(zip(headers, values))
-                        applications.append(app_dict)
-                
-                print(f"📊 [FILE MANAGER] Read {len(applications)} applications")
-            
-            return applications
+            # Copies, so callers can modify them without touching the cache
+            return [dict(app) for app in self._view()["applications"] if app is not None]
         except Exception as e:
-            print(f"💥 [FILE MANAGER] Error reading applications: {str(e)}")
-            logging.error(f'Error reading applications: {str(e)}')
+            logger.error("Error reading applications: %s", e)
             return []
     
     def find_application_by_id(self, app_id: str) -> Optional[Dict]:
         """Find an application by ID"""
-        applications = self.read_all_applications()
-        for app in applications:
-            if app.get('id') == app_id:
-                return app
-        return None
+        try:
+            app = _lookup(self._view(), app_id)
+        except Exception as e:
+            logger.error("Error reading applications: %s", e)
+            return None
+        return dict(app) if app is not None else None
+    
+    def iter_applications(self, filter: Optional[Dict[str, str]] = None, offset: int = 0,
+                          limit: Optional[int] = None) -> Iterator[Dict]:
+        """Applications matching filter, skipping offset of them and yielding at most limit.
+        
+        filter maps status, owner and/or category to the value it must
+        equal. Records come in read_all_applications order. Unless this
+        worker already holds a current view, the snapshot is parsed lazily,
+        line by line, with the journal applied on the fly, and reading stops
+        once the page is full: cost follows offset + limit, not file size.
+        """
+        criteria = dict(filter or {})
+        unknown = set(criteria) - set(APPLICATION_FILTER_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot filter applications on: {', '.join(sorted(unknown))}")
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("offset and limit must not be negative")
+        
+        with _views_lock:
+            view = _views.get(self.applications_file)
+            warm = view is not None and self._refresh(view) != "load"
+        records = self._iter_view(criteria) if warm else self._iter_snapshot(criteria)
+        return self._page(records, offset, limit)
+    
+    @staticmethod
+    def _page(records: Iterator[Dict], offset: int, limit: Optional[int]) -> Iterator[Dict]:
+        try:
+            yield from itertools.islice(records, offset, None if limit is None else offset + limit)
+        finally:
+            # Closes the snapshot as soon as the page is full
+            records.close()
+    
+    def _iter_view(self, criteria: Dict) -> Iterator[Dict]:
+        for app in self._view()["applications"]:
+            if app is not None and _matches(app, criteria):
+                yield dict(app)
+    
+    def _iter_snapshot(self, criteria: Dict) -> Iterator[Dict]:
+        try:
+            # The lock is only held while opening the snapshot and reading the
+            # journal; an open snapshot keeps its content if compaction
+            # replaces it, so the pair stays consistent while we stream
+            with self._read_lock():
+                while True:
+                    generation = _journal_generation(self.journal_file)
+                    snapshot = open(self.applications_file, 'rb')
+                    lines, _, _ = _read_lines(self.journal_file, 0)
+                    overrides, sequence, journal_generation = _journal_overrides(lines)
+                    if journal_generation == generation:
+                        break
+                    snapshot.close()
+        except Exception as e:
+            logger.error("Error reading applications: %s", e)
+            raise
+        
+        with snapshot:
+            headers = snapshot.readline().decode('utf-8').strip().split('\t')
+            if not all(field in headers for field in criteria):
+                return
+            id_position = headers.index('id') if 'id' in headers else None
+            checks = [(headers.index(field), value) for field, value in criteria.items()]
+            replaced = set()
+            
+            for raw in snapshot:
+                if not raw.endswith(b'\n'):
+                    break  # Still being appended
+                fields = raw.decode('utf-8').strip().split('\t')
+                if fields == ['']:
+                    continue
+                app_id = fields[id_position] if id_position is not None and id_position < len(fields) else None
+                override = overrides.get(app_id)
+                if override is not None:
+                    record, revived = override
+                    if record is None or revived:
+                        continue
+                    if app_id not in replaced:
+                        # The journal replaces the first row with this id
+                        replaced.add(app_id)
+                        if _matches(record, criteria):
+                            yield dict(record)
+                        continue
+                if all(position < len(fields) and fields[position] == value for position, value in checks):
+                    yield dict(zip(headers, fields))
+        
+        # Records the journal adds after the snapshot rows
+        for app_id in sorted(sequence, key=sequence.get):
+            record, revived = overrides[app_id]
+            if record is not None and (revived or app_id not in replaced) and _matches(record, criteria):
+                yield dict(record)
     
     def create_application(self, app_data: Dict) -> Dict:
         """Create a new application"""
-        print(f"➕ [FILE MANAGER] Creating new application with data: {app_data}")
+        logger.payload("Creating new application with data", app_data)
         try:
             # Generate unique ID
             app_id = f"app_{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}"
             current_time = datetime.utcnow().isoformat() + "Z"
-            print(f"🆔 [FILE MANAGER] Generated ID: {app_id}")
+            logger.debug("Generated ID: %s", app_id)
             
             # Prepare application data
             new_app = {
@@ -104,94 +608,89 @@ class ApplicationFileManager:
                 'owner': app_data.get('owner', ''),
                 'category': app_data.get('category', '')
             }
-            print(f"📝 [FILE MANAGER] Prepared application data: {new_app}")
+            logger.payload("Prepared application data", new_app)
             
             # Append to file
-            print(f"💾 [FILE MANAGER] Appending to file: {self.applications_file}")
-            with open(self.applications_file, 'a', encoding='utf-8') as f:
-                line = '\t'.join(str(new_app.get(key, '')) for key in [
-                    'id', 'name', 'description', 'version', 'status', 
-                    'created_at', 'updated_at', 'owner', 'category'
-                ])
-                f.write(line + '\n')
+            logger.debug("Appending to file: %s", self.applications_file)
+            with self._write_lock(), open(self.applications_file, 'ab') as f:
+                f.write(_format_line(new_app).encode('utf-8'))
             
-            print(f"✅ [FILE MANAGER] Successfully created application with ID: {app_id}")
-            logging.info(f'Created application with ID: {app_id}')
+            logger.info("Successfully created application with ID: %s", app_id)
             return new_app
-            
+        
         except Exception as e:
-            print(f"💥 [FILE MANAGER] Error creating application: {str(e)}")
-            logging.error(f'Error creating application: {str(e)}')
+            logger.error("Error creating application: %s", e)
             raise
     
+    def _append_journal(self, entry: str):
+        with open(self.journal_file, 'ab') as f:
+            f.write(entry.encode('utf-8'))
+    
+    def compact(self):
+        """Fold the journal into a fresh snapshot and start a new, empty journal"""
+        # Held from reading the view to emptying the journal, so no append
+        # lands between the two and is lost
+        with self._write_lock():
+            view = self._view()
+            logger.info("Compacting %s journal entries into %s", view["journal_entries"], self.applications_file)
+            
+            headers = view["headers"]
+            _write_atomic(self.applications_file, [
+                '\t'.join(headers) + '\n',
+                *(_format_line(app, headers) for app in view["applications"] if app is not None)
+            ])
+            
+            # Stopping before the journal is replaced is safe: replaying the
+            # old journal over the compacted snapshot yields the same records
+            _write_atomic(self.journal_file, [f"{JOURNAL_GENERATION}\t{uuid.uuid4().hex}\n"])
+    
+    def _compact_if_needed(self):
+        if self._view()["journal_entries"] >= APPLICATION_JOURNAL_MAX_ENTRIES:
+            self.compact()
+    
     def update_application(self, app_id: str, app_data: Dict) -> Optional[Dict]:
         """Update an existing application"""
         try:
-            applications = self.read_all_applications()
-            updated = False
             current_time = datetime.utcnow().isoformat() + "Z"
             
-            # Find and update the application
-            for app in applications:
-                if app.get('id') == app_id:
-                    app.update(app_data)
-                    app['updated_at'] = current_time
-                    updated = True
-                    break
-            
-            if not updated:
-                return None
-            
-            # Rewrite the entire file
-            with open(self.applications_file, 'w', encoding='utf-8') as f:
-                # Write headers
-                headers = [
-                    "id", "name", "description", "version", "status",
-                    "created_at", "updated_at", "owner", "category"
-                ]
-                f.write('\t'.join(headers) + '\n')
+            with self._write_lock():
+                # Find and update the application
+                existing = _lookup(self._view(), app_id)
+                if existing is None:
+                    return None
+                
+                # The id is the journal key and never changes: an entry under
+                # another id would leave this record in place beside it
+                updated_app = dict(existing)
+                updated_app.update(app_data)
+                updated_app['id'] = app_id
+                updated_app['updated_at'] = current_time
                 
-                # Write all applications
-                for app in applications:
-                    line = '\t'.join(str(app.get(key, '')) for key in headers)
-                    f.write(line + '\n')
+                # Record the new version in the journal
+                self._append_journal(f"{JOURNAL_UPDATE}\t{_format_line(updated_app)}")
+                self._compact_if_needed()
             
-            logging.info(f'Updated application with ID: {app_id}')
+            logger.info("Updated application with ID: %s", app_id)
             return self.find_application_by_id(app_id)
-            
+        
         except Exception as e:
-            logging.error(f'Error updating application: {str(e)}')
+            logger.error("Error updating application: %s", e)
             raise
     
     def delete_application(self, app_id: str) -> bool:
         """Delete an application by ID"""
         try:
-            applications = self.read_all_applications()
-            original_count = len(applications)
-            
-            # Filter out the application to delete
-            applications = [app for app in applications if app.get('id') != app_id]
-            
-            if len(applications) == original_count:
-                return False  # Application not found
-            
-            # Rewrite the file without the deleted application
-            with open(self.applications_file, 'w', encoding='utf-8') as f:
-                # Write headers
-                headers = [
-                    "id", "name", "description", "version", "status",
-                    "created_at", "updated_at", "owner", "category"
-                ]
-                f.write('\t'.join(headers) + '\n')
+            with self._write_lock():
+                if app_id not in self._view()["positions"]:
+                    return False  # Application not found
                 
-                # Write remaining applications
-                for app in applications:
-                    line = '\t'.join(str(app.get(key, '')) for key in headers)
-                    f.write(line + '\n')
+                # Record a tombstone in the journal
+                self._append_journal(f"{JOURNAL_DELETE}\t{app_id}\n")
+                self._compact_if_needed()
             
-            logging.info(f'Deleted application with ID: {app_id}')
+            logger.info("Deleted application with ID: %s", app_id)
             return True
-            
+        
         except Exception as e:
-            logging.error(f'Error deleting application: {str(e)}')
-            raise 
\ No newline at end of file
+            logger.error("Error deleting application: %s", e)
+            raise
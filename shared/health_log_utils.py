@@ -0,0 +1,394 @@
+import atexit
+import glob
+import gzip
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+from file_utils import FileLock
+from json_utils import dumps
+from log_utils import get_logger
+
+logger = get_logger("health_log_utils")
+
+HEALTH_FILE_PATH = os.environ.get("HEALTH_FILE_PATH", "/func1/health.txt")
+
+# Buffered records are flushed once this many are waiting...
+HEALTH_LOG_BATCH_SIZE = int(os.environ.get("HEALTH_LOG_BATCH_SIZE", "20"))
+
+# ...or once the oldest has waited this long
+HEALTH_LOG_FLUSH_SECONDS = float(os.environ.get("HEALTH_LOG_FLUSH_SECONDS", "10"))
+
+# The active log is rotated into a gzip segment once it reaches this size
+HEALTH_LOG_MAX_BYTES = int(os.environ.get("HEALTH_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+
+# Compressed segments kept; older ones are deleted on rotation
+HEALTH_LOG_RETENTION = int(os.environ.get("HEALTH_LOG_RETENTION", "5"))
+
+# Records held in memory while the share is unwritable; the oldest are
+# dropped beyond this
+HEALTH_LOG_MAX_BUFFERED = int(os.environ.get("HEALTH_LOG_MAX_BUFFERED", "1000"))
+
+# Longest a flush waits for another worker's append or rotation; the batch
+# stays queued for the next flush on a timeout
+HEALTH_LOG_LOCK_TIMEOUT_SECONDS = float(os.environ.get("HEALTH_LOG_LOCK_TIMEOUT_SECONDS", "5"))
+
+# Per-minute and per-hour CPU, memory and database-status rollups of the
+# health log, one append-only file per resolution and day. Each worker
+# appends a minute's rollup (and its share of the hour) once the minute
+# has closed, so a file gets at most one line per worker and minute
+HEALTH_ROLLUP_DIR = os.environ.get(
+    "HEALTH_ROLLUP_DIR", os.path.join(os.path.dirname(HEALTH_FILE_PATH), "health_rollups")
+)
+
+# Days of rollup files kept
+HEALTH_ROLLUP_RETENTION_DAYS = int(os.environ.get("HEALTH_ROLLUP_RETENTION_DAYS", "30"))
+
+# Bucket width of each rollup resolution
+ROLLUP_RESOLUTIONS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+}
+
+# Numeric fields summarised as min/avg/max
+ROLLUP_METRICS = ("cpu", "memory")
+
+
+def parse_timestamp(value):
+    """Parse an ISO-8601 timestamp into a naive UTC datetime"""
+    timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timestamp.tzinfo is not None:
+        timestamp = (timestamp - timestamp.utcoffset()).replace(tzinfo=None)
+    return timestamp
+
+
+def format_timestamp(timestamp):
+    return timestamp.isoformat() + "Z"
+
+
+def bucket_start(timestamp, resolution):
+    """Start of the rollup bucket holding timestamp"""
+    if resolution == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(second=0, microsecond=0)
+
+
+def rollup_path(rollup_dir, resolution, day):
+    return os.path.join(rollup_dir, f"{resolution}-{day.isoformat()}.ndjson")
+
+
+def summarize(record):
+    """The fields of a health record kept in the rollups, or None"""
+    try:
+        timestamp = parse_timestamp(record["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    metrics = record.get("system_metrics") or {}
+    database = (record.get("checks") or {}).get("database") or {}
+    return {
+        "timestamp": timestamp,
+        "cpu": (metrics.get("cpu") or {}).get("percent"),
+        "memory": (metrics.get("memory") or {}).get("percent"),
+        "database": database.get("status", "unknown"),
+    }
+
+
+def _merge_stats(stats, other):
+    """Combine two {min, max, sum, count} summaries; either may be None"""
+    if stats is None:
+        return dict(other) if other else None
+    if other:
+        stats["min"] = min(stats["min"], other["min"])
+        stats["max"] = max(stats["max"], other["max"])
+        stats["sum"] += other["sum"]
+        stats["count"] += other["count"]
+    return stats
+
+
+def merge_rollup(target, source):
+    """Fold one bucket's rollup into another"""
+    target["count"] += source["count"]
+    for metric in ROLLUP_METRICS:
+        target[metric] = _merge_stats(target.get(metric), source.get(metric))
+    for status, count in source["database"].items():
+        target["database"][status] = target["database"].get(status, 0) + count
+    return target
+
+
+def rollup(summaries, resolution):
+    """Aggregate record summaries into {bucket start: rollup}"""
+    buckets = {}
+    for summary in summaries:
+        bucket = buckets.setdefault(
+            bucket_start(summary["timestamp"], resolution),
+            {"count": 0, "cpu": None, "memory": None, "database": {}}
+        )
+        merge_rollup(bucket, {
+            "count": 1,
+            **{
+                metric: {"min": summary[metric], "max": summary[metric], "sum": summary[metric], "count": 1}
+                if isinstance(summary[metric], (int, float)) else None
+                for metric in ROLLUP_METRICS
+            },
+            "database": {summary["database"]: 1},
+        })
+    return buckets
+
+
+def read_history(resolution, start, end, rollup_dir=None):
+    """Rollups of the buckets in [start, end), oldest first.
+    
+    Only the day files overlapping the window are read; each holds one
+    partial rollup per worker and closed minute, merged here.
+    """
+    rollup_dir = rollup_dir or HEALTH_ROLLUP_DIR
+    merged = {}
+    day = start.date()
+    while day <= end.date():
+        try:
+            with open(rollup_path(rollup_dir, resolution, day), "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        bucket = parse_timestamp(entry["bucket"])
+                    except (ValueError, KeyError):
+                        # A torn line from an interrupted append
+                        continue
+                    if start <= bucket < end:
+                        if bucket in merged:
+                            merge_rollup(merged[bucket], entry)
+                        else:
+                            merged[bucket] = entry
+        except FileNotFoundError:
+            pass
+        day += timedelta(days=1)
+    
+    history = []
+    for bucket in sorted(merged):
+        entry = merged[bucket]
+        item = {"bucket": format_timestamp(bucket), "count": entry["count"]}
+        for metric in ROLLUP_METRICS:
+            stats = entry.get(metric)
+            item[metric] = {
+                "min": stats["min"],
+                "avg": round(stats["sum"] / stats["count"], 2),
+                "max": stats["max"]
+            } if stats else None
+        item["database"] = entry["database"]
+        history.append(item)
+    return history
+
+
+class HealthLogWriter:
+    """Buffered, size-rotated JSON-lines writer for the health log.
+    
+    write() only queues the serialised record; a daemon thread appends
+    queued records in one write per batch through a single handle kept open
+    for the worker. When the file passes max_bytes it is renamed to a
+    timestamped segment, gzip-compressed, and segments beyond the retention
+    count are removed. Each append, and the rotation that may follow it,
+    holds an exclusive FileLock on <path>.lock, so workers sharing the log
+    over SMB neither interleave appends nor write into a segment another
+    worker is rotating away; a worker whose handle was rotated away sees
+    its file identity differ from the path and reopens.
+    
+    With a rollup_dir, the writer also keeps rollups of the minutes still
+    open in memory and appends each minute's rollup, and its share of the
+    hour, once the minute has closed, so history queries never read the log
+    and read at most one line per worker and minute.
+    """
+    
+    def __init__(self, path=HEALTH_FILE_PATH, batch_size=HEALTH_LOG_BATCH_SIZE,
+                 flush_seconds=HEALTH_LOG_FLUSH_SECONDS, max_bytes=HEALTH_LOG_MAX_BYTES,
+                 retention=HEALTH_LOG_RETENTION, max_buffered=HEALTH_LOG_MAX_BUFFERED,
+                 rollup_dir=None, rollup_retention_days=HEALTH_ROLLUP_RETENTION_DAYS):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_bytes = max_bytes
+        self.retention = retention
+        self.max_buffered = max_buffered
+        self.rollup_dir = rollup_dir
+        self.rollup_retention_days = rollup_retention_days
+        self._pruned_day = None
+        self._open_minutes = {}
+        self._buffer = []
+        self._condition = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._handle = None
+        self._pid = None
+        self._thread = None
+        self._thread_pid = None
+    
+    def write(self, record):
+        """Queue one record; never touches the file system"""
+        entry = (dumps(record) + b"\n", summarize(record))
+        with self._condition:
+            self._ensure_flusher()
+            self._buffer.append(entry)
+            if len(self._buffer) > self.max_buffered:
+                del self._buffer[:len(self._buffer) - self.max_buffered]
+            if len(self._buffer) >= self.batch_size:
+                self._condition.notify()
+    
+    def _ensure_flusher(self):
+        # Called with the condition held; restarts the thread after a fork
+        if self._thread_pid != os.getpid():
+            self._thread = threading.Thread(target=self._run, name="health-log-writer", daemon=True)
+            self._thread.start()
+            self._thread_pid = os.getpid()
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                if len(self._buffer) < self.batch_size:
+                    self._condition.wait(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Failed to flush health log: %s", e)
+    
+    def flush(self, final=False):
+        """Append every queued record; returns the number written.
+        
+        Rollups of closed minutes are appended as well, and with final
+        (at interpreter exit) those of the minutes still open.
+        """
+        with self._io_lock:
+            with self._condition:
+                batch, self._buffer = self._buffer, []
+            if batch:
+                written = False
+                try:
+                    with FileLock(self.path + ".lock", exclusive=True,
+                                  timeout=HEALTH_LOG_LOCK_TIMEOUT_SECONDS):
+                        handle = self._open()
+                        handle.write(b"".join(line for line, _ in batch))
+                        handle.flush()
+                        written = True
+                        if os.fstat(handle.fileno()).st_size >= self.max_bytes:
+                            self._rotate()
+                except Exception:
+                    if not written:
+                        # Keep the batch for the next attempt, ahead of newer records
+                        with self._condition:
+                            self._buffer[:0] = batch
+                            if len(self._buffer) > self.max_buffered:
+                                del self._buffer[:len(self._buffer) - self.max_buffered]
+                        self._close()
+                    raise
+            if self.rollup_dir:
+                try:
+                    self._append_rollups([summary for _, summary in batch if summary], final)
+                except Exception as e:
+                    logger.error("Failed to update health rollups: %s", e)
+            return len(batch)
+    
+    def _append_rollups(self, summaries, final=False):
+        """Fold summaries into the open minutes and append those that have closed"""
+        for bucket, stats in rollup(summaries, "minute").items():
+            if bucket in self._open_minutes:
+                merge_rollup(self._open_minutes[bucket], stats)
+            else:
+                self._open_minutes[bucket] = stats
+        
+        now = datetime.utcnow()
+        closed = {
+            bucket: self._open_minutes.pop(bucket)
+            for bucket in sorted(self._open_minutes)
+            if final or bucket + ROLLUP_RESOLUTIONS["minute"] <= now
+        }
+        if closed:
+            hours = {}
+            for bucket, stats in closed.items():
+                hour = hours.setdefault(bucket_start(bucket, "hour"),
+                                        {"count": 0, "cpu": None, "memory": None, "database": {}})
+                merge_rollup(hour, stats)
+            
+            os.makedirs(self.rollup_dir, exist_ok=True)
+            lines = {}
+            for resolution, buckets in (("minute", closed), ("hour", hours)):
+                for bucket, stats in buckets.items():
+                    path = rollup_path(self.rollup_dir, resolution, bucket.date())
+                    lines.setdefault(path, []).append(dumps({"bucket": format_timestamp(bucket), **stats}) + b"\n")
+            for path, entries in lines.items():
+                with open(path, "ab") as f:
+                    f.write(b"".join(entries))
+        
+        today = datetime.utcnow().date()
+        if self._pruned_day != today:
+            cutoff = (today - timedelta(days=self.rollup_retention_days)).isoformat()
+            for path in glob.glob(os.path.join(glob.escape(self.rollup_dir), "*.ndjson")):
+                day = os.path.basename(path).split("-", 1)[-1][:-len(".ndjson")]
+                if day < cutoff:
+                    os.remove(path)
+            self._pruned_day = today
+    
+    def _open(self):
+        """The worker's append handle, reopened if the file was rotated away"""
+        if self._handle is not None and self._pid == os.getpid():
+            try:
+                current = os.stat(self.path)
+                opened = os.fstat(self._handle.fileno())
+                if (current.st_dev, current.st_ino) == (opened.st_dev, opened.st_ino):
+                    return self._handle
+            except FileNotFoundError:
+                pass
+        self._close()
+        self._handle = open(self.path, "ab")
+        self._pid = os.getpid()
+        return self._handle
+    
+    def _close(self):
+        if self._handle is not None:
+            try:
+                self._handle.close()
+            except OSError:
+                pass
+            self._handle = None
+    
+    def segments(self):
+        """Compressed segments, oldest first"""
+        return sorted(glob.glob(glob.escape(self.path) + ".*.gz"))
+    
+    def _rotate(self):
+        # Called with the log lock held
+        self._close()
+        try:
+            segment = f"{self.path}.{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}"
+            os.replace(self.path, segment)
+        except FileNotFoundError:
+            return
+        
+        logger.info("Rotating health log into %s.gz", segment)
+        with open(segment, "rb") as source, gzip.open(segment + ".gz", "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.remove(segment)
+        
+        for expired in self.segments()[:-self.retention or None]:
+            os.remove(expired)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _flush_at_exit(writer):
+    """Final flush at interpreter exit; a failure is logged, not re-raised"""
+    try:
+        writer.flush(final=True)
+    except Exception as e:
+        logger.error("Failed to flush health log at exit: %s", e)
+
+
+def get_health_log():
+    """The worker's health log writer, flushed again at interpreter exit"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = HealthLogWriter(rollup_dir=HEALTH_ROLLUP_DIR)
+                atexit.register(_flush_at_exit, _writer)
+    return _writer
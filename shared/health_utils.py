@@ -0,0 +1,478 @@
+import concurrent.futures
+import contextvars
+import copy
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+from db_utils import DiagramDBManager
+from health_log_utils import HEALTH_FILE_PATH
+from log_utils import get_logger
+from metrics_utils import metrics_snapshot
+
+logger = get_logger("health_utils")
+
+# Deadline for a single health probe, measured from the start of the check;
+# the database and file-system probes can be set individually
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.environ.get("HEALTH_PROBE_TIMEOUT_SECONDS", "5"))
+PROBE_TIMEOUTS = {
+    "database": float(os.environ.get("HEALTH_DB_TIMEOUT_SECONDS", HEALTH_PROBE_TIMEOUT_SECONDS)),
+    "file_system": float(os.environ.get("HEALTH_FS_TIMEOUT_SECONDS", HEALTH_PROBE_TIMEOUT_SECONDS)),
+}
+
+# Pool shared by all probes in a worker; sized so that a few hung probes
+# (which keep their thread until they return) do not starve new checks
+_probe_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.environ.get("HEALTH_PROBE_WORKERS", "8")),
+    thread_name_prefix="health-probe"
+)
+
+# Schema introspection (databases, schemas, tables, columns) is reused for
+# this long before /health queries the catalogs again
+HEALTH_SCHEMA_CACHE_SECONDS = float(os.environ.get("HEALTH_SCHEMA_CACHE_SECONDS", "300"))
+_schema_cache = None
+_schema_lock = threading.Lock()
+
+# The readiness report is recomputed in the background this often; probes
+# in between are answered from the cached copy
+READINESS_REFRESH_SECONDS = float(os.environ.get("HEALTH_READY_REFRESH_SECONDS", "15"))
+
+# A cached report older than this is still served, flagged stale, while a
+# refresh runs (stale-while-revalidate)
+READINESS_MAX_STALE_SECONDS = float(os.environ.get("HEALTH_READY_MAX_STALE_SECONDS", "60"))
+
+
+def _utc_timestamp():
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _introspect_schema(cursor):
+    """Version, databases, schemas, public tables and t_diagram columns"""
+    cursor.execute("SELECT current_database(), version()")
+    db_info = cursor.fetchone()
+    database_info = {
+        "current_database": db_info[0] if db_info else "unknown",
+        "version": db_info[1] if db_info else "unknown"
+    }
+    
+    # List all databases
+    cursor.execute("SELECT datname FROM pg_database WHERE datistemplate = false")
+    database_info["available_databases"] = [db[0] for db in cursor.fetchall()]
+    
+    # List all schemas in current database
+    cursor.execute("SELECT schema_name FROM information_schema.schemata")
+    database_info["schemas"] = [schema[0] for schema in cursor.fetchall()]
+    
+    # List all tables in public schema
+    cursor.execute("""
+        SELECT table_name, table_type
+        FROM information_schema.tables
+        WHERE table_schema = 'public'
+        ORDER BY table_name
+    """)
+    tables_info = {
+        "public_schema_tables": [
+            {"name": table[0], "type": table[1]} for table in cursor.fetchall()
+        ]
+    }
+    
+    # Get detailed information about t_diagram table
+    cursor.execute("""
+        SELECT column_name, data_type, is_nullable, column_default
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 't_diagram'
+        ORDER BY ordinal_position
+    """)
+    tables_info["t_diagram_structure"] = [
+        {
+            "column_name": col[0],
+            "data_type": col[1],
+            "is_nullable": col[2],
+            "default_value": col[3]
+        } for col in cursor.fetchall()
+    ]
+    return {"database_info": database_info, "tables_info": tables_info}
+
+
+def _schema_info(cursor):
+    """Schema introspection, re-queried at most every HEALTH_SCHEMA_CACHE_SECONDS"""
+    global _schema_cache
+    
+    now = time.monotonic()
+    with _schema_lock:
+        cached = _schema_cache
+    if cached is None or now - cached[0] >= HEALTH_SCHEMA_CACHE_SECONDS:
+        logger.debug("Refreshing schema introspection...")
+        cached = (time.monotonic(), _introspect_schema(cursor))
+        with _schema_lock:
+            _schema_cache = cached
+    
+    # Callers add to these dicts, so hand out copies
+    info = copy.deepcopy(cached[1])
+    info["age_seconds"] = round(time.monotonic() - cached[0], 3)
+    return info
+
+
+def _estimate_row_count(cursor):
+    """t_diagram row count from pg_class/pg_stat_user_tables: (count, method)"""
+    cursor.execute("""
+        SELECT c.reltuples::bigint, s.n_live_tup
+        FROM pg_class c
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+        WHERE c.oid = 'public.t_diagram'::regclass
+    """)
+    reltuples, live_tuples = cursor.fetchone()
+    # reltuples is -1 (or 0 before PostgreSQL 14) until the first ANALYZE
+    if reltuples is not None and reltuples > 0:
+        return reltuples, "estimate"
+    return live_tuples or 0, "live_tuples"
+
+
+def check_database(detailed=False, exact_count=False):
+    """Probe the database; detailed adds catalog and t_diagram information.
+    
+    The row count is the planner estimate unless exact_count is set.
+    """
+    db_check = {
+        "status": "unknown",
+        "connection": False,
+        "table_readable": False,
+        "error": None
+    }
+    if detailed:
+        db_check.update({
+            "connection_details": {},
+            "database_info": {},
+            "tables_info": {},
+            "detailed_errors": []
+        })
+    
+    conn = None
+    try:
+        logger.debug("Testing database connectivity...")
+        
+        # Test database connection. The probe's deadline only stops waiting
+        # for it, so bound the connect and every query as well; otherwise
+        # probes against a hung server hold pool threads until none are left
+        timeout = PROBE_TIMEOUTS["database"]
+        db_manager = DiagramDBManager()
+        db_manager.connection_string.update({
+            # Whole seconds, as libpq expects
+            "connect_timeout": max(1, math.ceil(timeout)),
+            "options": f"-c statement_timeout={max(1, int(timeout * 1000))}",
+        })
+        conn = db_manager._get_connection()
+        db_check["connection"] = True
+        db_check["status"] = "connected"
+        logger.debug("Database connection successful")
+        
+        cursor = conn.cursor()
+        
+        if not detailed:
+            cursor.execute("SELECT 1 FROM public.t_diagram LIMIT 1")
+            cursor.fetchone()
+            db_check["table_readable"] = True
+            return db_check
+        
+        # Get connection details
+        db_check["connection_details"] = {
+            "host": db_manager.connection_string["host"],
+            "port": db_manager.connection_string["port"],
+            "database": db_manager.connection_string["dbname"],
+            "user": db_manager.connection_string["user"],
+            "connected_at": _utc_timestamp()
+        }
+        
+        # Catalog introspection only changes with migrations: cached per worker
+        schema_info = _schema_info(cursor)
+        db_check["database_info"] = schema_info["database_info"]
+        db_check["tables_info"] = schema_info["tables_info"]
+        db_check["schema_cache_age_seconds"] = schema_info["age_seconds"]
+        
+        # Row count from planner statistics; COUNT(*) is a full scan
+        if exact_count:
+            cursor.execute("SELECT COUNT(*) FROM public.t_diagram")
+            result = cursor.fetchone()
+            db_check["table_count"] = result[0] if result else 0
+            db_check["table_count_method"] = "exact"
+        else:
+            db_check["table_count"], db_check["table_count_method"] = _estimate_row_count(cursor)
+        db_check["table_readable"] = True
+        logger.debug("Table readable, count (%s): %s", db_check["table_count_method"], db_check["table_count"])
+        
+        # Test a simple query to verify table structure
+        cursor.execute("SELECT diagram_id, name FROM public.t_diagram LIMIT 1")
+        sample_result = cursor.fetchone()
+        if sample_result:
+            db_check["sample_data"] = {
+                "diagram_id": sample_result[0],
+                "name": sample_result[1]
+            }
+        
+        # Get table size information
+        cursor.execute("""
+            SELECT
+                pg_size_pretty(pg_total_relation_size('public.t_diagram')) as total_size,
+                pg_size_pretty(pg_relation_size('public.t_diagram')) as table_size,
+                pg_size_pretty(pg_total_relation_size('public.t_diagram') - pg_relation_size('public.t_diagram')) as index_size
+        """)
+        size_info = cursor.fetchone()
+        if size_info:
+            db_check["tables_info"]["t_diagram_size"] = {
+                "total_size": size_info[0],
+                "table_size": size_info[1],
+                "index_size": size_info[2]
+            }
+        
+        logger.debug("Database check completed successfully")
+    
+    except Exception as db_error:
+        error_msg = f"Database check failed: {str(db_error)}"
+        logger.error("%s", error_msg)
+        db_check["status"] = "error"
+        db_check["error"] = error_msg
+        if detailed:
+            db_check["detailed_errors"].append({
+                "type": type(db_error).__name__,
+                "message": str(db_error),
+                "timestamp": _utc_timestamp()
+            })
+            
+            # Try to get more specific error information
+            if "password" in str(db_error).lower():
+                db_check["detailed_errors"][-1]["suggestion"] = "Check POSTGRES_PASSWORD environment variable"
+            elif "connection" in str(db_error).lower():
+                db_check["detailed_errors"][-1]["suggestion"] = "Check network connectivity and firewall rules"
+            elif "database" in str(db_error).lower():
+                db_check["detailed_errors"][-1]["suggestion"] = "Check if database 'Architecture' exists"
+            elif "table" in str(db_error).lower():
+                db_check["detailed_errors"][-1]["suggestion"] = "Check if table 'public.t_diagram' exists"
+    finally:
+        if conn:
+            conn.close()
+    
+    return db_check
+
+
+def check_file_system(path=HEALTH_FILE_PATH):
+    """Check that the health file exists on the mount, creating it if needed"""
+    file_check = {
+        "exists": os.path.exists(path),
+        "path": path
+    }
+    
+    # Create health.txt if it doesn't exist
+    if not file_check["exists"]:
+        logger.debug("Creating health file: %s", path)
+        try:
+            with open(path, 'w') as f:
+                f.write("# Health Check Log\n")
+            file_check["created"] = True
+            file_check["exists"] = True
+        except Exception as e:
+            logger.error("Failed to create health file: %s", e)
+            file_check["error"] = str(e)
+    
+    return file_check
+
+
+def system_metrics():
+    """Memory, CPU and worker-process usage from the background sampler"""
+    snapshot = metrics_snapshot()
+    latest = snapshot["latest"]
+    return {
+        "memory": {
+            "total": latest["memory_total"],
+            "available": latest["memory_available"],
+            "percent": latest["memory_percent"],
+            "used": latest["memory_used"]
+        },
+        "cpu": {
+            "percent": latest["cpu_percent"]
+        },
+        "process": {
+            "rss": latest["process_rss"],
+            "cpu_percent": latest["process_cpu_percent"],
+            "open_fds": latest["open_fds"],
+            "threads": latest["threads"]
+        },
+        "sampled_at": latest["timestamp"],
+        "averages": snapshot["averages"]
+    }
+
+
+def _timed(probe, *args):
+    """Run a probe and return (result, duration_ms)"""
+    started = time.perf_counter()
+    result = probe(*args)
+    return result, round((time.perf_counter() - started) * 1000, 2)
+
+
+def run_probes(probes, timeouts=None):
+    """Run probes concurrently, each bounded by its own deadline.
+    
+    probes maps a name to a callable, or to a (callable, args) tuple.
+    Returns {name: {"status", "duration_ms", "result"}}. A probe still
+    running at its deadline is reported as timed_out and left to finish
+    on its pool thread; the response is not held for it.
+    """
+    timeouts = timeouts or {}
+    started = time.perf_counter()
+    futures = {}
+    for name, probe in probes.items():
+        probe, args = probe if isinstance(probe, tuple) else (probe, ())
+        # Run in a copy of the request context so probe spans join the trace
+        context = contextvars.copy_context()
+        futures[name] = _probe_executor.submit(context.run, _timed, probe, *args)
+    
+    outcomes = {}
+    for name, future in futures.items():
+        timeout = timeouts.get(name, PROBE_TIMEOUTS.get(name, HEALTH_PROBE_TIMEOUT_SECONDS))
+        remaining = max(0.0, timeout - (time.perf_counter() - started))
+        try:
+            result, duration_ms = future.result(timeout=remaining)
+            outcomes[name] = {"status": "ok", "duration_ms": duration_ms, "result": result}
+        except concurrent.futures.TimeoutError:
+            logger.warning("Health probe %s timed out after %ss", name, timeout)
+            outcomes[name] = {
+                "status": "timed_out",
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "result": {"status": "timed_out", "timeout_seconds": timeout}
+            }
+        except Exception as e:
+            logger.error("Health probe %s failed: %s", name, e)
+            outcomes[name] = {
+                "status": "error",
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "result": {"status": "error", "error": str(e)}
+            }
+    return outcomes
+
+
+def _probe_timings(outcomes):
+    return {
+        name: {"status": outcome["status"], "duration_ms": outcome["duration_ms"]}
+        for name, outcome in outcomes.items()
+    }
+
+
+def build_health_report(exact_count=False):
+    """Full health report served by /health"""
+    outcomes = run_probes({
+        "database": (check_database, (True, exact_count)),
+        "file_system": check_file_system,
+        "system_metrics": system_metrics
+    })
+    db_check = outcomes["database"]["result"]
+    file_check = outcomes["file_system"]["result"]
+    
+    # Determine overall health status
+    overall_status = "healthy"
+    if db_check["status"] in ("error", "timed_out") or outcomes["file_system"]["status"] != "ok":
+        overall_status = "degraded"
+    
+    return {
+        "status": overall_status,
+        "timestamp": _utc_timestamp(),
+        "service": "Friday APIC",
+        "version": "1.0.0",
+        "checks": {
+            "runtime": "healthy",
+            "database": db_check,
+            "file_system": file_check
+        },
+        "system_metrics": outcomes["system_metrics"]["result"],
+        "probes": _probe_timings(outcomes)
+    }
+
+
+def build_readiness_report():
+    """Readiness: the dependencies a request needs are reachable"""
+    outcomes = run_probes({
+        "database": check_database,
+        "file_system": check_file_system
+    })
+    checks = {name: outcome["result"] for name, outcome in outcomes.items()}
+    ready = checks["database"]["status"] == "connected" and checks["file_system"].get("exists", False)
+    return {
+        "status": "ready" if ready else "not_ready",
+        "checked_at": _utc_timestamp(),
+        "checks": checks,
+        "probes": _probe_timings(outcomes)
+    }
+
+
+class ReadinessCache:
+    """Serve a probe result from memory, refreshing it off the request path.
+    
+    A daemon thread re-runs the probe every refresh_seconds. Reads never
+    wait on the probe once a first result exists: a result older than
+    max_stale_seconds (for example while the refresher is stuck on a slow
+    dependency) is still returned, flagged stale, and a one-off refresh is
+    kicked off in the background.
+    """
+    
+    def __init__(self, probe, refresh_seconds=READINESS_REFRESH_SECONDS,
+                 max_stale_seconds=READINESS_MAX_STALE_SECONDS):
+        self._probe = probe
+        self.refresh_seconds = refresh_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self._lock = threading.Lock()
+        self._report = None
+        self._checked_at = 0.0
+        self._refreshing = False
+        self._refresher = None
+    
+    def _refresh(self):
+        try:
+            report = self._probe()
+        except Exception as e:
+            logger.error("Readiness probe failed: %s", e)
+            report = {"status": "not_ready", "checked_at": _utc_timestamp(), "error": str(e)}
+        with self._lock:
+            self._report = report
+            self._checked_at = time.monotonic()
+            self._refreshing = False
+    
+    def _revalidate(self):
+        """Start a single background refresh unless one is already running"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name="readiness-revalidate", daemon=True).start()
+    
+    def _run_refresher(self):
+        while True:
+            time.sleep(self.refresh_seconds)
+            self._revalidate()
+    
+    def _ensure_refresher(self):
+        if self._refresher is None:
+            with self._lock:
+                if self._refresher is None:
+                    self._refresher = threading.Thread(
+                        target=self._run_refresher, name="readiness-refresher", daemon=True
+                    )
+                    self._refresher.start()
+    
+    def get(self):
+        """Return (report, age_seconds, stale)"""
+        self._ensure_refresher()
+        if self._report is None:
+            # First probe in this worker: nothing to serve yet
+            with self._lock:
+                self._refreshing = True
+            self._refresh()
+            return self._report, 0.0, False
+        
+        age = time.monotonic() - self._checked_at
+        stale = age > self.max_stale_seconds
+        if stale:
+            self._revalidate()
+        return self._report, age, stale
+
+
+readiness_cache = ReadinessCache(build_readiness_report)
@@ -0,0 +1,211 @@
+import functools
+import gzip
+import os
+
+import azure.functions as func
+
+from json_utils import dumps, wants_pretty
+from log_utils import start_request, end_request
+from trace_utils import CORRELATION_HEADER, start_trace, end_trace, span
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MIMETYPE = "application/json"
+NDJSON_MIMETYPE = "application/x-ndjson"
+MSGPACK_MIMETYPE = "application/msgpack"
+
+# ?format= shortcuts and Accept header aliases for the media types above
+FORMAT_ALIASES = {
+    "json": JSON_MIMETYPE,
+    "ndjson": NDJSON_MIMETYPE,
+    "msgpack": MSGPACK_MIMETYPE,
+    "application/x-msgpack": MSGPACK_MIMETYPE,
+    "application/jsonl": NDJSON_MIMETYPE,
+}
+
+# CORS headers attached by http_function to every response for the static web UI
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "https://stfrdywpuiprdcac.z9.web.core.windows.net",
+    "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With, X-Correlation-ID, traceparent",
+    "Access-Control-Allow-Credentials": "true",
+    "Access-Control-Expose-Headers": "Server-Timing, X-Correlation-ID, X-Export-Next-After, X-Sync-Token"
+}
+
+# Browsers cache a preflight for this long, so repeat PUT/DELETE calls from
+# the web UI skip the extra OPTIONS round trip
+CORS_MAX_AGE_SECONDS = int(os.environ.get("CORS_MAX_AGE_SECONDS", "86400"))
+
+PREFLIGHT_HEADERS = dict(CORS_HEADERS)
+PREFLIGHT_HEADERS["Access-Control-Max-Age"] = str(CORS_MAX_AGE_SECONDS)
+
+# Bodies smaller than this are sent as-is; compressing them costs more CPU
+# than it saves on the wire.
+COMPRESSION_MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("RESPONSE_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("RESPONSE_BROTLI_QUALITY", "5"))
+
+
+def _supported_encodings():
+    """Encodings this worker can produce, in server preference order"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _parse_weighted_header(value):
+    """Parse an Accept-style header into a {token: q-value} dict"""
+    weights = {}
+    for item in value.split(","):
+        parts = item.strip().split(";")
+        token = parts[0].strip().lower()
+        if not token:
+            continue
+        weight = 1.0
+        for param in parts[1:]:
+            name, _, param_value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(param_value)
+                except ValueError:
+                    weight = 0.0
+        weights[FORMAT_ALIASES.get(token, token)] = weight
+    return weights
+
+
+def choose_encoding(accept_encoding):
+    """Pick the best content encoding allowed by an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+    
+    weights = _parse_weighted_header(accept_encoding)
+    best = None
+    best_weight = 0.0
+    for coding in _supported_encodings():
+        weight = weights.get(coding, weights.get("*", 0.0))
+        # Ties keep the earlier (server preferred) encoding
+        if weight > best_weight:
+            best = coding
+            best_weight = weight
+    return best
+
+
+def compress_body(body, accept_encoding):
+    """Compress a response body for the client, returning (body, encoding)"""
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return body, None
+    
+    encoding = choose_encoding(accept_encoding)
+    if encoding == "br":
+        with span("compress", encoding=encoding):
+            return brotli.compress(body, quality=BROTLI_QUALITY), encoding
+    if encoding == "gzip":
+        with span("compress", encoding=encoding):
+            return gzip.compress(body, compresslevel=GZIP_LEVEL), encoding
+    return body, None
+
+
+def listing_media_types():
+    """Media types a listing endpoint can produce, JSON first as the default"""
+    if msgpack is not None:
+        return (JSON_MIMETYPE, NDJSON_MIMETYPE, MSGPACK_MIMETYPE)
+    return (JSON_MIMETYPE, NDJSON_MIMETYPE)
+
+
+def negotiate_media_type(req, offered):
+    """Pick a response media type from ?format= or the Accept header.
+    
+    Returns None only when ?format= names a type that is not offered;
+    an Accept header that matches nothing falls back to the default.
+    """
+    requested = req.params.get("format")
+    if requested:
+        media_type = FORMAT_ALIASES.get(requested.lower(), requested.lower())
+        return media_type if media_type in offered else None
+    
+    accept = req.headers.get("Accept")
+    if not accept:
+        return offered[0]
+    
+    weights = _parse_weighted_header(accept)
+    best = offered[0]
+    best_weight = 0.0
+    for media_type in offered:
+        main_type = media_type.split("/")[0]
+        weight = weights.get(media_type, weights.get(f"{main_type}/*", weights.get("*/*", 0.0)))
+        if weight > best_weight:
+            best = media_type
+            best_weight = weight
+    return best
+
+
+def http_function(route):
+    """Wrap an HTTP function with the shared request middleware.
+    
+    CORS preflights are answered from precomputed headers before the
+    handler runs, every handler response gets the CORS headers, and the
+    handler runs inside a request-scoped logging context and trace for the
+    route. Responses carry a Server-Timing breakdown of the request spans
+    and the correlation ID shared by its logs and exported spans.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(req):
+            if req.method == "OPTIONS":
+                return func.HttpResponse(status_code=200, headers=PREFLIGHT_HEADERS)
+            
+            trace, trace_token = start_trace(route, req.headers)
+            token = start_request(route, request_id=trace.correlation_id)
+            try:
+                with span("handler", route=route, method=req.method):
+                    response = handler(req)
+            finally:
+                end_request(token)
+                end_trace(trace, trace_token)
+            response.headers.update(CORS_HEADERS)
+            response.headers["Server-Timing"] = trace.server_timing()
+            response.headers[CORRELATION_HEADER] = trace.correlation_id
+            return response
+        
+        wrapper.route = route
+        return wrapper
+    return decorator
+
+
+def bytes_response(req, body, mimetype, status_code=200, headers=None):
+    """Build an HttpResponse for an encoded body with negotiated compression"""
+    body, encoding = compress_body(body, req.headers.get("Accept-Encoding"))
+    
+    response_headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        response_headers["Content-Encoding"] = encoding
+    if headers:
+        response_headers.update(headers)
+    
+    return func.HttpResponse(
+        body,
+        status_code=status_code,
+        mimetype=mimetype,
+        charset="utf-8",
+        headers=response_headers
+    )
+
+
+def json_response(req, payload, status_code=200, headers=None):
+    """Build a JSON HttpResponse with negotiated compression"""
+    with span("serialize", format="json"):
+        body = dumps(payload, pretty=wants_pretty(req))
+    return bytes_response(req, body, JSON_MIMETYPE, status_code=status_code, headers=headers)
+
+
+def msgpack_response(req, payload, status_code=200, headers=None):
+    """Build a MessagePack HttpResponse with negotiated compression"""
+    with span("serialize", format="msgpack"):
+        body = msgpack.packb(payload, use_bin_type=True)
+    return bytes_response(req, body, MSGPACK_MIMETYPE, status_code=status_code, headers=headers)
@@ -0,0 +1,35 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj):
+    """Serialise types the JSON encoders do not handle natively"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj, pretty=False):
+    """Encode obj as UTF-8 JSON bytes in a single pass, compact unless pretty"""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        return orjson.dumps(obj, default=_default, option=option)
+    
+    if pretty:
+        return json.dumps(obj, indent=2, default=_default, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), default=_default, ensure_ascii=False).encode("utf-8")
+
+
+def wants_pretty(req):
+    """Whether the caller asked for indented output with ?pretty=1"""
+    return req.params.get("pretty", "").lower() in ("1", "true", "yes")
@@ -0,0 +1,152 @@
+import contextvars
+import json
+import logging
+import math
+import os
+import random
+import uuid
+
+
+def _parse_sample_rates(value):
+    """Parse "route=rate,route=rate" into a dict of sampling rates in [0, 1].
+    
+    Malformed entries are skipped with a warning rather than failing the
+    import of every function that logs.
+    """
+    rates = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        route, _, rate = item.partition("=")
+        try:
+            rate = float(rate)
+            if math.isnan(rate) or not route.strip():
+                raise ValueError(item)
+        except ValueError:
+            logging.getLogger("friday_apic").warning("Ignoring malformed LOG_SAMPLE_RATES entry: %r", item)
+            continue
+        rates[route.strip()] = min(max(rate, 0.0), 1.0)
+    return rates
+
+
+def _parse_log_level(value):
+    """Validate a LOG_LEVEL name, falling back to INFO with a warning.
+    
+    logging rejects unknown names with ValueError, which would otherwise
+    fail the import of every function that logs.
+    """
+    level = value.strip().upper()
+    if not isinstance(logging.getLevelName(level), int):
+        logging.getLogger("friday_apic").warning("Ignoring unknown LOG_LEVEL %r; using INFO", value)
+        return "INFO"
+    return level
+
+
+LOG_LEVEL = _parse_log_level(os.environ.get("LOG_LEVEL", "INFO"))
+LOG_MAX_PAYLOAD_CHARS = int(os.environ.get("LOG_MAX_PAYLOAD_CHARS", "2000"))
+
+# Fraction of requests per route whose debug/info records are emitted, e.g.
+# "diagram/read=0.1,health=0.01". Warnings and errors are never sampled out.
+LOG_SAMPLE_RATES = _parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES", ""))
+
+_logger = logging.getLogger("friday_apic")
+_logger.setLevel(LOG_LEVEL)
+
+_request_context = contextvars.ContextVar("request_context", default=None)
+
+
+def start_request(route, request_id=None):
+    """Open a request scope; returns a token for end_request()"""
+    rate = LOG_SAMPLE_RATES.get(route, 1.0)
+    context = {
+        "route": route,
+        "request_id": request_id or uuid.uuid4().hex,
+        "sampled": rate >= 1.0 or random.random() < rate,
+    }
+    return _request_context.set(context)
+
+
+def end_request(token):
+    """Close the request scope opened by start_request()"""
+    _request_context.reset(token)
+
+
+def current_request():
+    """The active request context, or None outside a request"""
+    return _request_context.get()
+
+
+def truncate(text, limit=None):
+    """Cap a string at limit characters, noting how much was cut"""
+    limit = LOG_MAX_PAYLOAD_CHARS if limit is None else limit
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...<{len(text) - limit} more chars>"
+
+
+class _StructuredMessage:
+    """Log message rendered to JSON only when a handler actually emits it"""
+    
+    __slots__ = ("component", "message", "args", "fields", "context")
+    
+    def __init__(self, component, message, args, fields, context):
+        self.component = component
+        self.message = message
+        self.args = args
+        self.fields = fields
+        self.context = context
+    
+    def __str__(self):
+        record = {
+            "component": self.component,
+            "message": self.message % self.args if self.args else self.message,
+        }
+        if self.context is not None:
+            record["route"] = self.context["route"]
+            record["request_id"] = self.context["request_id"]
+        record.update(self.fields)
+        return json.dumps(record, default=str)
+
+
+class StructuredLogger:
+    """Request-aware logger that emits one JSON object per record"""
+    
+    def __init__(self, component):
+        self.component = component
+    
+    def is_debug(self):
+        return _logger.isEnabledFor(logging.DEBUG)
+    
+    def debug(self, message, *args, **fields):
+        self._log(logging.DEBUG, message, args, fields)
+    
+    def info(self, message, *args, **fields):
+        self._log(logging.INFO, message, args, fields)
+    
+    def warning(self, message, *args, **fields):
+        self._log(logging.WARNING, message, args, fields)
+    
+    def error(self, message, *args, **fields):
+        self._log(logging.ERROR, message, args, fields)
+    
+    def payload(self, message, obj):
+        """Log a truncated payload dump; a no-op unless debug is enabled"""
+        if not self.is_debug():
+            return
+        context = _request_context.get()
+        if context is not None and not context["sampled"]:
+            return
+        self._log(logging.DEBUG, message, (), {"payload": truncate(json.dumps(obj, default=str))})
+    
+    def _log(self, level, message, args, fields):
+        if not _logger.isEnabledFor(level):
+            return
+        context = _request_context.get()
+        if level < logging.WARNING and context is not None and not context["sampled"]:
+            return
+        _logger.log(level, _StructuredMessage(self.component, message, args, fields, context))
+
+
+def get_logger(component):
+    """Structured logger for a function or shared module"""
+    return StructuredLogger(component)
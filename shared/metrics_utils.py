@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import psutil
+
+from log_utils import get_logger
+
+logger = get_logger("metrics_utils")
+
+# Seconds between two samples taken by the background sampler
+METRICS_SAMPLE_SECONDS = float(os.environ.get("METRICS_SAMPLE_SECONDS", "5"))
+
+# Samples kept per worker; with the default interval, five minutes of history
+METRICS_BUFFER_SIZE = int(os.environ.get("METRICS_BUFFER_SIZE", "60"))
+
+# Windows, in seconds, reported as short-window averages
+METRICS_AVERAGE_WINDOWS = (60, 300)
+
+# Sample fields that are averaged; the rest are static or identifiers
+AVERAGED_FIELDS = (
+    "cpu_percent",
+    "memory_percent",
+    "memory_available",
+    "memory_used",
+    "process_rss",
+    "process_cpu_percent",
+    "open_fds",
+    "threads",
+)
+
+
+def _open_fds(process):
+    """Open file descriptors, or handles on Windows"""
+    if hasattr(process, "num_fds"):
+        return process.num_fds()
+    return process.num_handles()
+
+
+class MetricsSampler:
+    """Background sampler of host and worker-process metrics.
+    
+    A daemon thread samples every interval_seconds into a ring buffer, so
+    readers never block: CPU percentages are measured between consecutive
+    samples instead of over a sleep on the request thread.
+    """
+    
+    def __init__(self, interval_seconds=METRICS_SAMPLE_SECONDS, size=METRICS_BUFFER_SIZE):
+        self.interval_seconds = interval_seconds
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._process = None
+    
+    def _take_sample(self):
+        memory = psutil.virtual_memory()
+        with self._process.oneshot():
+            sample = {
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "monotonic": time.monotonic(),
+                "cpu_percent": psutil.cpu_percent(interval=None),
+                "memory_total": memory.total,
+                "memory_available": memory.available,
+                "memory_used": memory.used,
+                "memory_percent": memory.percent,
+                "process_rss": self._process.memory_info().rss,
+                "process_cpu_percent": self._process.cpu_percent(interval=None),
+                "open_fds": _open_fds(self._process),
+                "threads": self._process.num_threads(),
+            }
+        with self._lock:
+            self._samples.append(sample)
+        return sample
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval_seconds)
+            try:
+                self._take_sample()
+            except Exception as e:
+                logger.warning("Metrics sample failed: %s", e)
+    
+    def start(self):
+        """Start sampling in this process; restarts after a fork"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return self
+        with self._lock:
+            if self._pid == pid:
+                return self
+            self._samples.clear()
+            self._process = psutil.Process(pid)
+            # Prime the CPU counters; the first non-blocking reading is
+            # measured from here
+            psutil.cpu_percent(interval=None)
+            self._process.cpu_percent(interval=None)
+            self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+            self._thread.start()
+            self._pid = pid
+        return self
+    
+    def latest(self):
+        """Most recent sample, taking one now if the buffer is still empty"""
+        self.start()
+        with self._lock:
+            if self._samples:
+                return self._samples[-1]
+        return self._take_sample()
+    
+    def samples(self, window_seconds=None):
+        """Buffered samples, oldest first, optionally limited to a recent window"""
+        with self._lock:
+            samples = list(self._samples)
+        if window_seconds is None:
+            return samples
+        cutoff = time.monotonic() - window_seconds
+        return [sample for sample in samples if sample["monotonic"] >= cutoff]
+    
+    def averages(self, window_seconds):
+        """Mean of each averaged field over the window, or None without samples"""
+        samples = self.samples(window_seconds)
+        if not samples:
+            return None
+        averages = {
+            field: round(sum(sample[field] for sample in samples) / len(samples), 2)
+            for field in AVERAGED_FIELDS
+        }
+        averages["samples"] = len(samples)
+        return averages
+
+
+_sampler = MetricsSampler()
+
+
+def get_sampler():
+    """The running per-worker sampler"""
+    return _sampler.start()
+
+
+def metrics_snapshot():
+    """Latest sample and short-window averages, without blocking"""
+    sampler = get_sampler()
+    latest = dict(sampler.latest())
+    latest.pop("monotonic", None)
+    return {
+        "latest": latest,
+        "averages": {
+            f"{window}s": sampler.averages(window) for window in METRICS_AVERAGE_WINDOWS
+        },
+        "interval_seconds": sampler.interval_seconds
+    }
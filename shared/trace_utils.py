@@ -0,0 +1,185 @@
+import contextvars
+import json
+import os
+import queue
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+
+# Local OTLP/HTTP collector (e.g. http://localhost:4318); spans are only
+# exported when this or TRACE_EXPORT_FILE is set.
+OTLP_ENDPOINT = os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+# JSON-lines file of OTLP payloads, a collector stand-in for local runs
+TRACE_EXPORT_FILE = os.environ.get("TRACE_EXPORT_FILE", "")
+SERVICE_NAME = os.environ.get("OTEL_SERVICE_NAME", "friday-apic")
+
+CORRELATION_HEADER = "X-Correlation-ID"
+
+_TRACEPARENT_RE = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span_id = contextvars.ContextVar("current_span_id", default=None)
+
+
+class Trace:
+    """Spans recorded for one request"""
+    
+    def __init__(self, name, correlation_id=None, trace_id=None, parent_span_id=None):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.correlation_id = correlation_id or self.trace_id
+        self.parent_span_id = parent_span_id
+        self.spans = []
+    
+    def server_timing(self):
+        """Server-Timing header value, summing spans that share a name"""
+        totals = {}
+        for span_record in self.spans:
+            duration_ms = (span_record["end_ns"] - span_record["start_ns"]) / 1e6
+            totals[span_record["name"]] = totals.get(span_record["name"], 0.0) + duration_ms
+        return ", ".join(f"{name};dur={duration:.1f}" for name, duration in totals.items())
+
+
+def start_trace(name, headers=None):
+    """Begin a request trace, continuing an incoming traceparent or correlation ID"""
+    headers = headers or {}
+    trace_id = None
+    parent_span_id = None
+    match = _TRACEPARENT_RE.match(headers.get("traceparent", "").strip().lower())
+    if match:
+        trace_id, parent_span_id = match.groups()
+    
+    trace = Trace(name, headers.get(CORRELATION_HEADER), trace_id, parent_span_id)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(trace, token):
+    """Finish a request trace and queue it for export"""
+    _current_trace.reset(token)
+    if OTLP_ENDPOINT or TRACE_EXPORT_FILE:
+        _exporter().submit(trace)
+
+
+def current_trace():
+    """The active request trace, or None outside a request"""
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a block as a child span of the current request; a no-op outside one"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    
+    span_id = uuid.uuid4().hex[:16]
+    parent_id = _current_span_id.get() or trace.parent_span_id
+    token = _current_span_id.set(span_id)
+    start_ns = time.time_ns()
+    try:
+        yield
+    finally:
+        _current_span_id.reset(token)
+        trace.spans.append({
+            "name": name,
+            "span_id": span_id,
+            "parent_span_id": parent_id,
+            "start_ns": start_ns,
+            "end_ns": time.time_ns(),
+            "attributes": attributes,
+        })
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(traces):
+    """Encode finished traces as an OTLP/JSON ExportTraceServiceRequest"""
+    spans = []
+    for trace in traces:
+        for span_record in trace.spans:
+            attributes = dict(span_record["attributes"])
+            attributes["correlation_id"] = trace.correlation_id
+            spans.append({
+                "traceId": trace.trace_id,
+                "spanId": span_record["span_id"],
+                "parentSpanId": span_record["parent_span_id"] or "",
+                "name": span_record["name"],
+                "kind": 2 if span_record["parent_span_id"] == trace.parent_span_id else 1,
+                "startTimeUnixNano": str(span_record["start_ns"]),
+                "endTimeUnixNano": str(span_record["end_ns"]),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()],
+            })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "friday_apic"}, "spans": spans}],
+        }]
+    }
+
+
+class _SpanExporter:
+    """Ships finished traces from a background thread so requests never wait on export"""
+    
+    def __init__(self, max_queue=1000, batch_size=50):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._batch_size = batch_size
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+    
+    def submit(self, trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            pass  # Dropping spans is preferable to slowing requests down
+    
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._export(to_otlp(batch))
+            except Exception:
+                pass  # The collector is optional; never let export errors surface
+    
+    def _export(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        if TRACE_EXPORT_FILE:
+            with open(TRACE_EXPORT_FILE, "ab") as f:
+                f.write(body + b"\n")
+        if OTLP_ENDPOINT:
+            request = urllib.request.Request(
+                OTLP_ENDPOINT.rstrip("/") + "/v1/traces",
+                data=body,
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            urllib.request.urlopen(request, timeout=5).close()
+
+
+_exporter_instance = None
+_exporter_lock = threading.Lock()
+
+
+def _exporter():
+    global _exporter_instance
+    if _exporter_instance is None:
+        with _exporter_lock:
+            if _exporter_instance is None:
+                _exporter_instance = _SpanExporter()
+    return _exporter_instance
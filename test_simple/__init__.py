@@ -1,44 +1,39 @@
 import azure.functions as func
-import logging
-import json
+import sys
+import os
+from datetime import datetime
 
+# Add the shared directory to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
+from http_utils import json_response, http_function
+from log_utils import get_logger
+
+logger = get_logger("test_simple")
+
+@http_function("test-simple")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     """
     Simple test function to verify basic functionality
     """
-    print("🚀 [TEST SIMPLE] Function started")
-    logging.info('Test simple function processed a request.')
+    logger.info("Function started")
     
     try:
         response_data = {
             "status": "success",
             "message": "Test function is working",
-            "timestamp": "2025-08-02T19:10:00Z"
+            "timestamp": datetime.utcnow().isoformat() + "Z"
         }
         
-        return func.HttpResponse(
-            json.dumps(response_data, indent=2),
-            status_code=200,
-            mimetype="application/json",
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            }
-        )
-        
+        return json_response(req, response_data, status_code=200)
+    
     except Exception as e:
-        print(f"💥 [TEST SIMPLE] Exception occurred: {str(e)}")
-        logging.error(f'Error in test simple: {str(e)}')
+        logger.error("Exception occurred: %s", e)
         
         error_response = {
             "status": "error",
             "message": "Test function failed",
-            "error": str(e)
+            "error": str(e),
+            "timestamp": datetime.utcnow().isoformat() + "Z"
         }
         
-        return func.HttpResponse(
-            json.dumps(error_response, indent=2),
-            status_code=500,
-            mimetype="application/json"
-        ) 
\ No newline at end of file
+        return json_response(req, error_response, status_code=500)
@@ -0,0 +1,74 @@
+import pytest
+import sys
+import os
+
+psycopg = pytest.importorskip("psycopg")
+
+# Import the schema migration and the synthetic t_diagram DDL
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'synthetic'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'migrations'))
+from apply_schema import apply_schema, INDEX_STATEMENTS
+from generate_diagrams import T_DIAGRAM_DDL
+
+# libpq connection string or URI of a disposable PostgreSQL database; the
+# tests are skipped when it is unset
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "")
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"),
+]
+
+
+@pytest.fixture
+def conn():
+    """A connection to the test database with t_diagram and the schema objects in place"""
+    conn = psycopg.connect(TEST_DATABASE_URL)
+    try:
+        conn.execute(T_DIAGRAM_DDL)
+        apply_schema(conn)
+        yield conn
+    finally:
+        conn.close()
+
+
+def _invalid_indexes(conn):
+    names = [name for name, _, _ in INDEX_STATEMENTS]
+    cursor = conn.execute("""
+        SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = ANY(%s) AND NOT i.indisvalid
+    """, (names,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+class TestSchemaMigrationIntegration:
+    """Tests for the one-off schema migration."""
+    
+    def test_migration_is_idempotent(self, conn):
+        """Test that a second run builds nothing and leaves every index valid."""
+        # Act
+        built = apply_schema(conn)
+        
+        # Assert
+        assert built == []
+        assert _invalid_indexes(conn) == []
+        assert conn.autocommit is False
+    
+    def test_invalid_index_is_rebuilt(self, conn):
+        """Test that an index left invalid by an interrupted concurrent build is built again."""
+        # Arrange
+        try:
+            conn.execute(
+                "UPDATE pg_index SET indisvalid = false WHERE indexrelid = 'public.ix_t_diagram_outbox_txid'::regclass"
+            )
+            conn.commit()
+        except psycopg.errors.InsufficientPrivilege:
+            pytest.skip("marking an index invalid needs superuser")
+        
+        # Act
+        built = apply_schema(conn)
+        
+        # Assert
+        assert built == ["ix_t_diagram_outbox_txid"]
+        assert _invalid_indexes(conn) == []
@@ -0,0 +1,164 @@
+import pytest
+import sys
+import os
+import threading
+from unittest.mock import patch
+
+psycopg = pytest.importorskip("psycopg")
+
+# Import the shared database utilities, the synthetic data generator and
+# the schema migration
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'synthetic'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'migrations'))
+from db_utils import DiagramDBManager
+from apply_schema import apply_schema
+from generate_diagrams import T_DIAGRAM_DDL
+
+# libpq connection string or URI of a disposable PostgreSQL database; the
+# tests are skipped when it is unset
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "")
+
+# Outbox rows written by these tests carry this diagram_id and are removed
+# afterwards
+TEST_DIAGRAM_ID = -28
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"),
+]
+
+
+@pytest.fixture
+def db_manager():
+    """A DiagramDBManager on the test database, with the outbox in place and a checkpoint at its end"""
+    conn = psycopg.connect(TEST_DATABASE_URL)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(T_DIAGRAM_DDL)
+        conn.commit()
+        apply_schema(conn)
+        cursor.execute("SELECT COALESCE(MAX(change_id), 0) FROM public.t_diagram_outbox")
+        checkpoint = cursor.fetchone()[0]
+        conn.commit()
+    finally:
+        conn.close()
+    
+    manager = DiagramDBManager()
+    with patch.object(manager, '_get_connection', side_effect=lambda: psycopg.connect(TEST_DATABASE_URL)):
+        yield manager, checkpoint
+    
+    conn = psycopg.connect(TEST_DATABASE_URL)
+    try:
+        conn.execute("DELETE FROM public.t_diagram_outbox WHERE diagram_id = %s", (TEST_DIAGRAM_ID,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _insert_change(conn):
+    """Write an outbox row without committing and return its change_id"""
+    cursor = conn.execute(
+        "INSERT INTO public.t_diagram_outbox (diagram_id, operation) VALUES (%s, 'update') RETURNING change_id",
+        (TEST_DIAGRAM_ID,)
+    )
+    return cursor.fetchone()[0]
+
+
+def _test_changes(db_manager, checkpoint):
+    return [
+        change['change_id'] for change in db_manager.read_changes(after=checkpoint, limit=10000)['changes']
+        if change['diagram_id'] == TEST_DIAGRAM_ID
+    ]
+
+
+class TestChangeOutboxIntegration:
+    """Commit-order tests for the diagram/changes feed."""
+    
+    def test_feed_stops_at_open_transaction(self, db_manager):
+        """Test that a committed change behind an open transaction's lower change_id is held back."""
+        # Arrange
+        manager, checkpoint = db_manager
+        first = psycopg.connect(TEST_DATABASE_URL)
+        second = psycopg.connect(TEST_DATABASE_URL)
+        try:
+            # The first transaction takes the lower change_id and stays open
+            # while the second commits a higher one
+            lower = _insert_change(first)
+            higher = _insert_change(second)
+            second.commit()
+            
+            # Act
+            while_open = _test_changes(manager, checkpoint)
+            first.commit()
+            after_commit = _test_changes(manager, checkpoint)
+        finally:
+            first.close()
+            second.close()
+        
+        # Assert
+        assert lower < higher
+        assert while_open == []
+        assert after_commit == [lower, higher]
+    
+    def test_unrelated_open_transaction_reports_held_back(self, db_manager):
+        """Test that a batch stopped by a transaction outside the outbox still reports more to read."""
+        # Arrange
+        manager, checkpoint = db_manager
+        unrelated = psycopg.connect(TEST_DATABASE_URL)
+        writer = psycopg.connect(TEST_DATABASE_URL)
+        try:
+            # An open transaction with an xid, e.g. a stats refresh or a load
+            unrelated.execute("SELECT pg_current_xact_id()")
+            higher = _insert_change(writer)
+            writer.commit()
+            
+            # Act
+            while_open = manager.read_changes(after=checkpoint, limit=10000)
+            unrelated.commit()
+            after_commit = manager.read_changes(after=checkpoint, limit=10000)
+        finally:
+            unrelated.close()
+            writer.close()
+        
+        # Assert
+        assert while_open['changes'] == []
+        assert while_open['held_back'] is True
+        assert while_open['has_more'] is True
+        assert higher in [change['change_id'] for change in after_commit['changes']]
+        assert after_commit['held_back'] is False
+    
+    def test_change_ids_follow_commit_order(self, db_manager):
+        """Test that a later writer's change is not delivered ahead of an open transaction's earlier one."""
+        # Arrange
+        manager, checkpoint = db_manager
+        first = psycopg.connect(TEST_DATABASE_URL)
+        second = psycopg.connect(TEST_DATABASE_URL)
+        try:
+            # The second transaction gets the older transaction id, so the
+            # xmin boundary alone would not hold its row back
+            second.execute("SELECT pg_current_xact_id()")
+            manager._record_change(first.cursor(), 'update', TEST_DIAGRAM_ID, None, None, None)
+            
+            def write_second():
+                manager._record_change(second.cursor(), 'update', TEST_DIAGRAM_ID, None, None, None)
+                second.commit()
+            
+            thread = threading.Thread(target=write_second)
+            thread.start()
+            thread.join(0.5)
+            blocked = thread.is_alive()
+            
+            # Act
+            while_open = _test_changes(manager, checkpoint)
+            first.commit()
+            thread.join(10)
+            after_commit = _test_changes(manager, checkpoint)
+        finally:
+            first.close()
+            second.close()
+        
+        # Assert
+        assert while_open == []
+        assert blocked is True
+        assert len(after_commit) == 2
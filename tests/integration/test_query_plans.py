@@ -0,0 +1,252 @@
+import pytest
+import itertools
+import sys
+import os
+from datetime import timedelta
+from unittest.mock import patch
+
+psycopg = pytest.importorskip("psycopg")
+
+# Import the shared database utilities, the synthetic data generator and
+# the schema migration
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'synthetic'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'migrations'))
+from db_utils import DiagramDBManager, UTC_NOW_SQL
+from apply_schema import apply_schema
+from generate_diagrams import DiagramGenerator, T_DIAGRAM_DDL, load
+
+# libpq connection string or URI of a disposable PostgreSQL database; the
+# tests seed it with synthetic diagrams and are skipped when it is unset
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "")
+
+# Minimum t_diagram size the plans are checked against
+PLAN_TEST_ROWS = int(os.environ.get("PLAN_TEST_ROWS", "100000"))
+
+# Sequential scans of tables larger than this, or sorts of more rows than
+# this, fail the test
+PLAN_MAX_ROWS = int(os.environ.get("PLAN_MAX_ROWS", "10000"))
+
+# Planner cost for a random page read; keep it in line with the production
+# server (SSD-backed storage), since it decides index scan versus seq scan
+PLAN_RANDOM_PAGE_COST = float(os.environ.get("PLAN_RANDOM_PAGE_COST", "1.1"))
+
+# Shapes that legitimately read the whole table: with no filter the full
+# listing, export and full sync return every row, so no index can help
+ALLOWED_FULL_SCANS = {
+    "read_diagrams[-/-/-]",
+    "iter_diagrams[-/-]",
+    "iter_diagram_batches[-/-/-]",
+    "sync_diagrams[-/-/-]",
+}
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"),
+]
+
+
+class _RecordingCursor:
+    """Cursor proxy that records every statement it executes"""
+    
+    def __init__(self, cursor, statements):
+        self._cursor = cursor
+        self._statements = statements
+    
+    def execute(self, sql, params=None):
+        self._statements.append((sql, params))
+        return self._cursor.execute(sql, params)
+    
+    def __iter__(self):
+        return iter(self._cursor)
+    
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+    
+    def __exit__(self, *exc_info):
+        return self._cursor.__exit__(*exc_info)
+    
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _RecordingConnection:
+    """Connection proxy that records statements and never commits"""
+    
+    def __init__(self, conn):
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "statements", [])
+    
+    def cursor(self, *args, **kwargs):
+        return _RecordingCursor(self._conn.cursor(*args, **kwargs), self.statements)
+    
+    def commit(self):
+        # Leave the seeded data untouched by update/delete shapes
+        self._conn.rollback()
+    
+    def close(self):
+        self._conn.rollback()
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def _plan_violations(conn, sql, params):
+    """Return a description of every full scan or large sort in a statement's plan"""
+    cursor = conn.cursor()
+    cursor.execute(f"SET random_page_cost = {PLAN_RANDOM_PAGE_COST}")
+    cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    plan = cursor.fetchone()[0][0]["Plan"]
+    conn.rollback()
+    
+    violations = []
+    for node in _plan_nodes(plan):
+        if node["Node Type"] == "Seq Scan":
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)",
+                (f"{node.get('Schema', 'public')}.{node['Relation Name']}",)
+            )
+            table_rows = cursor.fetchone()[0]
+            if table_rows > PLAN_MAX_ROWS:
+                violations.append(f"Seq Scan on {node['Relation Name']} (~{int(table_rows)} rows)")
+        elif node["Node Type"] == "Sort" and node["Plan Rows"] > PLAN_MAX_ROWS:
+            violations.append(f"Sort of ~{node['Plan Rows']} rows by {', '.join(node.get('Sort Key', []))}")
+    return violations
+
+
+@pytest.fixture(scope="module")
+def seeded_database():
+    """Seed the test database to PLAN_TEST_ROWS diagrams and apply the schema objects"""
+    conn = psycopg.connect(TEST_DATABASE_URL)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(T_DIAGRAM_DDL)
+        cursor.execute("SELECT COUNT(*), COALESCE(MAX(diagram_id), 0) FROM public.t_diagram")
+        count, max_id = cursor.fetchone()
+        conn.commit()
+        if count < PLAN_TEST_ROWS:
+            load(conn, DiagramGenerator(PLAN_TEST_ROWS - count, seed=39, start_id=max_id + 1))
+        
+        apply_schema(conn)
+        cursor.execute("ANALYZE public.t_diagram")
+        conn.commit()
+        
+        # Worst-case filter values: the largest package and most common type
+        cursor.execute("""
+        SELECT package_id FROM public.t_diagram
+        GROUP BY package_id ORDER BY COUNT(*) DESC LIMIT 1
+        """)
+        package_id = cursor.fetchone()[0]
+        cursor.execute("SELECT MIN(diagram_id), MAX(modifieddate) FROM public.t_diagram")
+        diagram_id, last_modified = cursor.fetchone()
+        conn.commit()
+    finally:
+        conn.close()
+    
+    return {
+        "diagram_id": diagram_id,
+        "package_id": package_id,
+        "diagram_type": "Logical",
+        "modified_since": last_modified - timedelta(days=30),
+    }
+
+
+def _record(method, *args, **kwargs):
+    """Run a DiagramDBManager method against a recording connection"""
+    conn = _RecordingConnection(psycopg.connect(TEST_DATABASE_URL))
+    db_manager = DiagramDBManager()
+    try:
+        with patch.object(db_manager, '_get_connection', return_value=conn):
+            result = getattr(db_manager, method)(*args, **kwargs)
+            if method.startswith("iter_"):
+                for _ in result:
+                    pass
+        return conn.statements
+    finally:
+        conn._conn.close()
+
+
+def _shape_id(method, flags):
+    return f"{method}[{'/'.join('x' if flag else '-' for flag in flags)}]"
+
+
+FLAGS_3 = list(itertools.product((False, True), repeat=3))
+FLAGS_2 = list(itertools.product((False, True), repeat=2))
+
+SHAPES = (
+    # read_diagrams: every diagram_id / package_id / diagram_type combination
+    [(_shape_id("read_diagrams", flags), "read_diagrams", ("diagram_id", "package_id", "diagram_type"), flags)
+     for flags in FLAGS_3]
+    + [(_shape_id("iter_diagrams", flags), "iter_diagrams", ("package_id", "diagram_type"), flags)
+       for flags in FLAGS_2]
+    + [(_shape_id("iter_diagram_batches", flags), "iter_diagram_batches",
+        ("package_id", "diagram_type", "modified_since"), flags) for flags in FLAGS_3]
+    + [(_shape_id("sync_diagrams", flags), "sync_diagrams",
+        ("modified_since", "package_id", "diagram_type"), flags) for flags in FLAGS_3]
+)
+
+
+class TestQueryPlansIntegration:
+    """Query-plan regression tests against a seeded PostgreSQL database."""
+    
+    @pytest.mark.parametrize("shape,method,params,flags", SHAPES, ids=[shape[0] for shape in SHAPES])
+    def test_filter_combinations_use_indexes(self, seeded_database, shape, method, params, flags):
+        """Test that each filter combination avoids full scans and large sorts."""
+        if shape in ALLOWED_FULL_SCANS:
+            pytest.skip("full-table shape is allowlisted")
+        
+        # Arrange
+        kwargs = {name: seeded_database[name] for name, flag in zip(params, flags) if flag}
+        
+        # Act
+        statements = _record(method, **kwargs)
+        
+        # Assert
+        conn = psycopg.connect(TEST_DATABASE_URL)
+        try:
+            violations = [
+                f"{violation} in: {' '.join(sql.split())[:120]}"
+                for sql, statement_params in statements
+                if sql.lstrip().upper().startswith("SELECT") and UTC_NOW_SQL not in sql
+                for violation in _plan_violations(conn, sql, statement_params)
+            ]
+        finally:
+            conn.close()
+        
+        assert not violations, "\n".join(violations)
+    
+    @pytest.mark.parametrize("method,args", [
+        ("update_diagram", lambda data: (data["diagram_id"], {"name": "Plan test"})),
+        ("delete_diagram", lambda data: (data["diagram_id"],)),
+        ("read_changes", lambda data: (0, 100)),
+        ("read_diagram_stats", lambda data: ()),
+        ("read_diagram_stats", lambda data: ("package_id",)),
+    ], ids=["update_diagram", "delete_diagram", "read_changes", "read_diagram_stats", "read_diagram_stats[dimension]"])
+    def test_point_operations_use_indexes(self, seeded_database, method, args):
+        """Test that point reads and writes avoid full scans and large sorts."""
+        # Act
+        statements = _record(method, *args(seeded_database))
+        
+        # Assert
+        conn = psycopg.connect(TEST_DATABASE_URL)
+        try:
+            violations = [
+                f"{violation} in: {' '.join(sql.split())[:120]}"
+                for sql, statement_params in statements
+                if sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE"))
+                for violation in _plan_violations(conn, sql, statement_params)
+            ]
+        finally:
+            conn.close()
+        
+        assert not violations, "\n".join(violations)
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Async load generator for the diagram CRUD functions.
+
+Drives a weighted mix of create/read/list/update/delete calls against a
+running function host (normally `func start` backed by a local PostgreSQL
+seeded with synthetic data), either at a fixed request rate (--rps) or
+with a fixed number of concurrent clients (--concurrency), and reports
+p50/p95/p99 latency, throughput and error rate per route.
+
+Examples:
+    python tests/load/load_generator.py --rps 200 --duration 60
+    python tests/load/load_generator.py --concurrency 32 --mix read=80,update=20
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+DEFAULT_MIX = "read=60,list=15,create=10,update=10,delete=5"
+
+DIAGRAM_TYPES = ("Logical", "Sequence", "Activity", "Component", "Class", "Deployment")
+
+
+class RouteStats:
+    """Latencies and outcomes recorded for one route"""
+    
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+    
+    def record(self, latency, status):
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == "exception" or status >= 400:
+            self.errors += 1
+    
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        
+        def percentile(p):
+            if not latencies:
+                return None
+            index = min(count - 1, max(0, int(round(p / 100 * count + 0.5)) - 1))
+            return round(latencies[index] * 1000, 2)
+        
+        return {
+            "requests": count,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "p50_ms": percentile(50),
+            "p95_ms": percentile(95),
+            "p99_ms": percentile(99),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+            "statuses": {str(status): total for status, total in sorted(self.statuses.items(), key=str)},
+        }
+
+
+def parse_mix(value):
+    """Parse "route=weight,..." into (routes, weights)"""
+    routes = []
+    weights = []
+    for item in value.split(","):
+        route, _, weight = item.partition("=")
+        route = route.strip()
+        if route not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown route '{route}', expected one of: {', '.join(OPERATIONS)}")
+        routes.append(route)
+        weights.append(float(weight or 1))
+    return routes, weights
+
+
+def parse_id_range(value):
+    start, _, end = value.partition(":")
+    return int(start), int(end)
+
+
+def synthetic_diagram(rng):
+    """A create/update body shaped like the test-diagram-crud.ps1 payload"""
+    return {
+        "package_id": rng.randint(1, 500),
+        "parentid": 0,
+        "diagram_type": rng.choice(DIAGRAM_TYPES),
+        "name": f"Load Test Diagram {uuid.uuid4().hex[:8]}",
+        "version": "1.0",
+        "author": f"loadgen{rng.randint(1, 50)}",
+        "notes": "Created by the load generator",
+        "orientation": "P",
+        "cx": rng.randint(400, 2000),
+        "cy": rng.randint(300, 1500),
+        "scale": 100,
+        "ea_guid": "{" + str(uuid.uuid4()).upper() + "}",
+    }
+
+
+class LoadRun:
+    """Shared state for one load run"""
+    
+    def __init__(self, client, args):
+        self.client = client
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.routes, self.weights = args.mix
+        self.seed_ids = args.id_range
+        # Only diagrams created by this run are deleted, so repeated runs do
+        # not erode the seeded dataset
+        self.created_ids = []
+        self.stats = {route: RouteStats() for route in self.routes}
+        self.measuring = False
+    
+    def pick_id(self):
+        if self.created_ids and self.rng.random() < 0.5:
+            return self.rng.choice(self.created_ids)
+        return self.rng.randint(*self.seed_ids)
+    
+    async def call(self, route, scheduled=None):
+        """Issue one request; latency counts from the scheduled start when given"""
+        operation = OPERATIONS[route]
+        start = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            status = await operation(self)
+        except httpx.HTTPError:
+            status = "exception"
+        if self.measuring:
+            self.stats[route].record(time.perf_counter() - start, status)
+    
+    def next_route(self):
+        return self.rng.choices(self.routes, self.weights)[0]
+
+
+async def op_create(run):
+    response = await run.client.post("/api/diagram/create", json=synthetic_diagram(run.rng))
+    if response.status_code == 201:
+        run.created_ids.append(response.json()["diagram"]["diagram_id"])
+    return response.status_code
+
+
+async def op_read(run):
+    response = await run.client.get("/api/diagram/read", params={"diagram_id": run.pick_id()})
+    return response.status_code
+
+
+async def op_list(run):
+    params = {"package_id": run.rng.randint(1, 500)}
+    if run.rng.random() < 0.5:
+        params["diagram_type"] = run.rng.choice(DIAGRAM_TYPES)
+    response = await run.client.get("/api/diagram/read", params=params)
+    return response.status_code
+
+
+async def op_update(run):
+    body = {"name": f"Updated {uuid.uuid4().hex[:8]}", "cx": run.rng.randint(400, 2000)}
+    response = await run.client.put("/api/diagram/update", params={"diagram_id": run.pick_id()}, json=body)
+    return response.status_code
+
+
+async def op_delete(run):
+    if not run.created_ids:
+        # Nothing of ours to delete yet; create something instead
+        return await op_create(run)
+    diagram_id = run.created_ids.pop(run.rng.randrange(len(run.created_ids)))
+    response = await run.client.delete("/api/diagram/delete", params={"diagram_id": diagram_id})
+    return response.status_code
+
+
+OPERATIONS = {
+    "create": op_create,
+    "read": op_read,
+    "list": op_list,
+    "update": op_update,
+    "delete": op_delete,
+}
+
+
+async def run_closed_loop(run, deadline):
+    """Fixed concurrency: each worker issues its next request as soon as the last completes"""
+    async def worker():
+        while time.perf_counter() < deadline:
+            await run.call(run.next_route())
+    
+    await asyncio.gather(*(worker() for _ in range(run.args.concurrency)))
+
+
+async def run_open_loop(run, deadline):
+    """Fixed arrival rate, independent of response times.
+    
+    Latency is measured from each request's scheduled start, so a slow
+    server is charged for the queueing it causes (no coordinated omission).
+    """
+    interval = 1.0 / run.args.rps
+    in_flight = asyncio.Semaphore(run.args.max_in_flight)
+    tasks = set()
+    
+    async def fire(route, scheduled):
+        async with in_flight:
+            await run.call(route, scheduled)
+    
+    next_start = time.perf_counter()
+    while next_start < deadline:
+        delay = next_start - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(fire(run.next_route(), next_start))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        next_start += interval
+    
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+async def run_load(args):
+    limits = httpx.Limits(max_connections=args.max_in_flight if args.rps else args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        run = LoadRun(client, args)
+        driver = run_open_loop if args.rps else run_closed_loop
+        
+        if args.warmup > 0:
+            print(f"Warming up for {args.warmup}s...", file=sys.stderr)
+            await driver(run, time.perf_counter() + args.warmup)
+        
+        mode = f"{args.rps} rps" if args.rps else f"{args.concurrency} clients"
+        print(f"Running {mode} for {args.duration}s against {args.base_url}...", file=sys.stderr)
+        run.measuring = True
+        started = time.perf_counter()
+        await driver(run, started + args.duration)
+        elapsed = time.perf_counter() - started
+    
+    routes = {route: stats.summary(elapsed) for route, stats in run.stats.items()}
+    total = RouteStats()
+    for stats in run.stats.values():
+        total.latencies.extend(stats.latencies)
+        for status, count in stats.statuses.items():
+            total.statuses[status] = total.statuses.get(status, 0) + count
+        total.errors += stats.errors
+    
+    return {
+        "config": {
+            "base_url": args.base_url,
+            "mode": "open" if args.rps else "closed",
+            "rps": args.rps,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "mix": dict(zip(*args.mix)),
+        },
+        "elapsed_s": round(elapsed, 3),
+        "routes": routes,
+        "total": total.summary(elapsed),
+    }
+
+
+def print_report(report):
+    print(f"\n{'route':8} {'reqs':>8} {'rps':>9} {'err%':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = list(report["routes"].items()) + [("total", report["total"])]
+    for route, summary in rows:
+        def fmt(value):
+            return f"{value:9.2f}" if value is not None else f"{'-':>9}"
+        print(
+            f"{route:8} {summary['requests']:8d} {summary['throughput_rps']:9.2f} "
+            f"{summary['error_rate'] * 100:6.2f}% {fmt(summary['p50_ms'])} {fmt(summary['p95_ms'])} {fmt(summary['p99_ms'])}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async load generator for the diagram functions")
+    parser.add_argument("--base-url", default="http://localhost:7071", help="Function host URL (default: func start)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--rps", type=float, help="Target request rate (open loop)")
+    mode.add_argument("--concurrency", type=int, default=16, help="Concurrent clients (closed loop, default 16)")
+    parser.add_argument("--duration", type=float, default=30, help="Measured run length in seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured warm-up in seconds")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Weighted route mix (default {DEFAULT_MIX})")
+    parser.add_argument("--id-range", type=parse_id_range, default=(1, 10_000),
+                        help="Seeded diagram_id range to read and update, e.g. 1:100000")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Cap on outstanding requests in --rps mode")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, help="Random seed for a reproducible request sequence")
+    parser.add_argument("--output", help="Also write the report as JSON to this file")
+    
+    args = parser.parse_args()
+    
+    if httpx is None:
+        parser.error("httpx is required: pip install httpx")
+    
+    report = asyncio.run(run_load(args))
+    print_report(report)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
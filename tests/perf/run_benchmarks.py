@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the diagram and file-manager hot paths.
+
+Each benchmark is timed over several rounds and its fastest round is
+compared against tests/perf/baseline.json; a benchmark regresses when it
+exceeds the baseline by more than the threshold. The fastest round is
+the least affected by scheduler and cache noise. Results are written as
+JSON so runs can be diffed or promoted to a new baseline.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+
+from db_utils import DiagramDBManager
+import file_utils
+from file_utils import APPLICATION_HEADERS, ApplicationFileManager
+from http_utils import compress_body
+from json_utils import dumps
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+DIAGRAM_ROW_COUNTS = (10_000, 100_000)
+APPLICATION_COUNTS = (1_000, 100_000, 1_000_000)
+QUICK_DIAGRAM_ROW_COUNTS = (10_000,)
+QUICK_APPLICATION_COUNTS = (1_000, 100_000)
+
+# Fast benchmarks are repeated within a round until the timed calls add up
+# to at least this long, so timer resolution and scheduler jitter stay small
+# by comparison
+MIN_ROUND_SECONDS = 0.2
+
+# ...unless their untimed setup makes a round take longer than this
+MAX_SETUP_ROUND_SECONDS = 2.0
+
+# Benchmarks whose fastest round timed less than this in total (sub-ms calls
+# behind a slow setup) are reported but left out of the regression gate
+GATE_MIN_ROUND_SECONDS = 0.01
+
+
+def _run_round(fn, number, setup):
+    """Time number calls of fn, each after its own untimed setup; returns (timed, wall) seconds"""
+    # Like timeit, keep collector pauses out of the measurement
+    gc.collect()
+    gc.disable()
+    try:
+        wall_start = time.perf_counter()
+        if setup is None:
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            timed = time.perf_counter() - start
+        else:
+            timed = 0.0
+            for _ in range(number):
+                setup()
+                start = time.perf_counter()
+                fn()
+                timed += time.perf_counter() - start
+        return timed, time.perf_counter() - wall_start
+    finally:
+        gc.enable()
+
+
+def time_rounds(fn, rounds, setup=None):
+    """Run fn over several rounds; returns (per-call wall times in seconds, calls per round).
+    
+    fn is called enough times per round for the timed calls to fill
+    MIN_ROUND_SECONDS. With a setup step, every call gets a fresh setup
+    that is left out of the timing, and slow setups cap the calls per round
+    at about MAX_SETUP_ROUND_SECONDS of wall time. The last calibration
+    round already ran at the final count, so it is kept as the first round.
+    """
+    number = 1
+    while True:
+        timed, wall = _run_round(fn, number, setup)
+        if timed >= MIN_ROUND_SECONDS or (setup is not None and wall * 2 > MAX_SETUP_ROUND_SECONDS):
+            break
+        number *= 2
+    
+    timings = [timed / number]
+    for _ in range(rounds - 1):
+        timed, _ = _run_round(fn, number, setup)
+        timings.append(timed / number)
+    return timings, number
+
+
+def summarise(measured, **extra):
+    timings, number = measured
+    result = {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "rounds": len(timings),
+        "calls_per_round": number,
+    }
+    result.update(extra)
+    return result
+
+
+def synthetic_diagram_rows(count):
+    """Rows shaped like the t_diagram SELECT used by DiagramDBManager"""
+    created = datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        rows.append((
+            i + 1, i % 500 + 1, 0, ("Logical", "Sequence", "Activity", "Component")[i % 4],
+            f"Diagram {i}", "1.0", f"author{i % 50}", 0, "Notes " * 10, None,
+            1, 0, 0, "P", 1200, 800, 100, created, created + timedelta(minutes=i),
+            None, 1, 1, 1, None, 0, f"{{{i:08X}-0000-0000-0000-000000000000}}",
+            0, "locked=false;", "ExcludeRTF=0;DocAll=0;"
+        ))
+    return rows
+
+
+def bench_build_diagram_dict(results, counts, rounds):
+    manager = DiagramDBManager()
+    for count in counts:
+        rows = synthetic_diagram_rows(count)
+        timings = time_rounds(lambda: [manager._build_diagram_dict(row) for row in rows], rounds)
+        results[f"build_diagram_dict[{count}]"] = summarise(timings, rows=count)
+
+
+def bench_serialisation(results, counts, rounds):
+    manager = DiagramDBManager()
+    for count in counts:
+        diagrams = [manager._build_diagram_dict(row) for row in synthetic_diagram_rows(count)]
+        payload = {"count": len(diagrams), "diagrams": diagrams}
+        
+        timings = time_rounds(lambda: dumps(payload), rounds)
+        results[f"serialise_json[{count}]"] = summarise(timings, rows=count)
+        
+        timings = time_rounds(lambda: b"".join(dumps(diagram) + b"\n" for diagram in diagrams), rounds)
+        results[f"serialise_ndjson[{count}]"] = summarise(timings, rows=count)
+        
+        if msgpack is not None:
+            timings = time_rounds(lambda: msgpack.packb(payload, use_bin_type=True), rounds)
+            results[f"serialise_msgpack[{count}]"] = summarise(timings, rows=count)
+        
+        body = dumps(payload)
+        timings = time_rounds(lambda: compress_body(body, "gzip"), rounds)
+        results[f"compress_gzip[{count}]"] = summarise(timings, rows=count, bytes=len(body))
+
+
+def bench_query_building(results, rounds, iterations=10_000):
+    manager = DiagramDBManager()
+    update_data = {"name": "Renamed", "notes": "Updated notes", "cx": 1024, "cy": 768, "author": None}
+    
+    def build_updates():
+        for i in range(iterations):
+            manager._build_update_query(i, update_data)
+    
+    def build_listings():
+        for i in range(iterations):
+            manager._build_list_query(i % 500, "Logical" if i % 2 else None)
+    
+    results[f"build_update_query[x{iterations}]"] = summarise(time_rounds(build_updates, rounds), calls=iterations)
+    results[f"build_list_query[x{iterations}]"] = summarise(time_rounds(build_listings, rounds), calls=iterations)
+
+
+def write_applications(path, count):
+    """Seed an applications.txt with count records"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\t'.join(APPLICATION_HEADERS) + '\n')
+        for i in range(count):
+            f.write('\t'.join((
+                f"app_{i:08d}", f"Application {i}", "Synthetic benchmark record", "1.0.0",
+                ("active", "inactive", "deprecated")[i % 3], "2024-01-01T00:00:00Z",
+                "2024-01-01T00:00:00Z", f"owner{i % 100}", f"category{i % 20}"
+            )) + '\n')
+
+
+def bench_file_manager(results, counts, rounds):
+    work_dir = tempfile.mkdtemp(prefix="friday_apic_bench_")
+    try:
+        for count in counts:
+            manager = ApplicationFileManager(mount_path=work_dir)
+            seed_path = os.path.join(work_dir, "seed.txt")
+            write_applications(seed_path, count)
+            
+            def reset():
+                # Back to the seeded snapshot with an empty journal and a
+                # cold per-process cache
+                shutil.copyfile(seed_path, manager.applications_file)
+                if os.path.exists(manager.journal_file):
+                    os.remove(manager.journal_file)
+                file_utils._views.clear()
+            
+            # Cold reads parse the whole file and are slow at 1M records; fewer
+            # rounds keep the suite practical without changing what is measured
+            size_rounds = max(1, rounds // 3) if count >= 1_000_000 else rounds
+            target_id = f"app_{count // 2:08d}"
+            last_id = f"app_{count - 1:08d}"
+            
+            results[f"file_read_all[{count}]"] = summarise(
+                time_rounds(manager.read_all_applications, size_rounds, setup=reset), records=count)
+            results[f"file_find_by_id[{count}]"] = summarise(
+                time_rounds(lambda: manager.find_application_by_id(last_id), size_rounds, setup=reset), records=count)
+            
+            # One filtered page streamed from a cold worker: reading stops
+            # once the page is full
+            page_filter = {"status": "inactive", "owner": "owner1"}
+            results[f"file_iter_page[{count}]"] = summarise(
+                time_rounds(lambda: list(manager.iter_applications(page_filter, 0, 50)), size_rounds, setup=reset),
+                records=count)
+            
+            # Cold reads that also replay a journal one entry short of
+            # compaction: the most replay a reader can ever pay for
+            reset()
+            manager.read_all_applications()
+            for i in range(file_utils.APPLICATION_JOURNAL_MAX_ENTRIES - 1):
+                manager.update_application(f"app_{i * count // file_utils.APPLICATION_JOURNAL_MAX_ENTRIES:08d}",
+                                           {"status": "inactive"})
+            seed_journal_path = os.path.join(work_dir, "seed.log")
+            shutil.copyfile(manager.journal_file, seed_journal_path)
+            
+            def reset_journal():
+                reset()
+                shutil.copyfile(seed_journal_path, manager.journal_file)
+            
+            results[f"file_read_all_journal[{count}]"] = summarise(
+                time_rounds(manager.read_all_applications, size_rounds, setup=reset_journal),
+                records=count, journal_entries=file_utils.APPLICATION_JOURNAL_MAX_ENTRIES - 1)
+            
+            # Unchanged file: served from the per-process snapshot
+            reset()
+            manager.read_all_applications()
+            results[f"file_read_all_cached[{count}]"] = summarise(
+                time_rounds(manager.read_all_applications, size_rounds), records=count)
+            results[f"file_find_by_id_cached[{count}]"] = summarise(
+                time_rounds(lambda: manager.find_application_by_id(last_id), size_rounds), records=count)
+            results[f"file_iter_page_cached[{count}]"] = summarise(
+                time_rounds(lambda: list(manager.iter_applications(page_filter, 0, 50)), size_rounds), records=count)
+            results[f"file_update[{count}]"] = summarise(
+                time_rounds(lambda: manager.update_application(target_id, {"status": "inactive"}), size_rounds, setup=reset),
+                records=count)
+            results[f"file_delete[{count}]"] = summarise(
+                time_rounds(lambda: manager.delete_application(target_id), size_rounds, setup=reset), records=count)
+            
+            # Writes by a worker whose cache is already warm: one journal append
+            def reset_warm():
+                reset()
+                manager.read_all_applications()
+            
+            results[f"file_update_cached[{count}]"] = summarise(
+                time_rounds(lambda: manager.update_application(target_id, {"status": "inactive"}), size_rounds,
+                            setup=reset_warm), records=count)
+            results[f"file_delete_cached[{count}]"] = summarise(
+                time_rounds(lambda: manager.delete_application(target_id), size_rounds, setup=reset_warm),
+                records=count)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_benchmarks(quick=False, rounds=5, only=None):
+    diagram_counts = QUICK_DIAGRAM_ROW_COUNTS if quick else DIAGRAM_ROW_COUNTS
+    application_counts = QUICK_APPLICATION_COUNTS if quick else APPLICATION_COUNTS
+    
+    suites = {
+        "diagram": lambda results: bench_build_diagram_dict(results, diagram_counts, rounds),
+        "serialise": lambda results: bench_serialisation(results, diagram_counts, rounds),
+        "query": lambda results: bench_query_building(results, rounds),
+        "file": lambda results: bench_file_manager(results, application_counts, rounds),
+    }
+    
+    results = {}
+    for name, suite in suites.items():
+        if only and name not in only:
+            continue
+        print(f"Running {name} benchmarks...", file=sys.stderr)
+        suite(results)
+    
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+            "rounds": rounds,
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Return (name, baseline_s, current_s, ratio) for every regressed benchmark"""
+    regressions = []
+    for name, current in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        ratio = current["min_s"] / previous["min_s"] if previous["min_s"] else 0.0
+        current["baseline_min_s"] = previous["min_s"]
+        current["ratio"] = ratio
+        current["gated"] = current["min_s"] * current["calls_per_round"] >= GATE_MIN_ROUND_SECONDS
+        if current["gated"] and ratio > 1.0 + threshold:
+            regressions.append((name, previous["min_s"], current["min_s"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for Friday-APIC hot paths")
+    parser.add_argument("--output", default="bench_output.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=float(os.environ.get("PERF_REGRESSION_THRESHOLD", "0.5")),
+        help="Allowed slowdown over the baseline, as a fraction (default 0.5)"
+    )
+    parser.add_argument("--rounds", type=int, default=5, help="Timed rounds per benchmark")
+    parser.add_argument("--quick", action="store_true", help="Skip the largest input sizes")
+    parser.add_argument("--only", nargs="+", choices=["diagram", "serialise", "query", "file"],
+                        help="Run only these benchmark groups")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    
+    args = parser.parse_args()
+    
+    report = run_benchmarks(quick=args.quick, rounds=args.rounds, only=args.only)
+    
+    regressions = []
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+    report["meta"]["threshold"] = args.threshold
+    report["regressions"] = [name for name, *_ in regressions]
+    
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    
+    for name, result in report["results"].items():
+        line = f"{name:40} {result['min_s'] * 1000:10.2f} ms"
+        if "ratio" in result:
+            line += f"  ({result['ratio']:.2f}x baseline{'' if result['gated'] else ', not gated'})"
+        print(line)
+    
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline updated: {args.baseline}")
+    
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}:")
+        for name, previous, current, ratio in regressions:
+            print(f"  {name}: {previous * 1000:.2f} ms -> {current * 1000:.2f} ms ({ratio:.2f}x)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Synthetic Enterprise Architect t_diagram data for scale testing.
+
+Generates any number of diagrams (1k to 10M+) with realistic shapes:
+package sizes follow a long-tailed (Zipf-like) distribution, diagram
+types are weighted the way EA models usually are, notes/pdata/styleex
+lengths are log-normal with a share of empty values, and a fraction of
+diagrams hang off an earlier diagram through parentid. Rows stream
+straight into PostgreSQL with COPY, so memory stays flat at any volume.
+
+The target database is always explicit: --dsn or TEST_DATABASE_URL (a
+libpq connection string or URI), never the function app's POSTGRES_*
+defaults. --truncate refuses a non-local host unless
+--allow-remote-truncate is also given.
+
+Examples:
+    python tests/synthetic/generate_diagrams.py --dsn "host=localhost dbname=architecture user=postgres" \
+        --rows 100000 --create-table --truncate
+    python tests/synthetic/generate_diagrams.py --rows 10000000 --seed 7 --output diagrams.tsv
+"""
+
+import argparse
+import itertools
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'migrations'))
+
+import psycopg
+from psycopg.conninfo import conninfo_to_dict
+
+from db_utils import DIAGRAM_COLUMNS
+from apply_schema import apply_schema
+
+# Hosts --truncate may empty without --allow-remote-truncate; an empty host
+# or a socket directory means a Unix-domain socket on this machine
+LOCAL_HOSTS = ("", "localhost", "127.0.0.1", "::1")
+
+# EA's t_diagram, for creating the table in an empty local database
+T_DIAGRAM_DDL = """
+CREATE TABLE IF NOT EXISTS public.t_diagram (
+    diagram_id serial PRIMARY KEY,
+    package_id integer DEFAULT 0,
+    parentid integer DEFAULT 0,
+    diagram_type varchar(50),
+    name varchar(255),
+    version varchar(50) DEFAULT '1.0',
+    author varchar(255),
+    showdetails integer DEFAULT 0,
+    notes text,
+    stereotype varchar(255),
+    attpub integer DEFAULT 1,
+    attpri integer DEFAULT 1,
+    attpro integer DEFAULT 1,
+    orientation varchar(1) DEFAULT 'P',
+    cx integer DEFAULT 0,
+    cy integer DEFAULT 0,
+    scale integer DEFAULT 100,
+    createddate timestamp DEFAULT CURRENT_TIMESTAMP,
+    modifieddate timestamp DEFAULT CURRENT_TIMESTAMP,
+    htmlpath varchar(255),
+    showforeign integer DEFAULT 1,
+    showborder integer DEFAULT 1,
+    showpackagecontents integer DEFAULT 1,
+    pdata text,
+    locked integer DEFAULT 0,
+    ea_guid varchar(40) UNIQUE,
+    tpos integer,
+    swimlanes text,
+    styleex text
+)
+"""
+
+# Relative frequency of diagram types in typical EA repositories
+DIAGRAM_TYPE_WEIGHTS = {
+    "Logical": 30,
+    "Component": 12,
+    "Activity": 12,
+    "Sequence": 10,
+    "Use Case": 9,
+    "Analysis": 7,
+    "Package": 6,
+    "Statechart": 5,
+    "Deployment": 4,
+    "Custom": 3,
+    "Collaboration": 2,
+}
+
+STEREOTYPES = (None, None, None, None, "ArchiMate_Application", "BPMN", "SysML", "C4_Container")
+
+NOTE_WORDS = (
+    "the", "service", "component", "interface", "depends", "on", "data", "flow", "between",
+    "application", "layer", "business", "process", "shows", "capability", "owned", "by",
+    "integration", "platform", "event", "message", "queue", "customer", "order", "api",
+)
+
+PDATA_TOKENS = (
+    "HideRel=0", "ShowTags=0", "ShowReqs=0", "ShowCons=0", "OpParams=1", "ShowSN=0",
+    "ScalePI=0", "PPgs.cx=1", "PPgs.cy=1", "PSize=9", "ShowIcons=1", "SuppCN=0",
+    "HideProps=0", "HideParents=0", "UseAlias=0", "HideAtts=0", "HideOps=0",
+    "HideStereo=0", "HideEStereo=0", "ShowRec=1", "ShowRes=0", "ShowShape=1",
+    "FormName=", "ExcludeRTF=0", "DocAll=0", "HideQuals=0", "AttPkg=1", "ShowTests=0",
+)
+
+STYLEEX_TOKENS = (
+    "MDGDgm=", "STBLDgm=", "ShowNotes=0", "VisibleAttributeDetail=0", "ShowOpRetType=1",
+    "SuppressBrackets=0", "SuppConnectorLabels=0", "PrintPageHeadFoot=0", "ShowAsList=0",
+    "SuppressedCompartments=", "Theme=:119", "SaveTag=A1B2C3D4", "TConnectorNotation=UML 2.1",
+    "TExplicitNavigability=0", "AdvancedElementProps=1", "AdvancedFeatureProps=1",
+    "AdvancedConnectorProps=1", "m_bElementClassifier=1", "SPT=1", "MatrixActive=0",
+    "SwimlanesActive=1", "KanbanActive=0", "MatrixLineWidth=1", "MatrixLocked=0",
+    "ProfileData=", "MatrixProfile=", "ShowTitle=0", "DefaultLang=Java",
+)
+
+
+class DiagramGenerator:
+    """Deterministic stream of t_diagram rows for a given seed"""
+
+    def __init__(self, rows, seed=0, start_id=1, packages=None, years=8, parent_ratio=0.15):
+        self.rows = rows
+        self.rng = random.Random(seed)
+        self.start_id = start_id
+        # Roughly one package per 40 diagrams, with a long tail of tiny packages
+        self.packages = packages or max(10, rows // 40)
+        self.parent_ratio = parent_ratio
+        self.end_date = datetime(2025, 1, 1)
+        self.span_seconds = int(timedelta(days=365 * years).total_seconds())
+        self.authors = [f"{first}.{last}" for first, last in itertools.product(
+            ("alex", "sam", "jordan", "taylor", "morgan", "casey", "riley", "jamie"),
+            ("martin", "roy", "tremblay", "gagnon", "cote", "bouchard", "lee", "singh"),
+        )]
+        
+        # Zipf-like package sizes; cumulative weights make each draw O(log n)
+        self.package_cum_weights = list(itertools.accumulate(
+            1.0 / (rank ** 1.07) for rank in range(1, self.packages + 1)
+        ))
+        self.package_ids = list(range(1, self.packages + 1))
+        self.rng.shuffle(self.package_ids)
+        self.diagram_types = list(DIAGRAM_TYPE_WEIGHTS)
+        self.type_cum_weights = list(itertools.accumulate(DIAGRAM_TYPE_WEIGHTS.values()))
+    
+    def _lognormal_length(self, median, sigma, cap):
+        return min(cap, int(self.rng.lognormvariate(math.log(median), sigma)))
+    
+    def _notes(self):
+        if self.rng.random() < 0.45:
+            return None
+        length = self._lognormal_length(20, 1.0, 2000)
+        return " ".join(self.rng.choice(NOTE_WORDS) for _ in range(max(1, length))).capitalize() + "."
+    
+    def _token_string(self, tokens, median, sigma, cap):
+        count = max(1, self._lognormal_length(median, sigma, cap))
+        return ";".join(self.rng.choice(tokens) for _ in range(count)) + ";"
+    
+    def _timestamps(self):
+        created = self.end_date - timedelta(seconds=self.rng.randrange(self.span_seconds))
+        # Most diagrams are touched again soon after creation; some never are
+        if self.rng.random() < 0.3:
+            modified = created
+        else:
+            remaining = int((self.end_date - created).total_seconds())
+            modified = created + timedelta(seconds=int(remaining * self.rng.random() ** 3))
+        return created, modified
+    
+    def __iter__(self):
+        rng = self.rng
+        for offset in range(self.rows):
+            diagram_id = self.start_id + offset
+            package_id = rng.choices(self.package_ids, cum_weights=self.package_cum_weights)[0]
+            diagram_type = rng.choices(self.diagram_types, cum_weights=self.type_cum_weights)[0]
+            parentid = 0
+            if offset and rng.random() < self.parent_ratio:
+                # Child diagrams cluster near their parent in creation order
+                parentid = diagram_id - 1 - min(offset - 1, int(rng.expovariate(1 / 50)))
+            created, modified = self._timestamps()
+            
+            yield (
+                diagram_id, package_id, parentid, diagram_type,
+                f"{diagram_type} Diagram {diagram_id}", rng.choice(("1.0", "1.0", "1.1", "2.0")),
+                rng.choice(self.authors), rng.choice((0, 0, 1)), self._notes(),
+                rng.choice(STEREOTYPES), 1, rng.choice((0, 1)), rng.choice((0, 1)),
+                rng.choice(("P", "P", "P", "L")), rng.randint(600, 2400), rng.randint(400, 1800),
+                rng.choice((100, 100, 100, 75, 125)), created, modified, None,
+                1, 1, rng.choice((0, 1)),
+                self._token_string(PDATA_TOKENS, 12, 0.5, 60), rng.choice((0, 0, 0, 0, 1)),
+                "{" + str(uuid.UUID(int=rng.getrandbits(128), version=4)).upper() + "}",
+                rng.choice((0, 0, 0, 1)),
+                "locked=false;orientation=0;width=0;inbar=false;names=false;color=-1;bold=false;fcol=0;tcol=-1;ofCol=-1;ufCol=-1;hl=1;ufh=0;hh=0;cls=0;bw=0;hli=0;bro=0;",
+                self._token_string(STYLEEX_TOKENS, 20, 0.4, 80),
+            )
+
+
+def _copy_value(value):
+    """Render one value in COPY text format"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def write_copy_file(generator, path, progress_every=100_000):
+    """Write rows as a COPY text file for loading with psql \\copy or COPY FROM"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for count, row in enumerate(generator, 1):
+            f.write("\t".join(_copy_value(value) for value in row) + "\n")
+            if count % progress_every == 0:
+                print(f"  {count} rows written", file=sys.stderr)
+
+
+def load(conn, generator, progress_every=100_000):
+    """COPY generated rows into t_diagram and bring the statistics up to date"""
+    cursor = conn.cursor()
+    copy_sql = f"COPY public.t_diagram ({', '.join(DIAGRAM_COLUMNS)}) FROM STDIN"
+    count = 0
+    with cursor.copy(copy_sql) as copy:
+        for row in generator:
+            copy.write_row(row)
+            count += 1
+            if count % progress_every == 0:
+                print(f"  {count} rows copied", file=sys.stderr)
+    
+    # Keep the serial ahead of the explicit IDs so create_diagram keeps working
+    cursor.execute("""
+    SELECT setval(pg_get_serial_sequence('public.t_diagram', 'diagram_id'),
+        (SELECT COALESCE(MAX(diagram_id), 1) FROM public.t_diagram))
+    """)
+    conn.commit()
+    return count
+
+
+def is_local_dsn(dsn):
+    """Whether every host the connection string can reach is on this machine"""
+    params = conninfo_to_dict(dsn)
+    hosts = params.get("host") or params.get("hostaddr") or os.environ.get("PGHOST", "")
+    return all(host in LOCAL_HOSTS or host.startswith("/") for host in hosts.split(","))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic t_diagram data")
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of diagrams to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed yields the same data")
+    parser.add_argument("--packages", type=int, help="Number of packages (default: rows / 40)")
+    parser.add_argument("--parent-ratio", type=float, default=0.15, help="Fraction of diagrams with a parent diagram")
+    parser.add_argument("--start-id", type=int, help="First diagram_id (default: after the current maximum)")
+    parser.add_argument("--create-table", action="store_true", help="Create t_diagram if it does not exist")
+    parser.add_argument("--truncate", action="store_true", help="Empty t_diagram before loading")
+    parser.add_argument("--output", help="Write a COPY text file instead of loading the database")
+    parser.add_argument("--dsn", default=os.environ.get("TEST_DATABASE_URL"),
+                        help="libpq connection string or URI of the target database (default: TEST_DATABASE_URL)")
+    parser.add_argument("--allow-remote-truncate", action="store_true",
+                        help="Let --truncate empty t_diagram on a host other than this machine")
+    
+    args = parser.parse_args()
+    
+    started = time.perf_counter()
+    if args.output:
+        generator = DiagramGenerator(args.rows, args.seed, args.start_id or 1, args.packages,
+                                     parent_ratio=args.parent_ratio)
+        write_copy_file(generator, args.output)
+        print(f"Wrote {args.rows} diagrams to {args.output} in {time.perf_counter() - started:.1f}s")
+        return
+    
+    if not args.dsn:
+        parser.error("a target database is required: pass --dsn or set TEST_DATABASE_URL")
+    if args.truncate and not args.allow_remote_truncate and not is_local_dsn(args.dsn):
+        parser.error("refusing to truncate t_diagram on a remote host; pass --allow-remote-truncate to do so")
+    
+    conn = psycopg.connect(args.dsn)
+    try:
+        cursor = conn.cursor()
+        if args.create_table:
+            cursor.execute(T_DIAGRAM_DDL)
+        if args.truncate:
+            cursor.execute("TRUNCATE public.t_diagram RESTART IDENTITY")
+        cursor.execute("SELECT COALESCE(MAX(diagram_id), 0) FROM public.t_diagram")
+        start_id = args.start_id or cursor.fetchone()[0] + 1
+        conn.commit()
+        
+        generator = DiagramGenerator(args.rows, args.seed, start_id, args.packages,
+                                     parent_ratio=args.parent_ratio)
+        count = load(conn, generator)
+        
+        # Fresh statistics so query plans reflect the new volume
+        cursor.execute("ANALYZE public.t_diagram")
+        conn.commit()
+        apply_schema(conn)
+        # REFRESH ... CONCURRENTLY cannot run inside a transaction block
+        conn.autocommit = True
+        cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY public.mv_diagram_stats")
+        print(f"Loaded {count} diagrams (IDs {start_id}-{start_id + count - 1}) "
+              f"in {time.perf_counter() - started:.1f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import pytest
+import sys
+import os
+from datetime import datetime
+
+# Import the shared Arrow utilities
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+pa = pytest.importorskip("pyarrow")
+from arrow_utils import encode_record_batches
+
+
+class TestArrowUtilsUnit:
+    """Unit tests for the Arrow IPC encoder."""
+    
+    COLUMNS = ('diagram_id', 'name', 'modifieddate')
+    BATCHES = [
+        [(1, 'Logical View', datetime(2024, 1, 1, 12, 0, 0)), (2, None, None)],
+        [(3, 'Deployment', datetime(2024, 1, 2, 8, 30, 0))],
+    ]
+    
+    @pytest.mark.unit
+    def test_encode_stream_round_trip(self):
+        """Test that cursor batches become typed record batches in a stream."""
+        # Act
+        body = encode_record_batches(iter(self.BATCHES), self.COLUMNS)
+        
+        # Assert
+        reader = pa.ipc.open_stream(body)
+        assert reader.schema.names == list(self.COLUMNS)
+        assert reader.schema.field('modifieddate').type == pa.timestamp('us')
+        table = reader.read_all()
+        assert table.num_rows == 3
+        assert table.column('diagram_id').to_pylist() == [1, 2, 3]
+        assert table.column('name').to_pylist() == ['Logical View', None, 'Deployment']
+    
+    @pytest.mark.unit
+    def test_encode_file_format_supports_random_access(self):
+        """Test that the file format keeps one record batch per cursor batch."""
+        # Act
+        body = encode_record_batches(iter(self.BATCHES), self.COLUMNS, file_format=True)
+        
+        # Assert
+        reader = pa.ipc.open_file(body)
+        assert reader.num_record_batches == 2
+        assert reader.get_batch(1).column(0).to_pylist() == [3]
+    
+    @pytest.mark.unit
+    def test_encode_empty_export_keeps_schema(self):
+        """Test that an export with no rows still carries the schema."""
+        # Act
+        body = encode_record_batches(iter([]), self.COLUMNS)
+        
+        # Assert
+        table = pa.ipc.open_stream(body).read_all()
+        assert table.num_rows == 0
+        assert table.schema.names == list(self.COLUMNS)
@@ -0,0 +1,189 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch, Mock
+from datetime import datetime, timedelta
+
+# Import the shared database utilities
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+import db_utils
+from db_utils import DiagramDBManager, encode_sync_token, decode_sync_token
+
+
+def _mock_connection(rows):
+    """Create a mock connection whose cursor returns the given rows."""
+    cursor = Mock()
+    cursor.fetchall.return_value = rows
+    conn = Mock()
+    conn.cursor.return_value = cursor
+    return conn, cursor
+
+
+class TestDiagramDBManagerUnit:
+    """Unit tests for DiagramDBManager query handling."""
+    
+    @pytest.mark.unit
+    def test_read_diagram_stats_groups_rows_by_dimension(self):
+        """Test that stats rows are grouped into per-dimension breakdowns."""
+        # Arrange
+        modified = datetime(2024, 1, 1, 12, 0, 0)
+        refreshed = datetime(2024, 1, 1, 12, 5, 0)
+        conn, cursor = _mock_connection([
+            ('author', 'Alice', 3, modified, refreshed),
+            ('diagram_type', 'Class', 4, modified, refreshed),
+            ('package_id', '7', 4, modified, refreshed),
+            ('total', None, 4, modified, refreshed),
+        ])
+        db_manager = DiagramDBManager()
+        
+        # Act
+        with patch.object(db_manager, '_get_connection', return_value=conn):
+            stats = db_manager.read_diagram_stats()
+        
+        # Assert
+        assert stats['total'] == {'count': 4, 'last_modified': modified.isoformat()}
+        assert stats['refreshed_at'] == refreshed.isoformat()
+        assert stats['by_author'] == [{'author': 'Alice', 'count': 3, 'last_modified': modified.isoformat()}]
+        assert stats['by_diagram_type'][0]['diagram_type'] == 'Class'
+        assert stats['by_package_id'][0]['package_id'] == 7
+        conn.close.assert_called_once()
+    
+    @pytest.mark.unit
+    def test_read_diagram_stats_filters_dimension(self):
+        """Test that a dimension filter is pushed into the query."""
+        # Arrange
+        conn, cursor = _mock_connection([])
+        db_manager = DiagramDBManager()
+        
+        # Act
+        with patch.object(db_manager, '_get_connection', return_value=conn):
+            stats = db_manager.read_diagram_stats(dimension='author')
+        
+        # Assert
+        sql, params = cursor.execute.call_args[0]
+        assert "WHERE dimension IN (%s, 'total')" in sql
+        assert params == ['author']
+        assert 'by_author' in stats
+        assert 'by_diagram_type' not in stats
+
+
+class TestSyncTokenUnit:
+    """Unit tests for delta sync token handling."""
+    
+    @pytest.mark.unit
+    def test_sync_token_round_trip(self):
+        """Test that an encoded token decodes to the same timestamp."""
+        # Arrange
+        timestamp = datetime(2024, 1, 1, 12, 30, 15, 123456)
+        
+        # Act
+        token = encode_sync_token(timestamp)
+        
+        # Assert
+        assert token.startswith("v1.")
+        assert decode_sync_token(token) == timestamp
+    
+    @pytest.mark.unit
+    def test_decode_sync_token_accepts_utc_timestamp(self):
+        """Test that ISO timestamps with offsets are normalised to naive UTC."""
+        # Act
+        result = decode_sync_token("2024-01-01T14:00:00+02:00")
+        
+        # Assert
+        assert result == datetime(2024, 1, 1, 12, 0, 0)
+        assert decode_sync_token("2024-01-01T12:00:00Z") == result
+    
+    @pytest.mark.unit
+    def test_decode_sync_token_rejects_garbage(self):
+        """Test that malformed values raise ValueError."""
+        with pytest.raises(ValueError):
+            decode_sync_token("v1.!!!")
+        with pytest.raises(ValueError):
+            decode_sync_token("yesterday")
+    
+    @pytest.mark.unit
+    def test_sync_rescans_overlap_before_token(self):
+        """Test that an incremental sync re-reads upserts and tombstones from before the token."""
+        # Arrange
+        conn, cursor = _mock_connection([])
+        sync_point = datetime(2024, 1, 1, 12, 5, 0)
+        cursor.fetchone.return_value = (sync_point,)
+        since = datetime(2024, 1, 1, 12, 0, 0)
+        db_manager = DiagramDBManager()
+        
+        # Act
+        with patch.object(db_manager, '_get_connection', return_value=conn), \
+                patch.object(db_utils, 'SYNC_OVERLAP_SECONDS', 60):
+            result = db_manager.sync_diagrams(modified_since=since)
+        
+        # Assert
+        rewound = since - timedelta(seconds=60)
+        upsert_sql, upsert_params = cursor.execute.call_args_list[1][0]
+        tombstone_sql, tombstone_params = cursor.execute.call_args_list[2][0]
+        assert "modifieddate > %s" in upsert_sql
+        assert upsert_params == [rewound]
+        assert "deleteddate > %s" in tombstone_sql
+        assert tombstone_params == [rewound]
+        assert decode_sync_token(result['sync_token']) == sync_point
+    
+    @pytest.mark.unit
+    def test_token_and_modifieddate_ignore_session_timezone(self):
+        """Test that the sync token and modifieddate are both taken as UTC, not in the session TimeZone."""
+        # Arrange
+        conn, cursor = _mock_connection([])
+        cursor.fetchone.return_value = (datetime(2024, 1, 1, 12, 0, 0),)
+        db_manager = DiagramDBManager()
+        
+        # Act
+        with patch.object(db_manager, '_get_connection', return_value=conn):
+            db_manager.sync_diagrams()
+        update_sql, _, _ = db_manager._build_update_query(42, {"name": "Renamed"})
+        
+        # Assert
+        token_sql = cursor.execute.call_args_list[0][0][0]
+        assert "now() AT TIME ZONE 'UTC'" in token_sql
+        assert "modifieddate = (now() AT TIME ZONE 'UTC')" in update_sql
+        assert "CURRENT_TIMESTAMP" not in update_sql
+
+
+class TestChangeOutboxUnit:
+    """Unit tests for the transactional outbox."""
+    
+    @pytest.mark.unit
+    def test_delete_records_tombstone_and_change_before_commit(self):
+        """Test that delete writes its tombstone and outbox row in the same transaction."""
+        # Arrange
+        conn, cursor = _mock_connection([])
+        cursor.fetchone.return_value = (42, 7, 'Class', '{GUID}')
+        db_manager = DiagramDBManager()
+        
+        # Act
+        with patch.object(db_manager, '_get_connection', return_value=conn):
+            result = db_manager.delete_diagram(42)
+        
+        # Assert
+        assert result is True
+        statements = [call[0][0] for call in cursor.execute.call_args_list]
+        assert 'DELETE FROM public.t_diagram' in statements[0]
+        assert 'INSERT INTO public.t_diagram_tombstone' in statements[1]
+        assert 'pg_advisory_xact_lock' in statements[2]
+        assert 'INSERT INTO public.t_diagram_outbox' in statements[3]
+        assert cursor.execute.call_args_list[3][0][1] == (42, 'delete', 7, 'Class', '{GUID}', None)
+        conn.commit.assert_called_once()
+    
+    @pytest.mark.unit
+    def test_delete_missing_diagram_writes_nothing(self):
+        """Test that deleting an unknown diagram records no change."""
+        # Arrange
+        conn, cursor = _mock_connection([])
+        cursor.fetchone.return_value = None
+        db_manager = DiagramDBManager()
+        
+        # Act
+        with patch.object(db_manager, '_get_connection', return_value=conn):
+            result = db_manager.delete_diagram(42)
+        
+        # Assert
+        assert result is False
+        assert cursor.execute.call_count == 1
+        conn.commit.assert_not_called()
@@ -0,0 +1,273 @@
+import pytest
+import json
+import sys
+import os
+from datetime import timedelta
+
+import azure.functions as func
+
+# Import the shared repository and the function folders
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+import diagram_repository
+from diagram_repository import DiagramRepository, InMemoryDiagramRepository, get_diagram_repository
+from db_utils import DiagramDBManager, decode_sync_token
+
+
+@pytest.fixture
+def repository():
+    """A fresh in-memory repository."""
+    return InMemoryDiagramRepository()
+
+
+@pytest.fixture
+def memory_backend(monkeypatch):
+    """Select the in-memory backend with a clean store for the handlers."""
+    monkeypatch.setattr(diagram_repository, "DIAGRAM_BACKEND", "memory")
+    monkeypatch.setattr(diagram_repository, "_memory_repository", None)
+    yield get_diagram_repository()
+
+
+class TestDiagramRepositoryUnit:
+    """Unit tests for the diagram repository backends."""
+    
+    @pytest.mark.unit
+    def test_both_backends_implement_the_interface(self):
+        """Test that the PostgreSQL and in-memory backends share the interface."""
+        # Assert
+        assert issubclass(DiagramDBManager, DiagramRepository)
+        assert isinstance(InMemoryDiagramRepository(), DiagramRepository)
+    
+    @pytest.mark.unit
+    def test_factory_selects_backend(self, memory_backend):
+        """Test that DIAGRAM_BACKEND picks the backend and memory is a singleton."""
+        # Act & Assert
+        assert get_diagram_repository() is memory_backend
+        assert isinstance(get_diagram_repository("postgres"), DiagramDBManager)
+        with pytest.raises(ValueError):
+            get_diagram_repository("sqlite")
+    
+    @pytest.mark.unit
+    def test_create_applies_defaults(self, repository):
+        """Test that created diagrams get IDs, timestamps and column defaults."""
+        # Act
+        diagram = repository.create_diagram({"name": "Context", "diagram_type": "Logical"})
+        
+        # Assert
+        assert diagram["diagram_id"] == 1
+        assert diagram["package_id"] == 1
+        assert diagram["version"] == "1.0"
+        assert diagram["scale"] == 100
+        assert diagram["createddate"] == diagram["modifieddate"]
+        assert repository.read_diagrams(diagram_id=1) == diagram
+    
+    @pytest.mark.unit
+    def test_listing_uses_filters_newest_first(self, repository):
+        """Test that package and type filters combine and results are newest first."""
+        # Arrange
+        repository.create_diagram({"name": "A", "package_id": 1, "diagram_type": "Logical"})
+        repository.create_diagram({"name": "B", "package_id": 2, "diagram_type": "Logical"})
+        repository.create_diagram({"name": "C", "package_id": 2, "diagram_type": "Sequence"})
+        repository.create_diagram({"name": "D", "package_id": 2, "diagram_type": "Logical"})
+        
+        # Act
+        both = repository.read_diagrams(package_id=2, diagram_type="Logical")
+        by_type = repository.read_diagrams(diagram_type="Logical")
+        
+        # Assert
+        assert [diagram["name"] for diagram in both] == ["D", "B"]
+        assert {diagram["name"] for diagram in by_type} == {"A", "B", "D"}
+        assert repository.read_diagrams(package_id=3) == []
+    
+    @pytest.mark.unit
+    def test_update_moves_diagram_between_indexes(self, repository):
+        """Test that updates reindex the diagram and ignore null fields."""
+        # Arrange
+        created = repository.create_diagram({"name": "A", "package_id": 1, "diagram_type": "Logical"})
+        
+        # Act
+        updated = repository.update_diagram(created["diagram_id"], {"package_id": 5, "name": None})
+        
+        # Assert
+        assert updated["package_id"] == 5
+        assert updated["name"] == "A"
+        assert repository.read_diagrams(package_id=1) == []
+        assert [diagram["diagram_id"] for diagram in repository.read_diagrams(package_id=5)] == [created["diagram_id"]]
+        assert repository.update_diagram(created["diagram_id"], {"name": None}) is None
+        assert repository.update_diagram(999, {"name": "X"}) is None
+    
+    @pytest.mark.unit
+    def test_string_package_ids_are_stored_as_integers(self, repository):
+        """Test that package_id given as a string is stored and found as an integer."""
+        # Act
+        created = repository.create_diagram({"name": "A", "package_id": "7"})
+        moved = repository.create_diagram({"name": "B", "package_id": 7})
+        repository.update_diagram(moved["diagram_id"], {"package_id": "8"})
+        
+        # Assert
+        assert created["package_id"] == 7
+        assert [diagram["name"] for diagram in repository.read_diagrams(package_id=7)] == ["A"]
+        assert [diagram["name"] for diagram in repository.read_diagrams(package_id="8")] == ["B"]
+        assert repository.read_changes(after=0)["changes"][0]["package_id"] == 7
+        with pytest.raises(ValueError):
+            repository.create_diagram({"name": "C", "package_id": "seven"})
+    
+    @pytest.mark.unit
+    def test_delete_leaves_tombstone_and_changes(self, repository):
+        """Test that deletes are reported by delta sync and the change feed."""
+        # Arrange
+        created = repository.create_diagram({"name": "A", "ea_guid": "{G1}"})
+        checkpoint = decode_sync_token(repository.sync_diagrams()["sync_token"]) - timedelta(seconds=1)
+        
+        # Act
+        deleted = repository.delete_diagram(created["diagram_id"])
+        sync = repository.sync_diagrams(modified_since=checkpoint)
+        changes = repository.read_changes(after=0)["changes"]
+        
+        # Assert
+        assert deleted is True
+        assert repository.delete_diagram(created["diagram_id"]) is False
+        assert repository.read_diagrams(diagram_id=created["diagram_id"]) is None
+        assert sync["diagrams"] == []
+        assert sync["deleted"][0]["ea_guid"] == "{G1}"
+        assert [change["operation"] for change in changes] == ["create", "delete"]
+        assert repository.read_changes(after=1)["changes"] == changes[1:]
+        assert repository.read_changes(after=0, limit=1)["has_more"] is True
+        assert repository.read_changes(after=0, limit=2)["has_more"] is False
+    
+    @pytest.mark.unit
+    def test_export_batches_selected_columns(self, repository):
+        """Test that exports yield column tuples in diagram_id order and batch size."""
+        # Arrange
+        for name in ("A", "B", "C"):
+            repository.create_diagram({"name": name})
+        
+        # Act
+        batches = list(repository.iter_diagram_batches(columns=("diagram_id", "name"), batch_size=2))
+        
+        # Assert
+        assert batches == [[(1, "A"), (2, "B")], [(3, "C")]]
+        with pytest.raises(ValueError):
+            list(repository.iter_diagram_batches(columns=("password",)))
+    
+    @pytest.mark.unit
+    def test_stats_group_by_dimension(self, repository):
+        """Test that stats count diagrams overall and per dimension."""
+        # Arrange
+        repository.create_diagram({"name": "A", "diagram_type": "Logical", "author": "sam"})
+        repository.create_diagram({"name": "B", "diagram_type": "Logical", "author": "alex"})
+        
+        # Act
+        stats = repository.read_diagram_stats(dimension="diagram_type")
+        
+        # Assert
+        assert stats["total"]["count"] == 2
+        assert stats["by_diagram_type"] == [
+            {"diagram_type": "Logical", "count": 2, "last_modified": stats["total"]["last_modified"]}
+        ]
+        assert "by_author" not in stats
+    
+    @pytest.mark.unit
+    def test_handlers_run_against_memory_backend(self, memory_backend):
+        """Test a create/read round trip through the handlers without a database."""
+        # Arrange
+        from diagram_create import main as create_main
+        from diagram_read import main as read_main
+        create_request = func.HttpRequest(
+            method="POST", url="/api/diagram/create", headers={},
+            body=json.dumps({"name": "Context", "package_id": 7}).encode()
+        )
+        
+        # Act
+        create_response = create_main(create_request)
+        diagram_id = json.loads(create_response.get_body())["diagram"]["diagram_id"]
+        read_response = read_main(func.HttpRequest(
+            method="GET", url="/api/diagram/read", headers={},
+            params={"diagram_id": str(diagram_id)}, body=b""
+        ))
+        
+        # Assert
+        assert create_response.status_code == 201
+        assert read_response.status_code == 200
+        assert json.loads(read_response.get_body())["diagram"]["package_id"] == 7
+    
+    @pytest.mark.unit
+    def test_ndjson_listing_writes_one_diagram_per_line(self, memory_backend):
+        """Test that an NDJSON listing holds each filtered diagram on its own line."""
+        # Arrange
+        from diagram_read import main as read_main
+        for name, package_id in (("Context", 7), ("Sequence", 7), ("Other", 8)):
+            memory_backend.create_diagram({"name": name, "package_id": package_id})
+        
+        # Act
+        response = read_main(func.HttpRequest(
+            method="GET", url="/api/diagram/read", headers={},
+            params={"format": "ndjson", "package_id": "7"}, body=b""
+        ))
+        
+        # Assert
+        body = response.get_body()
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        assert body.endswith(b"\n")
+        assert sorted(json.loads(line)["name"] for line in body.splitlines()) == ["Context", "Sequence"]
+    
+    @pytest.mark.unit
+    def test_delta_sync_negotiates_ndjson_and_msgpack(self, memory_backend):
+        """Test that modified_since syncs honour the negotiated format like listings."""
+        # Arrange
+        from diagram_read import main as read_main
+        kept = memory_backend.create_diagram({"name": "Kept"})
+        removed = memory_backend.create_diagram({"name": "Removed", "ea_guid": "{G2}"})
+        memory_backend.delete_diagram(removed["diagram_id"])
+        
+        def sync(**params):
+            return read_main(func.HttpRequest(
+                method="GET", url="/api/diagram/read", headers={},
+                params=dict(modified_since="1970-01-01T00:00:00Z", **params), body=b""
+            ))
+        
+        # Act
+        ndjson = sync(format="ndjson")
+        unsupported = sync(format="xml")
+        
+        # Assert
+        lines = [json.loads(line) for line in ndjson.get_body().splitlines()]
+        assert ndjson.status_code == 200
+        assert ndjson.mimetype == "application/x-ndjson"
+        assert ndjson.headers["X-Sync-Token"]
+        assert [line["diagram_id"] for line in lines] == [kept["diagram_id"], removed["diagram_id"]]
+        assert "deleted" not in lines[0]
+        assert lines[1]["deleted"] is True and lines[1]["ea_guid"] == "{G2}"
+        assert unsupported.status_code == 406
+        msgpack = pytest.importorskip("msgpack")
+        packed = sync(format="msgpack")
+        assert packed.mimetype == "application/msgpack"
+        assert msgpack.unpackb(packed.get_body())["deleted"][0]["ea_guid"] == "{G2}"
+    
+    @pytest.mark.unit
+    def test_export_pages_past_row_limit(self, memory_backend):
+        """Test that exports stop at limit rows and name the next page in a header."""
+        # Arrange
+        pa = pytest.importorskip("pyarrow")
+        from diagram_export import main as export_main
+        for name in ("A", "B", "C", "D", "E"):
+            memory_backend.create_diagram({"name": name})
+        
+        def export(**params):
+            response = export_main(func.HttpRequest(
+                method="GET", url="/api/diagram/export", headers={},
+                params=dict(columns="name", limit="2", **params), body=b""
+            ))
+            table = pa.ipc.open_stream(response.get_body()).read_all()
+            return table.column("name").to_pylist(), response.headers.get("X-Export-Next-After")
+        
+        # Act
+        first = export()
+        second = export(after=first[1])
+        last = export(after=second[1])
+        
+        # Assert
+        assert first == (["A", "B"], "2")
+        assert second == (["C", "D"], "4")
+        assert last == (["E"], None)
@@ -0,0 +1,427 @@
+import multiprocessing
+import pytest
+import sys
+import os
+import threading
+import time
+from unittest.mock import patch
+
+# Import the shared file utilities
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+import file_utils
+from file_utils import ApplicationFileManager, FileLock
+
+
+@pytest.fixture
+def manager(tmp_path):
+    """An ApplicationFileManager on a fresh mount directory."""
+    return ApplicationFileManager(mount_path=str(tmp_path))
+
+
+def _hammer(mount_path, app_id, worker):
+    """Worker process body: interleave creates and updates on a shared mount."""
+    manager = ApplicationFileManager(mount_path=mount_path)
+    for i in range(20):
+        manager.create_application({"name": f"worker{worker}-{i}"})
+        manager.update_application(app_id, {"version": str(i)})
+
+
+class TestFileUtilsUnit:
+    """Unit tests for the applications file manager."""
+    
+    @pytest.mark.unit
+    def test_crud_round_trip(self, manager):
+        """Test that created, updated and deleted applications read back correctly."""
+        # Arrange
+        first = manager.create_application({"name": "Portal", "owner": "sam", "category": "web"})
+        second = manager.create_application({"name": "Batch", "owner": "alex"})
+        
+        # Act
+        updated = manager.update_application(first["id"], {"status": "inactive"})
+        deleted = manager.delete_application(second["id"])
+        
+        # Assert
+        assert updated["status"] == "inactive"
+        assert updated["name"] == "Portal"
+        assert deleted is True
+        assert manager.delete_application(second["id"]) is False
+        assert manager.update_application("app_missing", {"status": "x"}) is None
+        assert [app["id"] for app in manager.read_all_applications()] == [first["id"]]
+        assert ApplicationFileManager(mount_path=manager.mount_path).find_application_by_id(first["id"]) == updated
+    
+    @pytest.mark.unit
+    def test_repeated_reads_parse_once(self, manager):
+        """Test that unchanged files are served from the cached snapshot."""
+        # Arrange
+        created = manager.create_application({"name": "Portal"})
+        other = ApplicationFileManager(mount_path=manager.mount_path)
+        
+        # Act
+        with patch.object(ApplicationFileManager, '_load', wraps=other._load) as mock_parse:
+            for _ in range(3):
+                found = other.find_application_by_id(created["id"])
+                other.read_all_applications()
+        
+        # Assert
+        assert found["name"] == "Portal"
+        assert mock_parse.call_count == 1
+    
+    @pytest.mark.unit
+    def test_external_change_is_detected(self, manager):
+        """Test that a write by another process invalidates the snapshot."""
+        # Arrange
+        created = manager.create_application({"name": "Portal"})
+        manager.read_all_applications()
+        
+        # Act
+        with open(manager.applications_file, 'a', encoding='utf-8') as f:
+            f.write("app_external\tExternal\t\t1.0.0\tactive\t\t\t\t\n")
+        
+        # Assert
+        assert manager.find_application_by_id("app_external")["name"] == "External"
+        assert manager.find_application_by_id(created["id"])["name"] == "Portal"
+    
+    @pytest.mark.unit
+    def test_returned_records_do_not_alias_cache(self, manager):
+        """Test that modifying a returned record leaves the cache intact."""
+        # Arrange
+        created = manager.create_application({"name": "Portal"})
+        
+        # Act
+        manager.find_application_by_id(created["id"])["name"] = "Changed"
+        manager.read_all_applications()[0]["name"] = "Changed"
+        
+        # Assert
+        assert manager.find_application_by_id(created["id"])["name"] == "Portal"
+    
+    @pytest.mark.unit
+    def test_cached_writes_match_a_fresh_parse(self, manager):
+        """Test that snapshots cached after writes equal re-reading the file."""
+        # Arrange
+        first = manager.create_application({"name": "Portal"})
+        second = manager.create_application({"name": "Batch", "category": "jobs"})
+        manager.update_application(first["id"], {"description": "Customer portal", "extra": "dropped"})
+        manager.delete_application(second["id"])
+        cached = manager.read_all_applications()
+        
+        # Act
+        with patch.dict('file_utils._views', clear=True):
+            parsed = manager.read_all_applications()
+        
+        # Assert
+        assert cached == parsed
+        assert "extra" not in cached[0]
+    
+    @pytest.mark.unit
+    def test_update_keeps_application_id(self, manager):
+        """Test that an id in the update data does not fork the record under a new id."""
+        # Arrange
+        app = manager.create_application({"name": "Portal"})
+        
+        # Act
+        updated = manager.update_application(app["id"], {"id": "renamed", "status": "inactive"})
+        
+        # Assert
+        assert updated["id"] == app["id"]
+        assert manager.find_application_by_id("renamed") is None
+        with patch.dict('file_utils._views', clear=True):
+            applications = manager.read_all_applications()
+        assert [(a["id"], a["status"]) for a in applications] == [(app["id"], "inactive")]
+    
+    @pytest.mark.unit
+    def test_writes_append_to_journal(self, manager):
+        """Test that updates and deletes append one entry instead of rewriting the snapshot."""
+        # Arrange
+        first = manager.create_application({"name": "Portal"})
+        second = manager.create_application({"name": "Batch"})
+        snapshot_size = os.path.getsize(manager.applications_file)
+        
+        # Act
+        manager.update_application(first["id"], {"status": "inactive"})
+        manager.delete_application(second["id"])
+        
+        # Assert
+        assert os.path.getsize(manager.applications_file) == snapshot_size
+        with open(manager.journal_file, encoding='utf-8') as f:
+            entries = [line.split('\t')[0] for line in f]
+        assert entries == ["U", "D"]
+        assert [app["status"] for app in manager.read_all_applications()] == ["inactive"]
+    
+    @pytest.mark.unit
+    def test_other_workers_see_journal_entries(self, manager):
+        """Test that a second process view picks up journal entries incrementally."""
+        # Arrange
+        created = manager.create_application({"name": "Portal"})
+        manager.read_all_applications()
+        
+        # Act: another worker appends to the journal, including a torn last line
+        with open(manager.journal_file, 'a', encoding='utf-8') as f:
+            f.write("U\t" + "\t".join([created["id"], "Renamed", "", "1.0.0", "active", "", "", "", ""]) + "\n")
+            f.write("D\t" + created["id"])
+        renamed = manager.find_application_by_id(created["id"])
+        with open(manager.journal_file, 'a', encoding='utf-8') as f:
+            f.write("\n")
+        
+        # Assert
+        assert renamed["name"] == "Renamed"
+        assert manager.find_application_by_id(created["id"]) is None
+    
+    @pytest.mark.unit
+    def test_compaction_at_threshold(self, manager):
+        """Test that the journal is folded into the snapshot once it is full."""
+        # Arrange
+        apps = [manager.create_application({"name": f"App {i}"}) for i in range(3)]
+        
+        # Act
+        with patch.object(file_utils, 'APPLICATION_JOURNAL_MAX_ENTRIES', 3):
+            manager.update_application(apps[0]["id"], {"status": "inactive"})
+            manager.delete_application(apps[1]["id"])
+            before = manager.read_all_applications()
+            manager.update_application(apps[2]["id"], {"owner": "sam"})
+        
+        # Assert
+        with open(manager.journal_file, encoding='utf-8') as f:
+            assert [line.split('\t')[0] for line in f] == [file_utils.JOURNAL_GENERATION]
+        with patch.dict('file_utils._views', clear=True):
+            compacted = manager.read_all_applications()
+        assert [app["id"] for app in compacted] == [app["id"] for app in before]
+        assert compacted[0]["status"] == "inactive"
+        assert compacted[1]["owner"] == "sam"
+    
+    @pytest.mark.unit
+    def test_journal_replay_is_idempotent(self, manager):
+        """Test that replaying a journal over its own compaction changes nothing."""
+        # Arrange
+        apps = [manager.create_application({"name": f"App {i}"}) for i in range(2)]
+        manager.update_application(apps[0]["id"], {"status": "inactive"})
+        manager.delete_application(apps[1]["id"])
+        with open(manager.journal_file, encoding='utf-8') as f:
+            journal = f.read()
+        expected = manager.read_all_applications()
+        
+        # Act: compaction interrupted before the journal was truncated
+        manager.compact()
+        with open(manager.journal_file, 'w', encoding='utf-8') as f:
+            f.write(journal)
+        with patch.dict('file_utils._views', clear=True):
+            replayed = manager.read_all_applications()
+        
+        # Assert
+        assert replayed == expected
+    
+    @pytest.mark.unit
+    def test_delete_removes_duplicate_rows(self, manager):
+        """Test that deleting an id drops every snapshot row carrying it."""
+        # Arrange
+        with open(manager.applications_file, 'a', encoding='utf-8') as f:
+            f.write("app_dup\tFirst\n")
+            f.write("app_other\tOther\n")
+            f.write("app_dup\tSecond\n")
+        
+        # Act
+        found = manager.find_application_by_id("app_dup")
+        deleted = manager.delete_application("app_dup")
+        
+        # Assert
+        assert found["name"] == "First"
+        assert deleted is True
+        assert [app["id"] for app in manager.read_all_applications()] == ["app_other"]
+    
+    @pytest.mark.unit
+    @pytest.mark.skipif(file_utils.fcntl is None, reason="needs flock")
+    def test_shared_locks_do_not_block_each_other(self, tmp_path):
+        """Test that readers share the lock while a writer excludes them."""
+        # Arrange
+        path = str(tmp_path / "applications.lock")
+        results = {}
+        
+        def contend():
+            with FileLock(path, exclusive=False, timeout=1):
+                results["shared"] = True
+            try:
+                with FileLock(path, exclusive=True, timeout=0.05):
+                    results["exclusive"] = True
+            except TimeoutError:
+                results["exclusive"] = False
+        
+        # Act
+        with patch.object(file_utils, 'APPLICATION_LOCK_MODE', 'flock'):
+            with FileLock(path, exclusive=False):
+                thread = threading.Thread(target=contend)
+                thread.start()
+                thread.join()
+            with FileLock(path, exclusive=True, timeout=0.05):
+                results["released"] = True
+        
+        # Assert
+        assert results == {"shared": True, "exclusive": False, "released": True}
+    
+    @pytest.mark.unit
+    def test_lease_fallback(self, tmp_path):
+        """Test that the lease file excludes writers and expired leases are broken."""
+        # Arrange
+        path = str(tmp_path / "applications.lock")
+        lease_path = path + ".lease"
+        errors = []
+        
+        def contend():
+            try:
+                with FileLock(path, exclusive=True, timeout=0.05):
+                    pass
+            except TimeoutError as e:
+                errors.append(e)
+        
+        with patch.object(file_utils, 'APPLICATION_LOCK_MODE', 'lease'):
+            # Act
+            with FileLock(path, exclusive=True):
+                held = os.path.exists(lease_path)
+                thread = threading.Thread(target=contend)
+                thread.start()
+                thread.join()
+            released = not os.path.exists(lease_path)
+            
+            # A lease left behind by a crashed worker
+            with open(lease_path, 'w') as f:
+                f.write("other-host 1 1\n")
+            old = time.time() - 60
+            os.utime(lease_path, (old, old))
+            with FileLock(path, exclusive=True, lease_seconds=30):
+                broken = True
+        
+        # Assert
+        assert held is True
+        assert len(errors) == 1
+        assert released is True
+        assert broken is True
+        assert not os.path.exists(lease_path)
+    
+    @pytest.mark.unit
+    def test_lock_is_reentrant(self, tmp_path):
+        """Test that a writer can read under its own lock but not upgrade a read."""
+        # Arrange
+        path = str(tmp_path / "applications.lock")
+        
+        # Act / Assert
+        with FileLock(path, exclusive=True):
+            with FileLock(path, exclusive=False, timeout=0):
+                pass
+        with FileLock(path, exclusive=False):
+            with pytest.raises(RuntimeError):
+                with FileLock(path, exclusive=True, timeout=0):
+                    pass
+    
+    @pytest.mark.unit
+    def test_compaction_replaces_snapshot_atomically(self, manager):
+        """Test that compaction renames a new snapshot into place and leaves no temp file."""
+        # Arrange
+        created = manager.create_application({"name": "Portal"})
+        manager.update_application(created["id"], {"status": "inactive"})
+        inode = os.stat(manager.applications_file).st_ino
+        
+        # Act
+        manager.compact()
+        
+        # Assert
+        assert os.stat(manager.applications_file).st_ino != inode
+        assert not [name for name in os.listdir(manager.mount_path) if name.endswith('.tmp')]
+        assert manager.find_application_by_id(created["id"])["status"] == "inactive"
+    
+    @pytest.mark.unit
+    @pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+    def test_concurrent_workers_lose_no_writes(self, manager):
+        """Test that creates, updates and compactions from several processes all survive."""
+        # Arrange
+        targets = [manager.create_application({"name": f"Target {i}"}) for i in range(4)]
+        context = multiprocessing.get_context("fork")
+        
+        # Act: a low threshold makes the workers compact under each other
+        with patch.object(file_utils, 'APPLICATION_JOURNAL_MAX_ENTRIES', 7):
+            workers = [
+                context.Process(target=_hammer, args=(manager.mount_path, target["id"], i))
+                for i, target in enumerate(targets)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join(60)
+        
+        # Assert
+        assert [worker.exitcode for worker in workers] == [0] * len(workers)
+        with patch.dict('file_utils._views', clear=True):
+            apps = manager.read_all_applications()
+        names = {app["name"] for app in apps}
+        assert all(f"worker{w}-{i}" in names for w in range(4) for i in range(20))
+        assert len(apps) == 4 + 4 * 20
+        for target in targets:
+            assert manager.find_application_by_id(target["id"])["version"] == "19"
+    
+    @pytest.mark.unit
+    def test_iter_applications_matches_read_all(self, manager):
+        """Test that streamed pages equal filtered slices of read_all, cold and warm."""
+        # Arrange
+        apps = [
+            manager.create_application({"name": f"App {i}", "status": ("active", "inactive")[i % 2],
+                                        "owner": f"owner{i % 3}", "category": "web"})
+            for i in range(12)
+        ]
+        manager.update_application(apps[0]["id"], {"status": "inactive"})
+        manager.update_application(apps[1]["id"], {"status": "active"})
+        manager.delete_application(apps[2]["id"])
+        manager.delete_application(apps[3]["id"])
+        # Re-create a deleted record through the journal, as compaction replay would
+        manager._append_journal(f"U\t{file_utils._format_line(dict(apps[3], status='inactive'))}")
+        manager.update_application(apps[3]["id"], {"owner": "owner9"})
+        everything = manager.read_all_applications()
+        cases = [
+            ({}, 0, None),
+            ({"status": "inactive"}, 0, 3),
+            ({"status": "inactive"}, 3, 3),
+            ({"status": "active", "owner": "owner1"}, 0, 10),
+            ({"category": "web"}, 10, 5),
+            ({"owner": "nobody"}, 0, 5),
+            ({}, 0, 0),
+        ]
+        
+        for criteria, offset, limit in cases:
+            expected = [app for app in everything if all(app[k] == v for k, v in criteria.items())]
+            expected = expected[offset:None if limit is None else offset + limit]
+            
+            # Act
+            warm = list(manager.iter_applications(criteria, offset, limit))
+            with patch.dict('file_utils._views', clear=True):
+                cold = list(manager.iter_applications(criteria, offset, limit))
+            
+            # Assert
+            assert cold == expected, (criteria, offset, limit)
+            assert warm == expected, (criteria, offset, limit)
+        assert everything[-1]["id"] == apps[3]["id"]
+    
+    @pytest.mark.unit
+    def test_iter_applications_stops_once_page_is_full(self, manager):
+        """Test that a cold page is read lazily without parsing or caching the whole file."""
+        # Arrange
+        for i in range(4):
+            manager.create_application({"name": f"App {i}", "status": "active"})
+        with open(manager.applications_file, 'ab') as f:
+            # Undecodable; reading this far would fail
+            f.write(b"\xff\xfe broken\n")
+        
+        # Act
+        with patch.dict('file_utils._views', clear=True):
+            page = list(manager.iter_applications({"status": "active"}, offset=1, limit=2))
+            cached = dict(file_utils._views)
+        
+        # Assert
+        assert [app["name"] for app in page] == ["App 1", "App 2"]
+        assert cached == {}
+    
+    @pytest.mark.unit
+    def test_iter_applications_rejects_invalid_arguments(self, manager):
+        """Test that unknown filter fields and negative bounds are refused."""
+        # Act / Assert
+        with pytest.raises(ValueError):
+            manager.iter_applications({"name": "Portal"})
+        with pytest.raises(ValueError):
+            manager.iter_applications(offset=-1)
+        with pytest.raises(ValueError):
+            manager.iter_applications(limit=-5)
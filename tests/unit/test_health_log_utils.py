@@ -0,0 +1,344 @@
+import pytest
+import gzip
+import json
+import sys
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import azure.functions as func
+
+# Import the shared health log writer and the function folders
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+import health_log_utils
+from health_log_utils import HealthLogWriter, read_history
+
+
+def _health_record(timestamp, cpu, memory, database="connected"):
+    return {
+        "timestamp": timestamp,
+        "checks": {"database": {"status": database}},
+        "system_metrics": {"cpu": {"percent": cpu}, "memory": {"percent": memory}}
+    }
+
+
+def _read_lines(path):
+    with open(path, "rb") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestHealthLogUtilsUnit:
+    """Unit tests for the buffered, rotating health log writer."""
+    
+    @pytest.mark.unit
+    def test_write_buffers_until_flush(self, tmp_path):
+        """Test that records are only written when a batch is flushed."""
+        # Arrange
+        path = str(tmp_path / "health.txt")
+        writer = HealthLogWriter(path, batch_size=100, flush_seconds=3600)
+        
+        # Act
+        writer.write({"n": 1})
+        writer.write({"n": 2})
+        before = os.path.exists(path)
+        written = writer.flush()
+        
+        # Assert
+        assert before is False
+        assert written == 2
+        assert _read_lines(path) == [{"n": 1}, {"n": 2}]
+        assert writer.flush() == 0
+    
+    @pytest.mark.unit
+    def test_batch_size_triggers_background_flush(self, tmp_path):
+        """Test that a full batch is flushed by the writer thread."""
+        # Arrange
+        path = str(tmp_path / "health.txt")
+        writer = HealthLogWriter(path, batch_size=3, flush_seconds=3600)
+        
+        # Act
+        for n in range(3):
+            writer.write({"n": n})
+        for _ in range(100):
+            if os.path.exists(path) and len(_read_lines(path)) == 3:
+                break
+            time.sleep(0.01)
+        
+        # Assert
+        assert [record["n"] for record in _read_lines(path)] == [0, 1, 2]
+    
+    @pytest.mark.unit
+    def test_keeps_one_handle_per_worker(self, tmp_path):
+        """Test that consecutive flushes reuse the open append handle."""
+        # Arrange
+        path = str(tmp_path / "health.txt")
+        writer = HealthLogWriter(path, batch_size=100, flush_seconds=3600)
+        
+        # Act
+        with patch("builtins.open", wraps=open) as mock_open:
+            for n in range(3):
+                writer.write({"n": n})
+                writer.flush()
+        
+        # Assert
+        assert mock_open.call_count == 1
+        assert len(_read_lines(path)) == 3
+    
+    @pytest.mark.unit
+    def test_rotates_into_gzip_segments_with_retention(self, tmp_path):
+        """Test that the log rotates by size and only the newest segments are kept."""
+        # Arrange
+        path = str(tmp_path / "health.txt")
+        writer = HealthLogWriter(path, batch_size=100, flush_seconds=3600, max_bytes=200, retention=2)
+        
+        # Act
+        for n in range(4):
+            writer.write({"n": n, "padding": "x" * 200})
+            writer.flush()
+        writer.write({"n": "latest"})
+        writer.flush()
+        
+        # Assert
+        segments = writer.segments()
+        assert len(segments) == 2
+        with gzip.open(segments[-1], "rb") as f:
+            assert json.loads(f.readline())["n"] == 3
+        assert _read_lines(path) == [{"n": "latest"}]
+    
+    @pytest.mark.unit
+    def test_failed_flush_keeps_records(self, tmp_path):
+        """Test that records survive an unwritable share and are bounded."""
+        # Arrange
+        path = str(tmp_path / "missing" / "health.txt")
+        writer = HealthLogWriter(path, batch_size=100, flush_seconds=3600, max_buffered=2)
+        for n in range(3):
+            writer.write({"n": n})
+        
+        # Act
+        with pytest.raises(OSError):
+            writer.flush()
+        os.makedirs(tmp_path / "missing")
+        writer.flush()
+        
+        # Assert
+        assert _read_lines(path) == [{"n": 1}, {"n": 2}]
+    
+    @pytest.mark.unit
+    def test_flush_waits_for_log_lock(self, tmp_path):
+        """Test that a flush keeps its batch while another worker holds the log lock."""
+        # Arrange
+        from file_utils import FileLock
+        path = str(tmp_path / "health.txt")
+        writer = HealthLogWriter(path, batch_size=100, flush_seconds=3600)
+        writer.write({"n": 0})
+        
+        held, release = threading.Event(), threading.Event()
+        
+        def hold_lock():
+            with FileLock(path + ".lock", exclusive=True):
+                held.set()
+                release.wait(5)
+        
+        # Act
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        held.wait(5)
+        with patch.object(health_log_utils, "HEALTH_LOG_LOCK_TIMEOUT_SECONDS", 0.05):
+            with pytest.raises(TimeoutError):
+                writer.flush()
+            release.set()
+            holder.join()
+            written = writer.flush()
+        
+        # Assert
+        assert written == 1
+        assert _read_lines(path) == [{"n": 0}]
+    
+    @pytest.mark.unit
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+    def test_concurrent_rotation_keeps_every_record(self, tmp_path):
+        """Test that workers appending and rotating one log lose no records."""
+        # Arrange
+        path = str(tmp_path / "health.txt")
+        
+        def worker(worker_id):
+            writer = HealthLogWriter(path, batch_size=1000, flush_seconds=3600, max_bytes=2000, retention=1000)
+            for n in range(200):
+                writer.write({"worker": worker_id, "n": n, "padding": "x" * 50})
+                writer.flush()
+        
+        # Act
+        pids = []
+        for worker_id in range(4):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    worker(worker_id)
+                finally:
+                    os._exit(0)
+            pids.append(pid)
+        for pid in pids:
+            os.waitpid(pid, 0)
+        
+        # Assert
+        records = _read_lines(path) if os.path.exists(path) else []
+        for segment in HealthLogWriter(path).segments():
+            with gzip.open(segment, "rb") as f:
+                records.extend(json.loads(line) for line in f)
+        assert sorted((record["worker"], record["n"]) for record in records) == [
+            (worker_id, n) for worker_id in range(4) for n in range(200)
+        ]
+    
+    @pytest.mark.unit
+    def test_exit_flush_logs_failure(self, tmp_path):
+        """Test that the flush registered for interpreter exit logs an unwritable share instead of raising."""
+        # Arrange
+        writer = HealthLogWriter(str(tmp_path / "missing" / "health.txt"), batch_size=100, flush_seconds=3600)
+        writer.write({"n": 0})
+        
+        # Act
+        with patch.object(health_log_utils, '_writer', None), \
+             patch.object(health_log_utils, 'HealthLogWriter', return_value=writer), \
+             patch('health_log_utils.atexit.register') as mock_register, \
+             patch.object(health_log_utils.logger, 'error') as mock_error:
+            health_log_utils.get_health_log()
+            exit_flush, *args = mock_register.call_args[0]
+            exit_flush(*args)
+        
+        # Assert
+        mock_error.assert_called_once()
+        assert "at exit" in mock_error.call_args[0][0]
+    
+    @pytest.mark.unit
+    def test_flushes_maintain_rollups(self, tmp_path):
+        """Test that partial rollups from separate flushes merge per bucket."""
+        # Arrange
+        rollup_dir = str(tmp_path / "rollups")
+        writer = HealthLogWriter(str(tmp_path / "health.txt"), batch_size=100,
+                                 flush_seconds=3600, rollup_dir=rollup_dir, rollup_retention_days=36500)
+        
+        # Act
+        writer.write(_health_record("2026-01-01T10:00:05Z", 10, 50))
+        writer.write(_health_record("2026-01-01T10:00:35Z", 30, 70, database="error"))
+        writer.flush()
+        writer.write(_health_record("2026-01-01T10:00:55Z", 20, 60))
+        writer.write(_health_record("2026-01-01T10:01:10Z", 90, 40))
+        writer.flush()
+        minutes = read_history("minute", datetime(2026, 1, 1, 10), datetime(2026, 1, 1, 11), rollup_dir)
+        hours = read_history("hour", datetime(2026, 1, 1), datetime(2026, 1, 2), rollup_dir)
+        
+        # Assert
+        assert [bucket["bucket"] for bucket in minutes] == ["2026-01-01T10:00:00Z", "2026-01-01T10:01:00Z"]
+        assert minutes[0]["count"] == 3
+        assert minutes[0]["cpu"] == {"min": 10, "avg": 20.0, "max": 30}
+        assert minutes[0]["database"] == {"connected": 2, "error": 1}
+        assert hours == [{
+            "bucket": "2026-01-01T10:00:00Z",
+            "count": 4,
+            "cpu": {"min": 10, "avg": 37.5, "max": 90},
+            "memory": {"min": 40, "avg": 55.0, "max": 70},
+            "database": {"connected": 3, "error": 1}
+        }]
+    
+    @pytest.mark.unit
+    def test_history_only_reads_days_in_window(self, tmp_path):
+        """Test that history filters to the window and skips other day files."""
+        # Arrange
+        rollup_dir = str(tmp_path / "rollups")
+        writer = HealthLogWriter(str(tmp_path / "health.txt"), batch_size=100,
+                                 flush_seconds=3600, rollup_dir=rollup_dir, rollup_retention_days=36500)
+        writer.write(_health_record("2026-01-01T23:59:00Z", 10, 50))
+        writer.write(_health_record("2026-01-02T00:00:30Z", 20, 50))
+        writer.flush()
+        
+        # Act
+        with patch("builtins.open", wraps=open) as mock_open:
+            history = read_history("minute", datetime(2026, 1, 2), datetime(2026, 1, 2, 1), rollup_dir)
+        
+        # Assert
+        assert [bucket["bucket"] for bucket in history] == ["2026-01-02T00:00:00Z"]
+        assert [call.args[0] for call in mock_open.call_args_list] == [
+            os.path.join(rollup_dir, "minute-2026-01-02.ndjson")
+        ]
+    
+    @pytest.mark.unit
+    def test_history_endpoint(self, tmp_path):
+        """Test the health/history route parameters and validation."""
+        # Arrange
+        from health_history import main
+        rollup_dir = str(tmp_path / "rollups")
+        writer = HealthLogWriter(str(tmp_path / "health.txt"), batch_size=100,
+                                 flush_seconds=3600, rollup_dir=rollup_dir, rollup_retention_days=36500)
+        writer.write(_health_record("2026-01-01T10:00:05Z", 10, 50))
+        writer.flush()
+        
+        def request(**params):
+            return func.HttpRequest(method="GET", url="/api/health/history", headers={}, params=params, body=b"")
+        
+        # Act
+        with patch.object(health_log_utils, 'HEALTH_ROLLUP_DIR', rollup_dir):
+            response = main(request(resolution="hour", since="2026-01-01T09:30:00Z", until="2026-01-01T12:00:00Z"))
+            invalid_resolution = main(request(resolution="day"))
+            invalid_window = main(request(window="soon"))
+            oversized_window = main(request(window="31d"))
+            overflowing_window = main(request(window="99999999999d"))
+            overflowing_until = main(request(until="0001-01-01T00:00:00Z"))
+        
+        # Assert
+        body = json.loads(response.get_body())
+        assert response.status_code == 200
+        assert body["from"] == "2026-01-01T09:00:00Z"
+        assert body["count"] == 1
+        assert body["buckets"][0]["cpu"]["avg"] == 10.0
+        assert invalid_resolution.status_code == 400
+        assert invalid_window.status_code == 400
+        assert oversized_window.status_code == 400
+        assert json.loads(oversized_window.get_body())["error"] == "window must be at most 30d"
+        assert overflowing_window.status_code == 400
+        assert overflowing_until.status_code == 400
+    
+    @pytest.mark.unit
+    def test_rollups_past_retention_are_pruned(self, tmp_path):
+        """Test that day files older than the retention are removed on flush."""
+        # Arrange
+        rollup_dir = str(tmp_path / "rollups")
+        writer = HealthLogWriter(str(tmp_path / "health.txt"), batch_size=100,
+                                 flush_seconds=3600, rollup_dir=rollup_dir, rollup_retention_days=1)
+        
+        # Act
+        writer.write(_health_record("2020-01-01T00:00:00Z", 10, 50))
+        writer.write(_health_record(datetime.utcnow().isoformat() + "Z", 10, 50))
+        writer.flush(final=True)
+        
+        # Assert
+        assert sorted(os.listdir(rollup_dir)) == [
+            f"hour-{datetime.utcnow().date().isoformat()}.ndjson",
+            f"minute-{datetime.utcnow().date().isoformat()}.ndjson"
+        ]
+    
+    @pytest.mark.unit
+    def test_open_minutes_are_written_once_closed(self, tmp_path):
+        """Test that flushes within an open minute append one line per bucket."""
+        # Arrange
+        rollup_dir = str(tmp_path / "rollups")
+        writer = HealthLogWriter(str(tmp_path / "health.txt"), batch_size=100,
+                                 flush_seconds=3600, rollup_dir=rollup_dir, rollup_retention_days=36500)
+        minute = (datetime.utcnow() + timedelta(minutes=10)).replace(second=0, microsecond=0)
+        
+        # Act
+        for second in range(0, 60, 10):
+            writer.write(_health_record((minute + timedelta(seconds=second)).isoformat() + "Z", second, 50))
+            writer.flush()
+        written_while_open = os.listdir(rollup_dir) if os.path.isdir(rollup_dir) else []
+        writer.flush(final=True)
+        
+        # Assert
+        assert written_while_open == []
+        for resolution in ("minute", "hour"):
+            lines = _read_lines(os.path.join(rollup_dir, f"{resolution}-{minute.date().isoformat()}.ndjson"))
+            assert len(lines) == 1
+            assert lines[0]["count"] == 6
+            assert lines[0]["cpu"] == {"min": 0, "max": 50, "sum": 150, "count": 6}
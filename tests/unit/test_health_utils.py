@@ -0,0 +1,242 @@
+import pytest
+import json
+import sys
+import os
+import threading
+import time
+from unittest.mock import patch, Mock
+
+import azure.functions as func
+
+# Import the shared health utilities and the function folders
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+import health_utils
+from health_utils import ReadinessCache, run_probes
+
+
+class _CountingProbe:
+    """Probe that counts its calls and can be made to block"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+    
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        return {"status": "ready", "call": self.calls}
+
+
+class TestHealthUtilsUnit:
+    """Unit tests for the liveness and readiness probes."""
+    
+    @pytest.mark.unit
+    def test_readiness_cache_serves_cached_report(self):
+        """Test that the first read probes and later fresh reads do not."""
+        # Arrange
+        probe = _CountingProbe()
+        cache = ReadinessCache(probe, refresh_seconds=3600, max_stale_seconds=3600)
+        
+        # Act
+        first, _, first_stale = cache.get()
+        second, age, stale = cache.get()
+        
+        # Assert
+        assert probe.calls == 1
+        assert first is second
+        assert first_stale is False and stale is False
+        assert age >= 0
+    
+    @pytest.mark.unit
+    def test_stale_report_is_served_while_revalidating(self):
+        """Test that a stale read returns immediately and refreshes in the background."""
+        # Arrange
+        probe = _CountingProbe()
+        cache = ReadinessCache(probe, refresh_seconds=3600, max_stale_seconds=0)
+        cache.get()
+        probe.release.clear()
+        
+        # Act
+        start = time.monotonic()
+        report, _, stale = cache.get()
+        cache.get()
+        elapsed = time.monotonic() - start
+        probe.release.set()
+        for _ in range(100):
+            if cache._report["call"] == 2:
+                break
+            time.sleep(0.01)
+        
+        # Assert
+        assert elapsed < 1
+        assert stale is True
+        assert report["call"] == 1
+        assert probe.calls == 2
+        assert cache._report["call"] == 2
+    
+    @pytest.mark.unit
+    def test_failing_probe_reports_not_ready(self):
+        """Test that a probe exception is cached as not ready instead of raised."""
+        # Arrange
+        def probe():
+            raise RuntimeError("connection refused")
+        cache = ReadinessCache(probe, refresh_seconds=3600, max_stale_seconds=3600)
+        
+        # Act
+        report, _, _ = cache.get()
+        
+        # Assert
+        assert report["status"] == "not_ready"
+        assert "connection refused" in report["error"]
+    
+    @pytest.mark.unit
+    def test_probes_run_concurrently(self):
+        """Test that probe latencies overlap instead of adding up."""
+        # Arrange
+        def slow():
+            time.sleep(0.2)
+            return {"status": "ok"}
+        
+        # Act
+        start = time.monotonic()
+        outcomes = run_probes({"a": slow, "b": slow, "c": slow}, timeouts={"a": 2, "b": 2, "c": 2})
+        elapsed = time.monotonic() - start
+        
+        # Assert
+        assert elapsed < 0.5
+        assert all(outcome["status"] == "ok" for outcome in outcomes.values())
+        assert all(outcome["duration_ms"] >= 150 for outcome in outcomes.values())
+    
+    @pytest.mark.unit
+    def test_slow_probe_times_out_without_blocking(self):
+        """Test that a hung probe is reported as timed_out at its deadline."""
+        # Arrange
+        hang = threading.Event()
+        def fast(value):
+            return {"status": "ok", "value": value}
+        
+        # Act
+        start = time.monotonic()
+        outcomes = run_probes(
+            {"hung": lambda: hang.wait(5), "fast": (fast, (1,)), "broken": lambda: 1 / 0},
+            timeouts={"hung": 0.1, "fast": 1, "broken": 1}
+        )
+        elapsed = time.monotonic() - start
+        hang.set()
+        
+        # Assert
+        assert elapsed < 1
+        assert outcomes["hung"]["status"] == "timed_out"
+        assert outcomes["hung"]["result"] == {"status": "timed_out", "timeout_seconds": 0.1}
+        assert outcomes["fast"]["result"]["value"] == 1
+        assert outcomes["broken"]["status"] == "error"
+    
+    @pytest.mark.unit
+    def test_health_report_degrades_on_database_timeout(self):
+        """Test that a database probe past its deadline degrades the report."""
+        # Arrange
+        release = threading.Event()
+        def hung_database(detailed=False, exact_count=False):
+            release.wait(5)
+        
+        # Act
+        with patch.object(health_utils, 'check_database', hung_database), \
+             patch.dict(health_utils.PROBE_TIMEOUTS, {"database": 0.1}), \
+             patch.object(health_utils, 'check_file_system', lambda: {"exists": True, "path": "health.txt"}):
+            report = health_utils.build_health_report()
+        release.set()
+        
+        # Assert
+        assert report["status"] == "degraded"
+        assert report["checks"]["database"]["status"] == "timed_out"
+        assert report["probes"]["database"]["status"] == "timed_out"
+        assert report["probes"]["file_system"]["status"] == "ok"
+    
+    @pytest.mark.unit
+    def test_database_probe_bounds_connect_and_queries(self):
+        """Test that the database probe passes its deadline on as connect and statement timeouts."""
+        # Arrange
+        timeouts = dict(health_utils.PROBE_TIMEOUTS, database=2.5)
+        
+        # Act
+        with patch.object(health_utils, 'PROBE_TIMEOUTS', timeouts), \
+             patch('db_utils.psycopg.connect') as mock_connect:
+            result = health_utils.check_database()
+        
+        # Assert
+        kwargs = mock_connect.call_args.kwargs
+        assert result["status"] == "connected"
+        assert kwargs["connect_timeout"] == 3
+        assert kwargs["options"] == "-c statement_timeout=2500"
+    
+    @pytest.mark.unit
+    def test_row_count_uses_catalog_estimate(self):
+        """Test that the estimate falls back to live tuples before the first ANALYZE."""
+        # Arrange
+        analyzed = Mock()
+        analyzed.fetchone.return_value = (120000, 119500)
+        never_analyzed = Mock()
+        never_analyzed.fetchone.return_value = (-1, 42)
+        
+        # Act & Assert
+        assert health_utils._estimate_row_count(analyzed) == (120000, "estimate")
+        assert health_utils._estimate_row_count(never_analyzed) == (42, "live_tuples")
+        assert "COUNT(*)" not in analyzed.execute.call_args[0][0]
+    
+    @pytest.mark.unit
+    def test_schema_introspection_is_cached(self):
+        """Test that catalog queries run once per TTL and callers get copies."""
+        # Arrange
+        schema = {"database_info": {"schemas": ["public"]}, "tables_info": {}}
+        
+        # Act
+        with patch.object(health_utils, '_schema_cache', None), \
+             patch.object(health_utils, '_introspect_schema', return_value=schema) as mock_introspect:
+            first = health_utils._schema_info(Mock())
+            first["tables_info"]["t_diagram_size"] = {}
+            second = health_utils._schema_info(Mock())
+            with patch.object(health_utils, 'HEALTH_SCHEMA_CACHE_SECONDS', 0):
+                health_utils._schema_info(Mock())
+        
+        # Assert
+        assert mock_introspect.call_count == 2
+        assert second["database_info"] == {"schemas": ["public"]}
+        assert "t_diagram_size" not in second["tables_info"]
+    
+    @pytest.mark.unit
+    def test_live_does_no_io(self):
+        """Test that the liveness probe answers without touching the database."""
+        # Arrange
+        from health_live import main
+        request = func.HttpRequest(method="GET", url="/api/health/live", headers={}, body=b"")
+        
+        # Act
+        with patch('db_utils.DiagramDBManager._get_connection') as mock_connect:
+            response = main(request)
+        
+        # Assert
+        assert response.status_code == 200
+        assert json.loads(response.get_body())["status"] == "alive"
+        mock_connect.assert_not_called()
+    
+    @pytest.mark.unit
+    def test_ready_returns_503_when_not_ready(self):
+        """Test that the readiness probe maps the cached status to the HTTP status."""
+        # Arrange
+        from health_ready import main
+        request = func.HttpRequest(method="GET", url="/api/health/ready", headers={}, body=b"")
+        cache = ReadinessCache(lambda: {"status": "not_ready", "checks": {}},
+                               refresh_seconds=3600, max_stale_seconds=3600)
+        
+        # Act
+        with patch('health_ready.readiness_cache', cache):
+            response = main(request)
+        
+        # Assert
+        body = json.loads(response.get_body())
+        assert response.status_code == 503
+        assert body["status"] == "not_ready"
+        assert body["stale"] is False
+        assert "age_seconds" in body
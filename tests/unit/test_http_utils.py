@@ -0,0 +1,148 @@
+import pytest
+import gzip
+import json
+import sys
+import os
+from unittest.mock import patch, Mock
+
+# Import the shared HTTP utilities
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+import http_utils
+from http_utils import choose_encoding, compress_body, json_response, http_function
+import azure.functions as func
+
+
+def _request(headers=None, params=None):
+    """Create a real HttpRequest with the given headers and query parameters."""
+    return func.HttpRequest(
+        method="GET",
+        url="/api/diagram/read",
+        headers=headers or {},
+        params=params or {},
+        body=b""
+    )
+
+
+class TestHttpUtilsUnit:
+    """Unit tests for the shared response helper."""
+    
+    @pytest.mark.unit
+    def test_choose_encoding_honours_quality_values(self):
+        """Test Accept-Encoding parsing with q-values and wildcards."""
+        assert choose_encoding(None) is None
+        assert choose_encoding("identity") is None
+        assert choose_encoding("gzip, deflate") == "gzip"
+        assert choose_encoding("gzip;q=0") is None
+        assert choose_encoding("*;q=0.5") in ("br", "gzip")
+    
+    @pytest.mark.unit
+    def test_choose_encoding_prefers_brotli_when_available(self):
+        """Test that brotli wins ties only when the module is installed."""
+        with patch.object(http_utils, 'brotli', None):
+            assert choose_encoding("br, gzip") == "gzip"
+        with patch.object(http_utils, 'brotli', object()):
+            assert choose_encoding("br, gzip") == "br"
+            assert choose_encoding("br;q=0.5, gzip") == "gzip"
+    
+    @pytest.mark.unit
+    def test_compress_body_skips_small_payloads(self):
+        """Test that bodies under the threshold are not compressed."""
+        # Arrange
+        body = b"{}"
+        
+        # Act
+        result, encoding = compress_body(body, "gzip")
+        
+        # Assert
+        assert result == body
+        assert encoding is None
+    
+    @pytest.mark.unit
+    def test_json_response_gzips_large_payloads(self):
+        """Test that large JSON responses are gzipped when the client accepts it."""
+        # Arrange
+        payload = {"diagrams": [{"name": f"Diagram {i}"} for i in range(200)]}
+        request = _request(headers={"Accept-Encoding": "gzip"})
+        
+        # Act
+        with patch.object(http_utils, 'brotli', None):
+            response = json_response(request, payload)
+        
+        # Assert
+        assert response.status_code == 200
+        assert response.mimetype == "application/json"
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert json.loads(gzip.decompress(response.get_body())) == payload
+    
+
+
+class TestHttpFunctionMiddlewareUnit:
+    """Unit tests for the shared request middleware."""
+    
+    @pytest.mark.unit
+    def test_preflight_is_answered_without_calling_handler(self):
+        """Test that OPTIONS requests never reach the handler."""
+        # Arrange
+        handler = Mock()
+        wrapped = http_function("diagram/update")(handler)
+        request = func.HttpRequest(method="OPTIONS", url="/api/diagram/update", body=b"")
+        
+        # Act
+        response = wrapped(request)
+        
+        # Assert
+        handler.assert_not_called()
+        assert response.status_code == 200
+        assert response.headers["Access-Control-Max-Age"] == str(http_utils.CORS_MAX_AGE_SECONDS)
+        assert response.headers["Access-Control-Allow-Origin"] == http_utils.CORS_HEADERS["Access-Control-Allow-Origin"]
+    
+    @pytest.mark.unit
+    def test_handler_responses_get_cors_headers(self):
+        """Test that every handler response carries the CORS headers."""
+        # Arrange
+        @http_function("diagram/read")
+        def handler(req):
+            return json_response(req, {"error": "bad"}, status_code=400)
+        
+        # Act
+        response = handler(_request())
+        
+        # Assert
+        assert response.status_code == 400
+        assert handler.route == "diagram/read"
+        assert "Content-Encoding" not in response.headers
+        assert "Access-Control-Max-Age" not in response.headers
+        for name, value in http_utils.CORS_HEADERS.items():
+            assert response.headers[name] == value
+
+
+class TestContentNegotiationUnit:
+    """Unit tests for listing content negotiation."""
+    
+    OFFERED = (http_utils.JSON_MIMETYPE, http_utils.NDJSON_MIMETYPE, http_utils.MSGPACK_MIMETYPE)
+    
+    @pytest.mark.unit
+    def test_negotiate_defaults_to_json(self):
+        """Test that JSON stays the default for browsers and bare requests."""
+        assert http_utils.negotiate_media_type(_request(), self.OFFERED) == "application/json"
+        browser = _request(headers={"Accept": "application/json, text/plain, */*"})
+        assert http_utils.negotiate_media_type(browser, self.OFFERED) == "application/json"
+        unknown = _request(headers={"Accept": "text/csv"})
+        assert http_utils.negotiate_media_type(unknown, self.OFFERED) == "application/json"
+    
+    @pytest.mark.unit
+    def test_negotiate_honours_accept_header(self):
+        """Test NDJSON and MessagePack selection from the Accept header."""
+        ndjson = _request(headers={"Accept": "application/x-ndjson"})
+        msgpack = _request(headers={"Accept": "application/x-msgpack, application/json;q=0.5"})
+        assert http_utils.negotiate_media_type(ndjson, self.OFFERED) == "application/x-ndjson"
+        assert http_utils.negotiate_media_type(msgpack, self.OFFERED) == "application/msgpack"
+    
+    @pytest.mark.unit
+    def test_negotiate_format_parameter(self):
+        """Test that ?format= overrides Accept and rejects unsupported formats."""
+        request = _request(headers={"Accept": "application/json"}, params={"format": "ndjson"})
+        assert http_utils.negotiate_media_type(request, self.OFFERED) == "application/x-ndjson"
+        request = _request(params={"format": "msgpack"})
+        assert http_utils.negotiate_media_type(request, self.OFFERED[:2]) is None
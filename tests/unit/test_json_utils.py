@@ -0,0 +1,80 @@
+import pytest
+import json
+import sys
+import os
+from unittest.mock import patch
+from datetime import date, datetime
+from decimal import Decimal
+
+# Import the shared JSON utilities
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+import json_utils
+from json_utils import dumps, wants_pretty
+import azure.functions as func
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encoder(request):
+    """Run each test against orjson (when installed) and the stdlib fallback."""
+    if request.param == "orjson":
+        if json_utils.orjson is None:
+            pytest.skip("orjson is not installed")
+        yield request.param
+    else:
+        with patch.object(json_utils, 'orjson', None):
+            yield request.param
+
+
+class TestJsonUtilsUnit:
+    """Unit tests for the shared JSON serialiser."""
+    
+    @pytest.mark.unit
+    def test_dumps_is_compact_bytes(self, encoder):
+        """Test that the default output is compact UTF-8 bytes."""
+        # Act
+        body = dumps({"name": "Diagramme été", "count": 2})
+        
+        # Assert
+        assert isinstance(body, bytes)
+        assert b"\n" not in body
+        assert b": " not in body
+        assert json.loads(body) == {"name": "Diagramme été", "count": 2}
+    
+    @pytest.mark.unit
+    def test_dumps_pretty_indents(self, encoder):
+        """Test that pretty output is indented."""
+        # Act
+        body = dumps({"status": "success"}, pretty=True)
+        
+        # Assert
+        assert body == b'{\n  "status": "success"\n}'
+    
+    @pytest.mark.unit
+    def test_dumps_serialises_dates_and_decimals(self, encoder):
+        """Test built-in support for datetime, date and Decimal values."""
+        # Arrange
+        payload = {
+            "modifieddate": datetime(2024, 1, 1, 12, 0, 0, 500),
+            "day": date(2024, 1, 1),
+            "scale": Decimal("1.5")
+        }
+        
+        # Act
+        result = json.loads(dumps(payload))
+        
+        # Assert
+        assert result == {
+            "modifieddate": "2024-01-01T12:00:00.000500",
+            "day": "2024-01-01",
+            "scale": 1.5
+        }
+    
+    @pytest.mark.unit
+    def test_wants_pretty_reads_query_parameter(self):
+        """Test that pretty printing is opt-in via ?pretty=1."""
+        def request(params):
+            return func.HttpRequest(method="GET", url="/api/x", params=params, body=b"")
+        
+        assert wants_pretty(request({"pretty": "1"})) is True
+        assert wants_pretty(request({"pretty": "true"})) is True
+        assert wants_pretty(request({})) is False
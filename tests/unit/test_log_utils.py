@@ -0,0 +1,131 @@
+import pytest
+import json
+import logging
+import sys
+import os
+from unittest.mock import patch
+
+# Import the shared logging utilities
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+import log_utils
+from log_utils import get_logger, start_request, end_request, truncate
+
+
+@pytest.fixture
+def captured(caplog):
+    """Capture friday_apic records at DEBUG and restore the configured level."""
+    logger = logging.getLogger("friday_apic")
+    level = logger.level
+    caplog.set_level(logging.DEBUG, logger="friday_apic")
+    yield caplog
+    logger.setLevel(level)
+
+
+class TestLogUtilsUnit:
+    """Unit tests for the structured request logger."""
+    
+    @pytest.mark.unit
+    def test_records_are_json_with_request_context(self, captured):
+        """Test that records carry the component, route and request ID."""
+        # Arrange
+        logger = get_logger("diagram_read")
+        token = start_request("diagram/read", request_id="abc123")
+        
+        # Act
+        try:
+            logger.info("Found %s diagrams", 3, package_id=7)
+        finally:
+            end_request(token)
+        
+        # Assert
+        record = json.loads(captured.records[0].getMessage())
+        assert record == {
+            "component": "diagram_read",
+            "message": "Found 3 diagrams",
+            "route": "diagram/read",
+            "request_id": "abc123",
+            "package_id": 7
+        }
+    
+    @pytest.mark.unit
+    def test_formatting_is_lazy_below_level(self, captured):
+        """Test that disabled levels never render their arguments."""
+        # Arrange
+        logging.getLogger("friday_apic").setLevel(logging.INFO)
+        
+        class Exploding:
+            def __str__(self):
+                raise AssertionError("formatted a suppressed record")
+        
+        # Act
+        get_logger("db_utils").debug("Row: %s", Exploding())
+        
+        # Assert
+        assert captured.records == []
+    
+    @pytest.mark.unit
+    def test_sampled_out_requests_keep_warnings(self, captured):
+        """Test that sampling drops info records but never warnings or errors."""
+        # Arrange
+        logger = get_logger("health_check")
+        with patch.dict(log_utils.LOG_SAMPLE_RATES, {"health": 0.0}):
+            token = start_request("health")
+        
+        # Act
+        try:
+            logger.info("Function started")
+            logger.warning("Database slow")
+        finally:
+            end_request(token)
+        
+        # Assert
+        assert [record.levelname for record in captured.records] == ["WARNING"]
+    
+    @pytest.mark.unit
+    def test_payload_dumps_only_when_debug_enabled(self, captured):
+        """Test that payload dumps are skipped unless debug is on, and truncated."""
+        # Arrange
+        logger = get_logger("diagram_create")
+        logging.getLogger("friday_apic").setLevel(logging.INFO)
+        
+        # Act
+        logger.payload("Request body", {"name": "x"})
+        logging.getLogger("friday_apic").setLevel(logging.DEBUG)
+        with patch.object(log_utils, 'LOG_MAX_PAYLOAD_CHARS', 10):
+            logger.payload("Request body", {"notes": "y" * 100})
+        
+        # Assert
+        assert len(captured.records) == 1
+        payload = json.loads(captured.records[0].getMessage())["payload"]
+        assert payload.startswith('{"notes": ')
+        assert payload.endswith("more chars>")
+    
+    @pytest.mark.unit
+    def test_truncate_leaves_short_text(self):
+        """Test that short strings are returned unchanged."""
+        assert truncate("short", limit=10) == "short"
+        assert truncate("a" * 12, limit=10) == "aaaaaaaaaa...<2 more chars>"
+    
+    @pytest.mark.unit
+    def test_sample_rates_skip_malformed_entries(self, captured):
+        """Test that bad LOG_SAMPLE_RATES entries are skipped with a warning and rates are clamped."""
+        # Act
+        rates = log_utils._parse_sample_rates("diagram/read=0.1, health=oops,=0.5,nan=nan,broken, stats=7,live=-1,")
+        
+        # Assert
+        assert rates == {"diagram/read": 0.1, "stats": 1.0, "live": 0.0}
+        warnings = [record.getMessage() for record in captured.records if record.levelno == logging.WARNING]
+        assert len(warnings) == 4
+    
+    @pytest.mark.unit
+    def test_unknown_log_level_falls_back_to_info(self, captured):
+        """Test that an invalid LOG_LEVEL falls back to INFO with a warning instead of failing the import."""
+        # Act
+        fallback = log_utils._parse_log_level("verbose")
+        level = log_utils._parse_log_level(" debug ")
+        
+        # Assert
+        assert fallback == "INFO"
+        assert level == "DEBUG"
+        warnings = [record.getMessage() for record in captured.records if record.levelno == logging.WARNING]
+        assert warnings == ["Ignoring unknown LOG_LEVEL 'verbose'; using INFO"]
@@ -0,0 +1,86 @@
+import pytest
+import sys
+import os
+import time
+
+# Import the shared metrics sampler
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+from metrics_utils import MetricsSampler, metrics_snapshot, AVERAGED_FIELDS
+
+
+class TestMetricsUtilsUnit:
+    """Unit tests for the background metrics sampler."""
+    
+    @pytest.mark.unit
+    def test_latest_does_not_block(self):
+        """Test that reading a sample returns without a measurement sleep."""
+        # Arrange
+        sampler = MetricsSampler(interval_seconds=3600)
+        
+        # Act
+        start = time.monotonic()
+        sample = sampler.latest()
+        elapsed = time.monotonic() - start
+        
+        # Assert
+        assert elapsed < 0.5
+        assert sample["process_rss"] > 0
+        assert sample["threads"] >= 1
+        assert sample["open_fds"] >= 0
+    
+    @pytest.mark.unit
+    def test_ring_buffer_keeps_newest_samples(self):
+        """Test that the buffer is bounded and drops the oldest samples."""
+        # Arrange
+        sampler = MetricsSampler(interval_seconds=3600, size=3).start()
+        
+        # Act
+        taken = [sampler._take_sample() for _ in range(5)]
+        
+        # Assert
+        assert sampler.samples() == taken[2:]
+        assert sampler.latest() is taken[-1]
+    
+    @pytest.mark.unit
+    def test_averages_cover_window(self):
+        """Test that averages only include samples inside the window."""
+        # Arrange
+        sampler = MetricsSampler(interval_seconds=3600).start()
+        old = sampler._take_sample()
+        old["monotonic"] -= 120
+        old["threads"] = 1000
+        recent = sampler._take_sample()
+        
+        # Act
+        averages = sampler.averages(60)
+        
+        # Assert
+        assert averages["samples"] == 1
+        assert averages["threads"] == recent["threads"]
+        assert set(AVERAGED_FIELDS) <= set(averages)
+        assert MetricsSampler(interval_seconds=3600).averages(60) is None
+    
+    @pytest.mark.unit
+    def test_background_thread_samples(self):
+        """Test that the sampler fills the buffer on its own."""
+        # Arrange
+        sampler = MetricsSampler(interval_seconds=0.01).start()
+        
+        # Act
+        for _ in range(100):
+            if len(sampler.samples()) >= 2:
+                break
+            time.sleep(0.01)
+        
+        # Assert
+        assert len(sampler.samples()) >= 2
+    
+    @pytest.mark.unit
+    def test_snapshot_shape(self):
+        """Test that the snapshot exposes the latest sample and window averages."""
+        # Act
+        snapshot = metrics_snapshot()
+        
+        # Assert
+        assert "monotonic" not in snapshot["latest"]
+        assert set(snapshot["averages"]) == {"60s", "300s"}
@@ -0,0 +1,131 @@
+import pytest
+import sys
+import os
+
+import azure.functions as func
+
+# Import the shared tracing utilities
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+from trace_utils import start_trace, end_trace, current_trace, span, to_otlp
+from http_utils import http_function, json_response
+from log_utils import current_request
+
+
+class TestTraceUtilsUnit:
+    """Unit tests for request span tracing."""
+    
+    @pytest.mark.unit
+    def test_span_outside_request_is_noop(self):
+        """Test that spans outside a request record nothing and do not fail."""
+        # Act
+        with span("db_query"):
+            pass
+        
+        # Assert
+        assert current_trace() is None
+    
+    @pytest.mark.unit
+    def test_nested_spans_record_parent(self):
+        """Test that nested spans are linked to their enclosing span."""
+        # Arrange
+        trace, token = start_trace("diagram/read")
+        
+        # Act
+        try:
+            with span("handler"):
+                with span("db_query", operation="list"):
+                    pass
+        finally:
+            end_trace(trace, token)
+        
+        # Assert
+        query, handler = trace.spans
+        assert query["name"] == "db_query"
+        assert query["parent_span_id"] == handler["span_id"]
+        assert handler["parent_span_id"] is None
+        assert query["attributes"] == {"operation": "list"}
+    
+    @pytest.mark.unit
+    def test_server_timing_sums_repeated_spans(self):
+        """Test that spans sharing a name are summed in Server-Timing."""
+        # Arrange
+        trace, token = start_trace("diagram/delete")
+        try:
+            with span("db_query"):
+                pass
+            with span("db_query"):
+                pass
+        finally:
+            end_trace(trace, token)
+        
+        # Act
+        header = trace.server_timing()
+        
+        # Assert
+        assert header.startswith("db_query;dur=")
+        assert header.count("db_query") == 1
+    
+    @pytest.mark.unit
+    def test_continues_incoming_traceparent(self):
+        """Test that a W3C traceparent header sets the trace and parent IDs."""
+        # Arrange
+        headers = {"traceparent": "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"}
+        
+        # Act
+        trace, token = start_trace("diagram/read", headers)
+        try:
+            with span("handler"):
+                pass
+        finally:
+            end_trace(trace, token)
+        
+        # Assert
+        assert trace.trace_id == "0af7651916cd43dd8448eb211c80319c"
+        assert trace.spans[0]["parent_span_id"] == "b7ad6b7169203331"
+    
+    @pytest.mark.unit
+    def test_to_otlp_encodes_spans(self):
+        """Test that traces are encoded in the OTLP/JSON layout."""
+        # Arrange
+        trace, token = start_trace("diagram/read", {"X-Correlation-ID": "corr-1"})
+        try:
+            with span("db_query", rows=3):
+                pass
+        finally:
+            end_trace(trace, token)
+        
+        # Act
+        payload = to_otlp([trace])
+        
+        # Assert
+        otlp_span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        assert otlp_span["traceId"] == trace.trace_id
+        assert otlp_span["name"] == "db_query"
+        attributes = {item["key"]: item["value"] for item in otlp_span["attributes"]}
+        assert attributes["rows"] == {"intValue": "3"}
+        assert attributes["correlation_id"] == {"stringValue": "corr-1"}
+    
+    @pytest.mark.unit
+    def test_middleware_adds_timing_and_correlation_headers(self):
+        """Test that responses carry Server-Timing and the propagated correlation ID."""
+        # Arrange
+        seen = {}
+        
+        @http_function("diagram/read")
+        def handler(req):
+            seen["request_id"] = current_request()["request_id"]
+            return json_response(req, {"ok": True})
+        
+        req = func.HttpRequest(
+            method="GET", url="/api/diagram/read",
+            headers={"X-Correlation-ID": "corr-42"}, body=b""
+        )
+        
+        # Act
+        response = handler(req)
+        
+        # Assert
+        assert response.headers["X-Correlation-ID"] == "corr-42"
+        assert seen["request_id"] == "corr-42"
+        assert "serialize;dur=" in response.headers["Server-Timing"]
+        assert "handler;dur=" in response.headers["Server-Timing"]